@@ -6,24 +6,40 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import textwrap
-
-from db_connections import get_arg_value
-from ecg_view import render_ecg_page
-from utils import (
-    get_admissions,
-    get_patient_info,
-    get_admission_info,
-    get_admission_services,
-    get_icd_diagnoses,
-    get_icd_procedures,
-    get_icu_info,
-    get_item_types,
-    get_event_data,
-    get_discharge_notes,
+import time
+
+from charts import ItemPanel, build_timeline_figure, combine_panels, segment_trace
+from db_connections import get_arg_value, get_mysql_pool_stats
+from dictionaries import dictionaries
+from downsampling import (
+    describe_reduction,
+    downsample_frame,
+    get_downsampling_method,
+    get_max_plot_points,
 )
+from fragments import fragment, rerun_fragment
+from item_index import GRID_COLUMNS, ItemIndex
+from item_search import annotate_hits, describe_hit, get_item_search_index
+from notes_index import get_notes_index, highlight_html
+from backend import get_backend
+from ecg_tiles import get_tile_store
+from ecg_view import render_ecg_compare_page, render_ecg_page
+from query_cache import query_cache
 
 st.set_page_config(layout="wide", page_title="MIMIC-IV Patient Explorer")
 
+# Dictionary search hits ranked against the admission's items
+SEARCH_HIT_LIMIT = 100
+# Notes listed per note search, and match offsets listed per note
+NOTE_SEARCH_LIMIT = 20
+MAX_SHOWN_OFFSETS = 10
+# Display names of the MIMIC-IV-Note note_type codes
+NOTE_TYPE_LABELS = {
+    "DS": "Discharge summary",
+    "AR": "Radiology addendum",
+    "RR": "Radiology report",
+}
+
 
 def get_ecg_base_directory() -> Optional[Path]:
     """Resolve the ECG base directory provided via command-line argument."""
@@ -55,6 +71,11 @@ _ecg_base_directory = get_ecg_base_directory()
 _requested_path = _get_query_param_value("path")
 if _requested_path:
     _normalized_path = _requested_path.strip("/")
+    if _normalized_path.lower() == "ecg/compare":
+        render_ecg_compare_page(
+            _ecg_base_directory, _get_query_param_value("studies")
+        )
+        st.stop()
     if _normalized_path.lower().startswith("ecg"):
         render_ecg_page(_ecg_base_directory, _normalized_path)
         st.stop()
@@ -64,14 +85,77 @@ st.title("MIMIC-IV Patient Explorer 🩺")
 # --- Initialize session state ---
 if "selected_items" not in st.session_state:
     st.session_state.selected_items = []
-if "page_number" not in st.session_state:
-    st.session_state.page_number = 0
-if "sort_by" not in st.session_state:
-    st.session_state.sort_by = "label"
-if "sort_ascending" not in st.session_state:
-    st.session_state.sort_ascending = True
+if "item_index" not in st.session_state:
+    st.session_state.item_index = None
+    st.session_state.item_grid_generation = 0
 if "default_items_initialized_for_hadm" not in st.session_state:
     st.session_state.default_items_initialized_for_hadm = None
+if "item_panels" not in st.session_state:
+    st.session_state.item_panels = {}
+if "combined_figure_key" not in st.session_state:
+    st.session_state.combined_figure_key = None
+    st.session_state.combined_figure = None
+
+
+# --- Query cache status ---
+with st.sidebar.expander("Query cache"):
+    cache_stats = query_cache.stats()
+    st.write(
+        f"**Entries:** {cache_stats['entries']} "
+        f"({cache_stats['bytes'] / (1024 * 1024):.1f} MB)"
+    )
+    st.write(
+        f"**Hits / Misses:** {cache_stats['hits']} / {cache_stats['misses']} "
+        f"({cache_stats['hit_rate']:.0%} hit rate)"
+    )
+    st.write(
+        f"**Evictions / Expirations:** {cache_stats['evictions']} / "
+        f"{cache_stats['expirations']}"
+    )
+    if st.button("Clear cache"):
+        query_cache.clear()
+        st.rerun()
+
+# Data backend selected with --backend (mysql, parquet or fixture)
+backend = get_backend()
+if backend is None:
+    st.stop()
+
+with st.sidebar.expander("MySQL pool"):
+    pool_stats = get_mysql_pool_stats() if backend.name == "mysql" else {}
+    if pool_stats:
+        st.write(
+            f"**In use / Idle / Open:** {pool_stats['in_use']} / "
+            f"{pool_stats['idle']} / {pool_stats['open']} "
+            f"(size {pool_stats['pool_size']} + {pool_stats['max_overflow']} overflow)"
+        )
+        st.write(
+            f"**Checkouts:** {pool_stats['checkouts']} "
+            f"(avg wait {pool_stats['wait_avg_seconds'] * 1000:.1f} ms, "
+            f"max {pool_stats['wait_max_seconds'] * 1000:.1f} ms)"
+        )
+        st.write(
+            f"**Created / Reconnects / Timeouts:** {pool_stats['created']} / "
+            f"{pool_stats['reconnects']} / {pool_stats['timeouts']}"
+        )
+    elif backend.name != "mysql":
+        st.write(f"Not used: reading from {backend.describe()}.")
+    else:
+        st.write("MySQL pool not available.")
+
+with st.sidebar.expander("Dictionaries"):
+    dictionary_stats = dictionaries.stats()
+    st.write(
+        f"**Version:** {dictionary_stats['version']} "
+        f"({dictionary_stats['bytes'] / (1024 * 1024):.1f} MB)"
+    )
+    for table, row_count in dictionary_stats["tables"].items():
+        st.write(f"**{table}:** {row_count:,} rows")
+    if st.button("Reload dictionaries"):
+        # Cached item lists and ICD codes carry titles from the old version
+        dictionaries.reload()
+        query_cache.clear()
+        st.rerun()
 
 
 # --- Helper Functions for App Logic ---
@@ -93,23 +177,7 @@ def remove_item_from_selection(item_to_remove):
     ]
 
 
-def reset_page_and_sort():
-    st.session_state.page_number = 0
-    st.session_state.sort_by = "label"
-    st.session_state.sort_ascending = True
-
-
-def handle_sort(column_name):
-    if st.session_state.sort_by == column_name:
-        st.session_state.sort_ascending = not st.session_state.sort_ascending
-    else:
-        st.session_state.sort_by = column_name
-        st.session_state.sort_ascending = True
-    st.session_state.page_number = 0
-
-
 def handle_admission_change():
-    reset_page_and_sort()
     st.session_state.selected_items = []
     st.session_state.default_items_initialized_for_hadm = None
 
@@ -130,6 +198,15 @@ def initialize_default_items(item_types_df, hadm_id):
     st.session_state.default_items_initialized_for_hadm = hadm_key
 
 
+def get_item_index(item_types_df, hadm_id):
+    """Return the admission's ItemIndex, building it once per admission."""
+    hadm_key = str(hadm_id)
+    cached = st.session_state.item_index
+    if cached is None or cached[0] != hadm_key:
+        st.session_state.item_index = (hadm_key, ItemIndex.build(item_types_df))
+    return st.session_state.item_index[1]
+
+
 def configure_chart_layout(figure, show_legend=False, left_margin=200):
     """Ensure consistent margins and legend placement so x-axes line up."""
     layout_updates = dict(
@@ -150,14 +227,697 @@ def configure_chart_layout(figure, show_legend=False, left_margin=200):
     figure.update_yaxes(automargin=False)
 
 
+def build_item_panel(item, event_data, subject_id, start_time, end_time):
+    """Build the chart of one selected item and the notes shown under it."""
+    fig = go.Figure()
+    source_table = item["source_table"]
+    reduction_note = None
+    links_html = None
+
+    if source_table == "ecgevents":
+        event_data["ecg_time"] = pd.to_datetime(event_data["ecg_time"])
+        event_data = event_data.sort_values(by="ecg_time")
+        event_data["series_label"] = item["label"]
+        if "text" in event_data.columns:
+
+            def wrap_hover_text(value):
+                if isinstance(value, str) and value.strip():
+                    wrapped_lines = textwrap.wrap(value, width=70)
+                    return "<br>".join(wrapped_lines)
+                return value
+
+            event_data["text"] = event_data["text"].apply(wrap_hover_text)
+        event_data["hover_label"] = "ECG measurement"
+        if "study_id" in event_data.columns:
+            subject_identifier_formatted = f"{int(subject_id):08d}"
+            tile_store = get_tile_store()
+
+            def build_hover_label(row):
+                hover_lines = []
+                ecg_time_value = row.get("ecg_time")
+                if pd.notna(ecg_time_value):
+                    hover_lines.append(f"<b>ECG Time:</b> {ecg_time_value}")
+                study_value = row.get("study_id")
+                if tile_store is not None and pd.notna(study_value):
+                    lead_sparkline = tile_store.sparkline(study_value)
+                    if lead_sparkline:
+                        hover_lines.append(f"<b>Lead II:</b> {lead_sparkline}")
+                text_value = row.get("text")
+                if isinstance(text_value, str) and text_value.strip():
+                    hover_lines.append(f"<b>Details:</b> {text_value}")
+                if not hover_lines:
+                    return "ECG measurement"
+                return "<br>".join(hover_lines)
+
+            event_data["hover_label"] = event_data.apply(build_hover_label, axis=1)
+
+        fig = px.scatter(
+            event_data,
+            x="ecg_time",
+            y="series_label",
+            title=f"ECG Scatter for {item['label']}",
+            custom_data=["hover_label"],
+            hover_data=[],
+        )
+        fig.update_traces(marker=dict(size=9))
+        fig.update_traces(hovertemplate="%{customdata[0]}<extra></extra>")
+        configure_chart_layout(fig)
+        fig.update_xaxes(range=[start_time, end_time])
+        fig.update_yaxes(title="")
+        if "study_id" in event_data.columns:
+            link_rows = event_data.copy()
+            link_rows["ecg_time"] = pd.to_datetime(link_rows["ecg_time"], errors="coerce")
+            link_rows["study_id"] = pd.to_numeric(link_rows["study_id"], errors="coerce")
+            link_rows = link_rows.dropna(subset=["ecg_time", "study_id"]).sort_values(
+                "ecg_time"
+            )
+            if not link_rows.empty:
+                link_labels = []
+                locators = []
+                subject_identifier_formatted = f"{int(subject_id):08d}"
+                for link_row in link_rows.itertuples():
+                    timestamp_full = link_row.ecg_time.strftime("%Y-%m-%d %H:%M:%S")
+                    timestamp_label = link_row.ecg_time.strftime("%m-%d %H:%M")
+                    study_identifier_formatted = f"{int(link_row.study_id):08d}"
+                    locator = f"ecg/p{subject_identifier_formatted}/s{study_identifier_formatted}"
+                    label = f"[{timestamp_label}]"
+                    locators.append(locator)
+                    link_labels.append(
+                        f'<a href="/?path={locator}" target="_blank" rel="noopener noreferrer" title="{timestamp_full}">'
+                        f"{label}"
+                        "</a>"
+                    )
+                if len(locators) > 1:
+                    # Open every listed study in the comparison view
+                    compare_href = "/?path=ecg/compare&studies=" + ",".join(locators)
+                    link_labels.append(
+                        f'<a href="{compare_href}" target="_blank" rel="noopener noreferrer">'
+                        "<b>[Compare all]</b>"
+                        "</a>"
+                    )
+                links_html = " ".join(link_labels)
+        return ItemPanel(fig, links_html=links_html)
+
+    time_col = (
+        "charttime"
+        if source_table in ["chartevents", "datetimeevents", "labevents"]
+        else "starttime"
+    )
+    event_data[time_col] = pd.to_datetime(event_data[time_col])
+    event_data = event_data.sort_values(by=time_col)
+
+    # For numerical data types (chartevents, outputevents, labevents)
+    if source_table in [
+        "chartevents",
+        "outputevents",
+        "labevents",
+    ]:
+        event_data["value_numeric"] = pd.to_numeric(event_data["value"], errors="coerce")
+        if event_data["value_numeric"].notna().any():
+            # Add unit information to the title if available
+            unit_info = ""
+            if "unit" in event_data.columns and not event_data["unit"].isna().all():
+                unit = event_data["unit"].iloc[0]
+                if pd.notna(unit):
+                    unit_info = f" ({unit})"
+
+            line_data = event_data.dropna(subset=["value_numeric"])
+            # Downsample the selected window only, so a narrower time range
+            # brings back every point.
+            downsampling_method = get_downsampling_method()
+            plotted_data = downsample_frame(
+                line_data,
+                time_col,
+                "value_numeric",
+                get_max_plot_points(),
+                downsampling_method,
+            )
+            if len(plotted_data) < len(line_data):
+                reduction_note = describe_reduction(
+                    len(plotted_data),
+                    len(line_data),
+                    downsampling_method,
+                )
+            fig = px.line(
+                plotted_data,
+                x=time_col,
+                y="value_numeric",
+                title=f"Line Plot for {item['label']}{unit_info}",
+                markers=True,
+            )
+
+            # Add reference ranges for lab values if available
+            if (
+                source_table == "labevents"
+                and "ref_range_lower" in event_data.columns
+                and "ref_range_upper" in event_data.columns
+            ):
+                # Check if we have valid reference ranges
+                has_lower = not event_data["ref_range_lower"].isna().all()
+                has_upper = not event_data["ref_range_upper"].isna().all()
+
+                if has_lower or has_upper:
+                    # Use the first non-null value for reference ranges
+                    lower_val = (
+                        event_data["ref_range_lower"].dropna().iloc[0] if has_lower else None
+                    )
+                    upper_val = (
+                        event_data["ref_range_upper"].dropna().iloc[0] if has_upper else None
+                    )
+
+                    # Add reference range lines
+                    if lower_val is not None:
+                        fig.add_hline(
+                            y=lower_val,
+                            line_dash="dash",
+                            line_color="orange",
+                            annotation_text="Lower reference",
+                            annotation_position="bottom right",
+                        )
+                    if upper_val is not None:
+                        fig.add_hline(
+                            y=upper_val,
+                            line_dash="dash",
+                            line_color="orange",
+                            annotation_text="Upper reference",
+                            annotation_position="top right",
+                        )
+        else:
+            fig = px.scatter(
+                event_data,
+                x=time_col,
+                y="value",
+                title=f"Scatter Plot for {item['label']}",
+                hover_data=event_data.columns,
+            )
+    elif source_table == "datetimeevents":
+        fig = px.scatter(
+            event_data,
+            x=time_col,
+            y=["Event"] * len(event_data),
+            title=f"Events for {item['label']}",
+            hover_data=event_data.columns,
+        )
+    # For timeline-based data (ingredientevents, inputevents, procedureevents, prescriptions)
+    elif source_table in [
+        "ingredientevents",
+        "inputevents",
+        "procedureevents",
+        "prescriptions",
+    ]:
+        # Handle end time column name differences
+        end_time_col = "endtime" if "endtime" in event_data.columns else "stoptime"
+
+        if end_time_col in event_data.columns:
+            event_data[end_time_col] = pd.to_datetime(event_data[end_time_col])
+
+            # Add custom title based on source table
+            title_prefix = "Prescription" if source_table == "prescriptions" else "Timeline"
+            fig = build_timeline_figure(
+                event_data,
+                time_col,
+                end_time_col,
+                item["label"],
+                f"{title_prefix} for {item['label']}",
+            )
+        else:
+            # If no endtime column, create a simple scatter plot
+            fig = px.scatter(
+                event_data,
+                x=time_col,
+                y=[item["label"]] * len(event_data),
+                title=f"Events for {item['label']}",
+                hover_data=event_data.columns,
+            )
+
+    configure_chart_layout(fig)
+    fig.update_xaxes(range=[start_time, end_time])
+    return ItemPanel(fig, note=reduction_note)
+
+
+def render_panel_details(panel, with_title=False):
+    """Show a panel's downsampling note and ECG waveform links below its chart."""
+    if panel.note:
+        st.caption(f"{panel.title}: {panel.note}" if with_title else panel.note)
+    if panel.links_html:
+        st.markdown(
+            f"**ECG Waveform Links{' for ' + panel.title if with_title else ''}**"
+        )
+        st.markdown(panel.links_html, unsafe_allow_html=True)
+
+
+@fragment
+def render_admission_details(patient_info, admission_info, services):
+    """Patient demographics and admission times."""
+    st.header("Patient and Admission Details")
+    admission_start_timestamp = pd.to_datetime(admission_info["admittime"])
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**Gender:** {patient_info['gender']}")
+        anchor_date = pd.Timestamp(
+            year=int(patient_info["anchor_year"]), month=1, day=1
+        )
+        admission_age = (
+            float(patient_info["anchor_age"])
+            + (admission_start_timestamp - anchor_date).days / 365.25
+        )
+        admission_age = round(admission_age, 1)
+        st.write(f"**Age at Admission:** {admission_age}")
+        st.write(f"**Insurance:** {admission_info['insurance']}")
+        st.write(f"**Language:** {admission_info['language']}")
+        st.write(f"**Marital Status:** {admission_info['marital_status']}")
+        st.write(f"**Ethnicity:** {admission_info['race']}")
+    with col2:
+        st.write(f"**Admission Time:** {admission_info['admittime']}")
+        st.write(f"**Discharge Time:** {admission_info['dischtime']}")
+        if services:
+            st.write(f"**Services:** {services}")
+        if pd.notna(patient_info["dod"]):
+            st.write(f"**Date of Death:** {patient_info['dod']}")
+
+
+@fragment
+def render_icd_information(icd_diagnoses, icd_procedures):
+    """ICD diagnoses and procedures of the admission."""
+    st.header("ICD Information")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Diagnoses")
+        st.dataframe(icd_diagnoses)
+    with col2:
+        st.subheader("Procedures")
+        st.dataframe(icd_procedures)
+
+
+def render_note_search(notes_index, query, scope, subject_id, hadm_id):
+    """Ranked notes matching query, with highlighted snippets and match offsets."""
+    scope_filters = {
+        "This admission": {"hadm_id": hadm_id},
+        "This patient": {"subject_id": subject_id},
+        "All patients": {},
+    }[scope]
+    search_started = time.perf_counter()
+    hits = notes_index.search(
+        query,
+        limit=NOTE_SEARCH_LIMIT,
+        # Full highlighted text only for the few notes of one patient
+        with_text=scope != "All patients",
+        **scope_filters,
+    )
+    match_count = notes_index.count(query, **scope_filters)
+    search_milliseconds = (time.perf_counter() - search_started) * 1000
+    st.caption(
+        f"{match_count:,} matching notes in {search_milliseconds:.0f} ms"
+        + (f", showing the best {len(hits)}." if match_count > len(hits) else ".")
+    )
+    for hit in hits:
+        st.markdown(
+            f"**{NOTE_TYPE_LABELS.get(hit.note_type, hit.note_type)}** | "
+            f"Note {hit.note_id} | Admission {hit.hadm_id} | Chart Time: {hit.charttime}"
+        )
+        st.markdown(
+            f"<div>{highlight_html(hit.snippet)}</div>", unsafe_allow_html=True
+        )
+        shown_offsets = ", ".join(
+            f"{start}-{end}" for start, end in hit.match_offsets[:MAX_SHOWN_OFFSETS]
+        )
+        if len(hit.match_offsets) > MAX_SHOWN_OFFSETS:
+            shown_offsets += ", ..."
+        st.caption(f"{len(hit.match_offsets)} matches at characters {shown_offsets}")
+        if hit.marked_text:
+            with st.expander("Show note with highlights"):
+                st.markdown(
+                    f"<div>{highlight_html(hit.marked_text)}</div>",
+                    unsafe_allow_html=True,
+                )
+
+
+@fragment
+def render_clinical_notes(notes, subject_id, hadm_id):
+    """Note search and the admission's notes, one tab per note type."""
+    st.header("Clinical Notes 📝")
+    notes_index = get_notes_index()
+    if notes_index is not None:
+        search_cols = st.columns([3, 2])
+        note_query = search_cols[0].text_input(
+            "Search notes:",
+            placeholder='e.g. intubated, "atrial fibrillation" or afib*',
+        )
+        search_scope = search_cols[1].radio(
+            "Search in:",
+            ["This admission", "This patient", "All patients"],
+            horizontal=True,
+        )
+        if note_query:
+            render_note_search(
+                notes_index, note_query, search_scope, subject_id, hadm_id
+            )
+            st.write("---")
+    if notes:
+        note_types = sorted({note.get("note_type") or "N/A" for note in notes})
+        note_tabs = st.tabs(
+            [
+                f"{NOTE_TYPE_LABELS.get(note_type, note_type)} "
+                f"({sum((note.get('note_type') or 'N/A') == note_type for note in notes)})"
+                for note_type in note_types
+            ]
+        )
+        for note_type, note_tab in zip(note_types, note_tabs):
+            with note_tab:
+                for note in notes:
+                    if (note.get("note_type") or "N/A") != note_type:
+                        continue
+                    note_label = f"Type: {note.get('note_type', 'N/A')} | Sequence: {note.get('note_seq', 'N/A')} | Chart Time: {note.get('charttime', 'N/A')}"
+                    with st.expander(note_label):
+                        for field_name, field_value in note.get("details", {}).items():
+                            st.caption(f"**{field_name}:** {field_value}")
+                        st.text(note.get("text", "Note text not available."))
+    else:
+        st.info("No notes found for this admission.")
+
+
+@fragment
+def render_icu_stays(icu_stays, patient_info, admission_info):
+    """ICU stay table and timeline, marking a death during the admission."""
+    st.header("ICU Stays")
+
+    if not icu_stays.empty:
+        # Create a timeline visualization for ICU stays
+        icu_fig = go.Figure()
+
+        # Process ICU stays data for visualization
+        icu_stays["intime"] = pd.to_datetime(icu_stays["intime"])
+        icu_stays["outtime"] = pd.to_datetime(icu_stays["outtime"])
+        icu_stays["duration_hours"] = (
+            icu_stays["outtime"] - icu_stays["intime"]
+        ).dt.total_seconds() / 3600
+
+        # Draw every ICU stay as one segment of a single trace
+        stay_numbers = pd.Series(
+            range(1, len(icu_stays) + 1), index=icu_stays.index
+        ).astype(str)
+        stay_labels = (
+            "ICU Stay " + stay_numbers
+            + " (ID: " + icu_stays["stay_id"].astype(str) + ")"
+        )
+        stay_hover_texts = (
+            "ICU Stay " + stay_numbers
+            + "<br>ID: " + icu_stays["stay_id"].astype(str)
+            + "<br>Start: " + icu_stays["intime"].dt.strftime("%Y-%m-%d %H:%M")
+            + "<br>End: " + icu_stays["outtime"].dt.strftime("%Y-%m-%d %H:%M")
+            + "<br>Duration: " + icu_stays["duration_hours"].map("{:.1f}".format)
+            + " hours"
+        )
+        y_labels = stay_labels.tolist()
+        icu_fig.add_trace(
+            segment_trace(
+                icu_stays["intime"],
+                icu_stays["outtime"],
+                y_labels,
+                stay_hover_texts.tolist(),
+                color="#1f77b4",
+            )
+        )
+
+        # Add patient death marker if applicable
+        death_y_value = None
+        if pd.notna(patient_info["dod"]):
+            death_date = pd.to_datetime(patient_info["dod"])
+            # Check if death occurred during the admission period
+            if (
+                admission_info["admittime"]
+                <= death_date
+                <= admission_info["dischtime"]
+            ):
+                # Create death marker at end of day
+                death_datetime = pd.Timestamp(
+                    death_date.year,
+                    death_date.month,
+                    death_date.day,
+                    23,
+                    59,
+                    59,
+                )
+                death_y_value = "Patient Death"
+                y_labels.append(death_y_value)
+
+                icu_fig.add_trace(
+                    go.Scatter(
+                        x=[death_datetime],
+                        y=[death_y_value],
+                        mode="markers",
+                        marker=dict(symbol="x", size=15, color="red"),
+                        name="Death",
+                        hoverinfo="text",
+                        text=f"Date of Death: {death_date.strftime('%Y-%m-%d')}",
+                        showlegend=True,
+                    )
+                )
+
+        # Display summary info in a table
+        icu_summary = pd.DataFrame(
+            {
+                "ICU Stay": [
+                    f"Stay {idx+1} (ID: {stay.stay_id})"
+                    for idx, stay in enumerate(icu_stays.itertuples())
+                ],
+                "Start Time": icu_stays["intime"].dt.strftime(
+                    "%Y-%m-%d %H:%M"
+                ),
+                "End Time": icu_stays["outtime"].dt.strftime(
+                    "%Y-%m-%d %H:%M"
+                ),
+                "Duration (hours)": icu_stays["duration_hours"].round(1),
+            }
+        )
+
+        st.dataframe(icu_summary)
+
+        # Configure layout
+        icu_fig.update_layout(
+            title="ICU Stays Timeline",
+            xaxis=dict(
+                title="Time",
+                range=[
+                    admission_info["admittime"],
+                    admission_info["dischtime"],
+                ],
+            ),
+            yaxis=dict(
+                title="", categoryorder="array", categoryarray=y_labels
+            ),
+            height=max(
+                200, 100 + (len(y_labels) * 40)
+            ),  # Adjust height based on number of stays
+            margin=dict(l=10, r=10, t=30, b=10),
+            hovermode="closest",
+        )
+
+        st.plotly_chart(icu_fig, use_container_width=True)
+    else:
+        st.info("No ICU stays found for this admission.")
+
+
+@fragment
+def render_item_browser(item_types, hadm_id):
+    """
+    Filterable grid of the admission's items with multi-row selection.
+
+    The grid scrolls, sorts and selects in the browser; filtering uses the
+    admission's ItemIndex and reruns only this fragment. Adding items reruns
+    the app so the visualization panel picks them up.
+    """
+    st.header("Available Patient Data Items")
+
+    if not item_types.empty:
+        initialize_default_items(item_types, hadm_id)
+        item_index = get_item_index(item_types, hadm_id)
+        filter_cols = st.columns(3)
+        with filter_cols[0]:
+            filter_text = st.text_input(
+                "Search items:",
+                help="Matches labels, abbreviations, lab fluids and categories, e.g. 'norepi' or 'lactate'.",
+            )
+        with filter_cols[2]:
+            selected_source = st.selectbox(
+                "Filter by Source Table:", ["All"] + item_index.source_tables()
+            )
+        with filter_cols[1]:
+            # Filter categories based on the selected source table
+            selected_category = st.selectbox(
+                "Filter by Category:",
+                ["All"]
+                + item_index.categories(
+                    None if selected_source == "All" else selected_source
+                ),
+            )
+
+        search_hits = None
+        item_search_index = get_item_search_index(backend) if filter_text else None
+        if item_search_index is not None:
+            search_hits = annotate_hits(
+                item_search_index.search(filter_text, limit=SEARCH_HIT_LIMIT), item_types
+            )
+        filtered_items = item_index.filter(
+            filter_text,
+            category=None if selected_category == "All" else selected_category,
+            source_table=None if selected_source == "All" else selected_source,
+            ranked=None if search_hits is None else search_hits[search_hits["has_data"]],
+        )
+        st.caption(f"{len(filtered_items):,} of {len(item_index):,} items")
+        grid_event = st.dataframe(
+            filtered_items[GRID_COLUMNS],
+            hide_index=True,
+            use_container_width=True,
+            height=420,
+            on_select="rerun",
+            selection_mode="multi-row",
+            column_config={
+                "label": st.column_config.TextColumn("Item Name", width="large"),
+                "source_table": "Source Table",
+                "category": "Category",
+                "data_count": st.column_config.NumberColumn("Data Points", format="%d"),
+            },
+            # A new key per admission and filter starts with an empty selection
+            key=(
+                f"item_grid_{hadm_id}_{filter_text}_{selected_category}_"
+                f"{selected_source}_{st.session_state.item_grid_generation}"
+            ),
+        )
+
+        if search_hits is not None and not search_hits["has_data"].all():
+            # Dictionary matches this admission has no data for
+            missing_hits = search_hits[~search_hits["has_data"]].head(10)
+            st.caption(
+                "Not recorded in this admission: "
+                + "; ".join(describe_hit(hit) for hit in missing_hits.itertuples())
+            )
+
+        selected_rows = grid_event.selection.rows
+        if st.button(
+            f"Add {len(selected_rows)} selected item(s)",
+            disabled=not selected_rows,
+            type="primary",
+            key="add_selected_items",
+        ):
+            for item in item_index.records(filtered_items.index[selected_rows]):
+                add_item_to_selection(item)
+            st.session_state.item_grid_generation += 1
+            st.rerun()
+
+
+@fragment
+def render_visualization(subject_id, hadm_id, admission_start, admission_end):
+    """Time range slider and charts of the selected items."""
+    st.header("Visualize Items Over Time")
+    start_time, end_time = st.slider(
+        "Select time range to visualize:",
+        min_value=admission_start.to_pydatetime(),
+        max_value=admission_end.to_pydatetime(),
+        value=(
+            admission_start.to_pydatetime(),
+            admission_end.to_pydatetime(),
+        ),
+        format="MM/DD/YYYY - hh:mm a",
+    )
+
+    if st.session_state.selected_items:
+        st.write("---")
+        chart_layout = st.radio(
+            "Chart layout:",
+            ["Combined", "Separate"],
+            horizontal=True,
+            help="Combined draws every item in one figure with a shared, linked time axis.",
+        )
+        # Fetch every selected item up front with one query per source table
+        selected_event_data = backend.get_event_data_batch(
+            subject_id,
+            hadm_id,
+            [
+                (item["itemid"], item["source_table"])
+                for item in st.session_state.selected_items
+            ],
+            start_time,
+            end_time,
+        )
+        # Panels are cached per item and time window, so adding or
+        # removing an item only builds the panel that changed.
+        panel_cache = st.session_state.item_panels
+        panel_keys = []
+        combined_panels = []
+        for item in list(st.session_state.selected_items):
+            item_key_part = f"{item['itemid']}_{item['source_table']}"
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                if chart_layout == "Separate":
+                    st.subheader(
+                        f"Visualization for: {item['label']} ({item['source_table']})"
+                    )
+                else:
+                    st.markdown(f"**{item['label']}** ({item['source_table']})")
+            if col2.button("Remove", key=f"remove_{item_key_part}"):
+                remove_item_from_selection(item)
+                rerun_fragment()
+
+            panel_key = (
+                hadm_id,
+                item["itemid"],
+                item["source_table"],
+                start_time,
+                end_time,
+            )
+            panel_keys.append(panel_key)
+            if panel_key not in panel_cache:
+                event_data = selected_event_data.get(
+                    (item["itemid"], item["source_table"]), pd.DataFrame()
+                )
+                panel_cache[panel_key] = (
+                    None
+                    if event_data.empty
+                    else build_item_panel(
+                        item, event_data.copy(), subject_id, start_time, end_time
+                    )
+                )
+            panel = panel_cache[panel_key]
+
+            if panel is None:
+                st.warning(
+                    f"No data available for '{item['label']}' in the selected time range."
+                )
+            elif chart_layout == "Separate":
+                st.plotly_chart(panel.figure, use_container_width=True)
+                render_panel_details(panel)
+            else:
+                combined_panels.append((panel_key, panel))
+            if chart_layout == "Separate":
+                st.write("---")
+
+        for panel_key in list(panel_cache):
+            if panel_key not in panel_keys:
+                del panel_cache[panel_key]
+
+        if combined_panels:
+            combined_key = tuple(panel_key for panel_key, _ in combined_panels)
+            if st.session_state.combined_figure_key != combined_key:
+                st.session_state.combined_figure = combine_panels(
+                    [panel for _, panel in combined_panels], start_time, end_time
+                )
+                configure_chart_layout(st.session_state.combined_figure)
+                st.session_state.combined_figure_key = combined_key
+            st.plotly_chart(
+                st.session_state.combined_figure, use_container_width=True
+            )
+            for _, panel in combined_panels:
+                render_panel_details(panel, with_title=True)
+
+
 # --- Main App ---
-subject_id_input = st.text_input(
-    "Enter subject_id:", "11360891", on_change=reset_page_and_sort
-)
+subject_id_input = st.text_input("Enter subject_id:", "11360891")
 if subject_id_input:
     try:
         subject_id = int(subject_id_input)
-        admissions = get_admissions(subject_id)
+        admissions = backend.get_admissions(subject_id)
         if not admissions.empty:
             admissions["admit_date"] = pd.to_datetime(admissions["admittime"]).dt.date
             admissions["discharge_date"] = pd.to_datetime(
@@ -180,647 +940,39 @@ if subject_id_input:
 
             if selected_admission:
                 selected_hadm_id = selected_admission["hadm_id"]
-                # --- PATIENT AND ADMISSION DETAILS ---
-                st.header("Patient and Admission Details")
-                patient_info = get_patient_info(subject_id)
-                admission_info = get_admission_info(subject_id, selected_hadm_id)
-                admission_start_timestamp = pd.to_datetime(admission_info["admittime"])
-                admission_end_timestamp = pd.to_datetime(admission_info["dischtime"])
-                services = get_admission_services(subject_id, selected_hadm_id)
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Gender:** {patient_info['gender']}")
-                    anchor_date = pd.Timestamp(
-                        year=int(patient_info["anchor_year"]), month=1, day=1
-                    )
-                    admission_age = (
-                        float(patient_info["anchor_age"])
-                        + (admission_start_timestamp - anchor_date).days / 365.25
-                    )
-                    admission_age = round(admission_age, 1)
-                    st.write(f"**Age at Admission:** {admission_age}")
-                    st.write(f"**Insurance:** {admission_info['insurance']}")
-                    st.write(f"**Language:** {admission_info['language']}")
-                    st.write(f"**Marital Status:** {admission_info['marital_status']}")
-                    st.write(f"**Ethnicity:** {admission_info['race']}")
-                with col2:
-                    st.write(f"**Admission Time:** {admission_info['admittime']}")
-                    st.write(f"**Discharge Time:** {admission_info['dischtime']}")
-                    if services:
-                        st.write(f"**Services:** {services}")
-                    if pd.notna(patient_info["dod"]):
-                        st.write(f"**Date of Death:** {patient_info['dod']}")
-
-                # --- ICD INFORMATION ---
-                st.header("ICD Information")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.subheader("Diagnoses")
-                    st.dataframe(get_icd_diagnoses(subject_id, selected_hadm_id))
-                with col2:
-                    st.subheader("Procedures")
-                    st.dataframe(get_icd_procedures(subject_id, selected_hadm_id))
-
-                # --- DISCHARGE NOTES ---
-                st.header("Discharge Notes 📝")
-                discharge_notes = get_discharge_notes(subject_id, selected_hadm_id)
-                if discharge_notes:
-                    for note in discharge_notes:
-                        note_label = f"Type: {note.get('note_type', 'N/A')} | Sequence: {note.get('note_seq', 'N/A')} | Chart Time: {note.get('charttime', 'N/A')}"
-                        with st.expander(note_label):
-                            st.text(note.get("text", "Note text not available."))
-                else:
-                    st.info("No discharge notes found for this admission.")
-
-                # --- ICU STAYS ---
-                st.header("ICU Stays")
-                icu_stays = get_icu_info(subject_id, selected_hadm_id)
-
-                if not icu_stays.empty:
-                    # Create a timeline visualization for ICU stays
-                    icu_fig = go.Figure()
-
-                    # Process ICU stays data for visualization
-                    icu_stays["intime"] = pd.to_datetime(icu_stays["intime"])
-                    icu_stays["outtime"] = pd.to_datetime(icu_stays["outtime"])
-                    icu_stays["duration_hours"] = (
-                        icu_stays["outtime"] - icu_stays["intime"]
-                    ).dt.total_seconds() / 3600
-
-                    # Create segments for each ICU stay
-                    y_labels = []
-                    for idx, stay in enumerate(icu_stays.itertuples()):
-                        stay_label = f"ICU Stay {idx + 1} (ID: {stay.stay_id})"
-                        y_labels.append(stay_label)
-
-                        hover_text = f"ICU Stay {idx + 1}<br>ID: {stay.stay_id}<br>Start: {stay.intime.strftime('%Y-%m-%d %H:%M')}<br>End: {stay.outtime.strftime('%Y-%m-%d %H:%M')}<br>Duration: {stay.duration_hours:.1f} hours"
-
-                        icu_fig.add_trace(
-                            go.Scatter(
-                                x=[stay.intime, stay.outtime],
-                                y=[stay_label, stay_label],
-                                mode="lines",
-                                line=dict(width=10, color="#1f77b4"),
-                                name=stay_label,
-                                hoverinfo="text",
-                                text=hover_text,
-                                showlegend=False,
-                            )
-                        )
-
-                    # Add patient death marker if applicable
-                    death_y_value = None
-                    if pd.notna(patient_info["dod"]):
-                        death_date = pd.to_datetime(patient_info["dod"])
-                        # Check if death occurred during the admission period
-                        if (
-                            admission_info["admittime"]
-                            <= death_date
-                            <= admission_info["dischtime"]
-                        ):
-                            # Create death marker at end of day
-                            death_datetime = pd.Timestamp(
-                                death_date.year,
-                                death_date.month,
-                                death_date.day,
-                                23,
-                                59,
-                                59,
-                            )
-                            death_y_value = "Patient Death"
-                            y_labels.append(death_y_value)
-
-                            icu_fig.add_trace(
-                                go.Scatter(
-                                    x=[death_datetime],
-                                    y=[death_y_value],
-                                    mode="markers",
-                                    marker=dict(symbol="x", size=15, color="red"),
-                                    name="Death",
-                                    hoverinfo="text",
-                                    text=f"Date of Death: {death_date.strftime('%Y-%m-%d')}",
-                                    showlegend=True,
-                                )
-                            )
-
-                    # Display summary info in a table
-                    icu_summary = pd.DataFrame(
-                        {
-                            "ICU Stay": [
-                                f"Stay {idx+1} (ID: {stay.stay_id})"
-                                for idx, stay in enumerate(icu_stays.itertuples())
-                            ],
-                            "Start Time": icu_stays["intime"].dt.strftime(
-                                "%Y-%m-%d %H:%M"
-                            ),
-                            "End Time": icu_stays["outtime"].dt.strftime(
-                                "%Y-%m-%d %H:%M"
-                            ),
-                            "Duration (hours)": icu_stays["duration_hours"].round(1),
-                        }
-                    )
-
-                    st.dataframe(icu_summary)
-
-                    # Configure layout
-                    icu_fig.update_layout(
-                        title="ICU Stays Timeline",
-                        xaxis=dict(
-                            title="Time",
-                            range=[
-                                admission_info["admittime"],
-                                admission_info["dischtime"],
-                            ],
-                        ),
-                        yaxis=dict(
-                            title="", categoryorder="array", categoryarray=y_labels
-                        ),
-                        height=max(
-                            200, 100 + (len(y_labels) * 40)
-                        ),  # Adjust height based on number of stays
-                        margin=dict(l=10, r=10, t=30, b=10),
-                        hovermode="closest",
-                    )
-
-                    st.plotly_chart(icu_fig, use_container_width=True)
-                else:
-                    st.info("No ICU stays found for this admission.")
-
-                # --- Item Table with Pagination and Sorting ---
-                st.header("Available Patient Data Items")
-                item_types = get_item_types(
+                # Fetch all admission sections concurrently
+                admission_overview = backend.get_admission_overview(
                     subject_id,
                     selected_hadm_id,
-                    admission_start_timestamp,
-                    admission_end_timestamp,
+                    pd.to_datetime(selected_admission["admittime"]),
+                    pd.to_datetime(selected_admission["dischtime"]),
                 )
 
-                if not item_types.empty:
-                    initialize_default_items(item_types, selected_hadm_id)
-                    filter_cols = st.columns(3)
-                    with filter_cols[0]:
-                        filter_text = st.text_input(
-                            "Filter items by name:",
-                            on_change=lambda: st.session_state.update(page_number=0),
-                        ).lower()
-                    with filter_cols[2]:
-                        source_options = ["All"] + sorted(
-                            item_types["source_table"].dropna().unique().tolist()
-                        )
-                        selected_source = st.selectbox(
-                            "Filter by Source Table:",
-                            source_options,
-                            on_change=lambda: st.session_state.update(page_number=0),
-                        )
-                    with filter_cols[1]:
-                        # Filter categories based on the selected source table
-                        if selected_source != "All":
-                            filtered_categories = (
-                                item_types[
-                                    item_types["source_table"] == selected_source
-                                ]["category"]
-                                .dropna()
-                                .unique()
-                                .tolist()
-                            )
-                        else:
-                            filtered_categories = (
-                                item_types["category"].dropna().unique().tolist()
-                            )
-
-                        category_options = ["All"] + sorted(filtered_categories)
-                        selected_category = st.selectbox(
-                            "Filter by Category:",
-                            category_options,
-                            on_change=lambda: st.session_state.update(page_number=0),
-                        )
+                patient_info = admission_overview["patient_info"]
+                admission_info = admission_overview["admission_info"]
 
-                    filtered_items = item_types
-                    if filter_text:
-                        filtered_items = filtered_items[
-                            filtered_items["label"]
-                            .str.lower()
-                            .str.contains(filter_text)
-                        ]
-                    if selected_category != "All":
-                        filtered_items = filtered_items[
-                            filtered_items["category"] == selected_category
-                        ]
-                    if selected_source != "All":
-                        filtered_items = filtered_items[
-                            filtered_items["source_table"] == selected_source
-                        ]
-
-                    sorted_items = filtered_items.sort_values(
-                        by=st.session_state.sort_by,
-                        ascending=st.session_state.sort_ascending,
-                    ).reset_index(drop=True)
-
-                    PAGE_SIZE = 15
-                    page_number = st.session_state.page_number
-                    start_index = page_number * PAGE_SIZE
-                    end_index = min(start_index + PAGE_SIZE, len(sorted_items))
-                    total_pages = (len(sorted_items) + PAGE_SIZE - 1) // PAGE_SIZE
-                    items_to_display_on_page = sorted_items.iloc[start_index:end_index]
-
-                    # --- CHANGES START HERE ---
-                    sort_icon = "🔼" if st.session_state.sort_ascending else "🔽"
-                    # Add columns for Category and Data Points Count
-                    header_cols = st.columns((3, 1.5, 1.5, 1.5, 1))
-
-                    with header_cols[0]:
-                        header_cols[0].button(
-                            f"Item Name {sort_icon if st.session_state.sort_by == 'label' else ''}",
-                            on_click=handle_sort,
-                            args=("label",),
-                        )
-                    with header_cols[1]:
-                        header_cols[1].button(
-                            f"Source Table {sort_icon if st.session_state.sort_by == 'source_table' else ''}",
-                            on_click=handle_sort,
-                            args=("source_table",),
-                        )
-                    # Add the Category sort button
-                    with header_cols[2]:
-                        header_cols[2].button(
-                            f"Category {sort_icon if st.session_state.sort_by == 'category' else ''}",
-                            on_click=handle_sort,
-                            args=("category",),
-                        )
-                    # Add the Data Points Count sort button
-                    with header_cols[3]:
-                        header_cols[3].button(
-                            f"Data Points {sort_icon if st.session_state.sort_by == 'data_count' else ''}",
-                            on_click=handle_sort,
-                            args=("data_count",),
-                        )
-                    header_cols[4].markdown("**Action**")
-                    st.markdown("---")
-
-                    # Display the category and data points count for each item
-                    for index, row in items_to_display_on_page.iterrows():
-                        col1, col2, col3, col4, col5 = st.columns((3, 1.5, 1.5, 1.5, 1))
-                        col1.write(row["label"])
-                        col2.write(row["source_table"])
-                        col3.write(row["category"])  # Display the category
-                        # Ensure data_count is an integer and handle NaN values
-                        data_count = row.get("data_count", 0)
-                        if pd.isna(data_count):
-                            data_count = 0
-                        col4.write(
-                            int(data_count)
-                        )  # Display the data points count as integer
-                        if col5.button(
-                            "Add", key=f"add_{row['itemid']}_{row['source_table']}"
-                        ):
-                            add_item_to_selection(row.to_dict())
-                            st.rerun()
-                    # --- CHANGES END HERE ---
-
-                    st.markdown("---")
-
-                    p_cols = st.columns([2, 1, 2])
-                    if p_cols[0].button("⬅️ Previous", disabled=(page_number == 0)):
-                        st.session_state.page_number -= 1
-                        st.rerun()
-                    p_cols[1].write(f"Page {page_number + 1} of {total_pages}")
-                    if p_cols[2].button(
-                        "Next ➡️", disabled=(page_number >= total_pages - 1)
-                    ):
-                        st.session_state.page_number += 1
-                        st.rerun()
-
-                # --- Visualization Widget ---
-                st.header("Visualize Items Over Time")
-                start_time, end_time = st.slider(
-                    "Select time range to visualize:",
-                    min_value=admission_start_timestamp.to_pydatetime(),
-                    max_value=admission_end_timestamp.to_pydatetime(),
-                    value=(
-                        admission_start_timestamp.to_pydatetime(),
-                        admission_end_timestamp.to_pydatetime(),
-                    ),
-                    format="MM/DD/YYYY - hh:mm a",
+                # Each section is a fragment whose inputs are passed explicitly,
+                # so interacting with one section reruns only that section.
+                render_admission_details(
+                    patient_info, admission_info, admission_overview["services"]
+                )
+                render_icd_information(
+                    admission_overview["icd_diagnoses"],
+                    admission_overview["icd_procedures"],
+                )
+                render_clinical_notes(
+                    admission_overview["notes"], subject_id, selected_hadm_id
+                )
+                render_icu_stays(
+                    admission_overview["icu_stays"], patient_info, admission_info
+                )
+                render_item_browser(admission_overview["item_types"], selected_hadm_id)
+                render_visualization(
+                    subject_id,
+                    selected_hadm_id,
+                    pd.to_datetime(admission_info["admittime"]),
+                    pd.to_datetime(admission_info["dischtime"]),
                 )
-
-                if st.session_state.selected_items:
-                    st.write("---")
-                    for item in list(st.session_state.selected_items):
-                        item_key_part = f"{item['itemid']}_{item['source_table']}"
-                        col1, col2 = st.columns([4, 1])
-                        with col1:
-                            st.subheader(
-                                f"Visualization for: {item['label']} ({item['source_table']})"
-                            )
-                        if col2.button("Remove", key=f"remove_{item_key_part}"):
-                            remove_item_from_selection(item)
-                            st.rerun()
-
-                        event_data = get_event_data(
-                            subject_id,
-                            selected_hadm_id,
-                            item["itemid"],
-                            item["source_table"],
-                            start_time,
-                            end_time,
-                        )
-
-                        if not event_data.empty:
-                            fig = go.Figure()
-                            source_table = item["source_table"]
-
-                            if source_table == "ecgevents":
-                                event_data["ecg_time"] = pd.to_datetime(
-                                    event_data["ecg_time"]
-                                )
-                                event_data = event_data.sort_values(by="ecg_time")
-                                event_data["series_label"] = item["label"]
-                                if "text" in event_data.columns:
-
-                                    def wrap_hover_text(value):
-                                        if isinstance(value, str) and value.strip():
-                                            wrapped_lines = textwrap.wrap(
-                                                value, width=70
-                                            )
-                                            return "<br>".join(wrapped_lines)
-                                        return value
-
-                                    event_data["text"] = event_data["text"].apply(
-                                        wrap_hover_text
-                                    )
-                                event_data["hover_label"] = "ECG measurement"
-                                if "study_id" in event_data.columns:
-                                    subject_identifier_formatted = (
-                                        f"{int(subject_id):08d}"
-                                    )
-
-                                    def build_hover_label(row):
-                                        hover_lines = []
-                                        ecg_time_value = row.get("ecg_time")
-                                        if pd.notna(ecg_time_value):
-                                            hover_lines.append(
-                                                f"<b>ECG Time:</b> {ecg_time_value}"
-                                            )
-                                        text_value = row.get("text")
-                                        if (
-                                            isinstance(text_value, str)
-                                            and text_value.strip()
-                                        ):
-                                            hover_lines.append(
-                                                f"<b>Details:</b> {text_value}"
-                                            )
-                                        if not hover_lines:
-                                            return "ECG measurement"
-                                        return "<br>".join(hover_lines)
-
-                                    event_data["hover_label"] = event_data.apply(
-                                        build_hover_label, axis=1
-                                    )
-
-                                fig = px.scatter(
-                                    event_data,
-                                    x="ecg_time",
-                                    y="series_label",
-                                    title=f"ECG Scatter for {item['label']}",
-                                    custom_data=["hover_label"],
-                                    hover_data=[],
-                                )
-                                fig.update_traces(marker=dict(size=9))
-                                fig.update_traces(
-                                    hovertemplate="%{customdata[0]}<extra></extra>"
-                                )
-                                configure_chart_layout(fig)
-                                fig.update_xaxes(range=[start_time, end_time])
-                                fig.update_yaxes(title="")
-                                st.plotly_chart(fig, use_container_width=True)
-                                if "study_id" in event_data.columns:
-                                    link_rows = event_data.copy()
-                                    link_rows["ecg_time"] = pd.to_datetime(
-                                        link_rows["ecg_time"], errors="coerce"
-                                    )
-                                    link_rows["study_id"] = pd.to_numeric(
-                                        link_rows["study_id"], errors="coerce"
-                                    )
-                                    link_rows = link_rows.dropna(
-                                        subset=["ecg_time", "study_id"]
-                                    ).sort_values("ecg_time")
-                                    if not link_rows.empty:
-                                        st.markdown("**ECG Waveform Links**")
-                                        link_labels = []
-                                        subject_identifier_formatted = (
-                                            f"{int(subject_id):08d}"
-                                        )
-                                        for link_row in link_rows.itertuples():
-                                            timestamp_full = link_row.ecg_time.strftime(
-                                                "%Y-%m-%d %H:%M:%S"
-                                            )
-                                            timestamp_label = (
-                                                link_row.ecg_time.strftime(
-                                                    "%m-%d %H:%M"
-                                                )
-                                            )
-                                            study_identifier_formatted = (
-                                                f"{int(link_row.study_id):08d}"
-                                            )
-                                            locator = f"ecg/p{subject_identifier_formatted}/s{study_identifier_formatted}"
-                                            label = f"[{timestamp_label}]"
-                                            link_labels.append(
-                                                f'<a href="/?path={locator}" target="_blank" rel="noopener noreferrer" title="{timestamp_full}">'
-                                                f"{label}"
-                                                "</a>"
-                                            )
-                                        st.markdown(
-                                            " ".join(link_labels),
-                                            unsafe_allow_html=True,
-                                        )
-                                st.write("---")
-                                continue
-
-                            time_col = (
-                                "charttime"
-                                if source_table
-                                in ["chartevents", "datetimeevents", "labevents"]
-                                else "starttime"
-                            )
-                            event_data[time_col] = pd.to_datetime(event_data[time_col])
-                            event_data = event_data.sort_values(by=time_col)
-
-                            # For numerical data types (chartevents, outputevents, labevents)
-                            if source_table in [
-                                "chartevents",
-                                "outputevents",
-                                "labevents",
-                            ]:
-                                event_data["value_numeric"] = pd.to_numeric(
-                                    event_data["value"], errors="coerce"
-                                )
-                                if event_data["value_numeric"].notna().any():
-                                    # Add unit information to the title if available
-                                    unit_info = ""
-                                    if (
-                                        "unit" in event_data.columns
-                                        and not event_data["unit"].isna().all()
-                                    ):
-                                        unit = event_data["unit"].iloc[0]
-                                        if pd.notna(unit):
-                                            unit_info = f" ({unit})"
-
-                                    fig = px.line(
-                                        event_data.dropna(subset=["value_numeric"]),
-                                        x=time_col,
-                                        y="value_numeric",
-                                        title=f"Line Plot for {item['label']}{unit_info}",
-                                        markers=True,
-                                    )
-
-                                    # Add reference ranges for lab values if available
-                                    if (
-                                        source_table == "labevents"
-                                        and "ref_range_lower" in event_data.columns
-                                        and "ref_range_upper" in event_data.columns
-                                    ):
-                                        # Check if we have valid reference ranges
-                                        has_lower = (
-                                            not event_data["ref_range_lower"]
-                                            .isna()
-                                            .all()
-                                        )
-                                        has_upper = (
-                                            not event_data["ref_range_upper"]
-                                            .isna()
-                                            .all()
-                                        )
-
-                                        if has_lower or has_upper:
-                                            # Use the first non-null value for reference ranges
-                                            lower_val = (
-                                                event_data["ref_range_lower"]
-                                                .dropna()
-                                                .iloc[0]
-                                                if has_lower
-                                                else None
-                                            )
-                                            upper_val = (
-                                                event_data["ref_range_upper"]
-                                                .dropna()
-                                                .iloc[0]
-                                                if has_upper
-                                                else None
-                                            )
-
-                                            # Add reference range lines
-                                            if lower_val is not None:
-                                                fig.add_hline(
-                                                    y=lower_val,
-                                                    line_dash="dash",
-                                                    line_color="orange",
-                                                    annotation_text="Lower reference",
-                                                    annotation_position="bottom right",
-                                                )
-                                            if upper_val is not None:
-                                                fig.add_hline(
-                                                    y=upper_val,
-                                                    line_dash="dash",
-                                                    line_color="orange",
-                                                    annotation_text="Upper reference",
-                                                    annotation_position="top right",
-                                                )
-                                else:
-                                    fig = px.scatter(
-                                        event_data,
-                                        x=time_col,
-                                        y="value",
-                                        title=f"Scatter Plot for {item['label']}",
-                                        hover_data=event_data.columns,
-                                    )
-                            elif source_table == "datetimeevents":
-                                fig = px.scatter(
-                                    event_data,
-                                    x=time_col,
-                                    y=["Event"] * len(event_data),
-                                    title=f"Events for {item['label']}",
-                                    hover_data=event_data.columns,
-                                )
-                            # For timeline-based data (ingredientevents, inputevents, procedureevents, prescriptions)
-                            elif source_table in [
-                                "ingredientevents",
-                                "inputevents",
-                                "procedureevents",
-                                "prescriptions",
-                            ]:
-                                # Handle end time column name differences
-                                end_time_col = (
-                                    "endtime"
-                                    if "endtime" in event_data.columns
-                                    else "stoptime"
-                                )
-
-                                if end_time_col in event_data.columns:
-                                    event_data[end_time_col] = pd.to_datetime(
-                                        event_data[end_time_col]
-                                    )
-
-                                    for _, row in event_data.iterrows():
-                                        # When the start and end times are within a
-                                        # minute of each other the segment would
-                                        # collapse to a point. Add a small padding to
-                                        # ensure it is visible.
-                                        start_val = row[time_col]
-                                        # If endtime/stoptime is null or too short, use starttime + 1 hour as default
-                                        if pd.isna(row[end_time_col]):
-                                            end_val = start_val + pd.Timedelta(hours=1)
-                                        else:
-                                            end_val = row[end_time_col]
-
-                                        if abs(end_val - start_val) <= pd.Timedelta(
-                                            hours=1
-                                        ):
-                                            end_val = start_val + pd.Timedelta(hours=1)
-
-                                        hover_text = "<br>".join(
-                                            f"{col}: {row[col]}"
-                                            for col in event_data.columns
-                                        )
-
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=[start_val, end_val],
-                                                y=[item["label"], item["label"]],
-                                                mode="lines",
-                                                line=dict(width=10),
-                                                hoverinfo="text",
-                                                text=hover_text,
-                                                showlegend=False,
-                                            )
-                                        )
-                                    # Add custom title based on source table
-                                    title_prefix = (
-                                        "Prescription"
-                                        if source_table == "prescriptions"
-                                        else "Timeline"
-                                    )
-                                    fig.update_layout(
-                                        title=f"{title_prefix} for {item['label']}"
-                                    )
-                                else:
-                                    # If no endtime column, create a simple scatter plot
-                                    fig = px.scatter(
-                                        event_data,
-                                        x=time_col,
-                                        y=[item["label"]] * len(event_data),
-                                        title=f"Events for {item['label']}",
-                                        hover_data=event_data.columns,
-                                    )
-
-                            configure_chart_layout(fig)
-                            fig.update_xaxes(range=[start_time, end_time])
-                            st.plotly_chart(fig, use_container_width=True)
-                        else:
-                            st.warning(
-                                f"No data available for '{item['label']}' in the selected time range."
-                            )
-                        st.write("---")
 
     except ValueError:
         st.error("Please enter a valid numerical subject ID.")
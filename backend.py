@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence, Tuple
+
+import pandas as pd
+import streamlit as st
+
+import utils
+from db_connections import get_arg_value
+from dictionaries import DictionaryTable
+
+
+class DataBackend(Protocol):
+    """Data access used by app.py, implemented once per storage engine."""
+
+    name: str
+
+    def describe(self) -> str: ...
+
+    def get_admissions(self, subject_id) -> pd.DataFrame: ...
+
+    def get_patient_info(self, subject_id) -> Optional[pd.Series]: ...
+
+    def get_admission_info(self, subject_id, hadm_id) -> Optional[pd.Series]: ...
+
+    def get_admission_services(self, subject_id, hadm_id) -> str: ...
+
+    def get_icu_info(self, subject_id, hadm_id) -> pd.DataFrame: ...
+
+    def get_icd_diagnoses(self, subject_id, hadm_id) -> pd.DataFrame: ...
+
+    def get_icd_procedures(self, subject_id, hadm_id) -> pd.DataFrame: ...
+
+    def get_item_types(
+        self, subject_id, hadm_id, admission_start=None, admission_end=None
+    ) -> pd.DataFrame: ...
+
+    def get_event_data_batch(
+        self, subject_id, hadm_id, items: Sequence[Tuple[Any, str]], start_time, end_time
+    ) -> Dict[Tuple[Any, str], pd.DataFrame]: ...
+
+    def get_discharge_notes(self, subject_id, hadm_id) -> List[Dict[str, Any]]: ...
+
+    def get_notes(self, subject_id, hadm_id) -> List[Dict[str, Any]]: ...
+
+    def get_ecg_measurements(
+        self, subject_id, start_time=None, end_time=None
+    ) -> pd.DataFrame: ...
+
+    def get_admission_overview(
+        self, subject_id, hadm_id, admission_start, admission_end
+    ) -> Dict[str, Any]: ...
+
+    def get_dictionary(self, table: str) -> DictionaryTable: ...
+
+
+class MySQLBackend:
+    """The utils.py readers: MySQL for MIMIC-IV tables, MongoDB for notes and ECG."""
+
+    name = "mysql"
+
+    def describe(self) -> str:
+        return "MySQL + MongoDB"
+
+    get_admissions = staticmethod(utils.get_admissions)
+    get_patient_info = staticmethod(utils.get_patient_info)
+    get_admission_info = staticmethod(utils.get_admission_info)
+    get_admission_services = staticmethod(utils.get_admission_services)
+    get_icu_info = staticmethod(utils.get_icu_info)
+    get_icd_diagnoses = staticmethod(utils.get_icd_diagnoses)
+    get_icd_procedures = staticmethod(utils.get_icd_procedures)
+    get_item_types = staticmethod(utils.get_item_types)
+    get_event_data_batch = staticmethod(utils.get_event_data_batch)
+    get_discharge_notes = staticmethod(utils.get_discharge_notes)
+    get_notes = staticmethod(utils.get_notes)
+    get_ecg_measurements = staticmethod(utils.get_ecg_measurements)
+    get_admission_overview = staticmethod(utils.get_admission_overview)
+    get_dictionary = staticmethod(utils.get_dictionary)
+
+
+def _create_mysql_backend() -> Optional[DataBackend]:
+    return MySQLBackend()
+
+
+def _create_parquet_backend() -> Optional[DataBackend]:
+    from parquet_backend import MANIFEST_FILE_NAME, ParquetBackend
+
+    argument_value = get_arg_value("--parquet-dir")
+    if not argument_value:
+        st.error("Parquet directory not provided. Use --parquet-dir argument.")
+        return None
+
+    root_directory = Path(argument_value).expanduser()
+    if not (root_directory / MANIFEST_FILE_NAME).exists():
+        st.error(
+            f"No Parquet extract found in {root_directory}. "
+            "Run scripts/export_parquet.py first."
+        )
+        return None
+    return ParquetBackend(root_directory)
+
+
+def _create_fixture_backend() -> Optional[DataBackend]:
+    from fixture_backend import FixtureBackend
+
+    argument_value = get_arg_value("--fixture-dir")
+    if not argument_value:
+        st.error("Fixture directory not provided. Use --fixture-dir argument.")
+        return None
+    return FixtureBackend(Path(argument_value).expanduser())
+
+
+# Backend name accepted by --backend -> factory returning the backend or None
+BACKENDS: Dict[str, Callable[[], Optional[DataBackend]]] = {
+    "mysql": _create_mysql_backend,
+    "parquet": _create_parquet_backend,
+    "fixture": _create_fixture_backend,
+}
+
+
+def get_backend_name() -> str:
+    """Return the backend selected with --backend (default: mysql, or parquet with --parquet-dir)."""
+    argument_value = get_arg_value("--backend")
+    if argument_value:
+        return argument_value
+    return "parquet" if get_arg_value("--parquet-dir") else "mysql"
+
+
+@st.cache_resource
+def get_backend() -> Optional[DataBackend]:
+    """Create and cache the data backend selected on the command line."""
+    backend_name = get_backend_name()
+    backend_factory = BACKENDS.get(backend_name)
+    if backend_factory is None:
+        st.error(
+            f"Unknown backend {backend_name!r}. "
+            f"Use --backend {'|'.join(BACKENDS)}."
+        )
+        return None
+    return backend_factory()
@@ -0,0 +1,177 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Above this many segments a timeline is drawn with WebGL instead of SVG.
+WEBGL_SEGMENT_THRESHOLD = 500
+MINIMUM_SEGMENT_DURATION = pd.Timedelta(hours=1)
+
+
+def hover_texts(frame: pd.DataFrame) -> pd.Series:
+    """Return one '<col>: <value><br>...' hover string per row, built column-wise."""
+    texts = pd.Series("", index=frame.index, dtype=object)
+    for position, column in enumerate(frame.columns):
+        separator = "" if position == 0 else "<br>"
+        texts = texts + f"{separator}{column}: " + frame[column].map(str)
+    return texts
+
+
+def timeline_segments(
+    frame: pd.DataFrame,
+    start_column: str,
+    end_column: str,
+    minimum_duration: pd.Timedelta = MINIMUM_SEGMENT_DURATION,
+) -> Tuple[pd.Series, pd.Series]:
+    """
+    Return start and end times of each row's segment.
+
+    Missing ends and segments no longer than minimum_duration are widened to
+    start + minimum_duration so that short events stay visible.
+    """
+    starts = pd.to_datetime(frame[start_column])
+    ends = pd.to_datetime(frame[end_column])
+    padded_ends = starts + minimum_duration
+    too_short = ends.isna() | ((ends - starts).abs() <= minimum_duration)
+    return starts, ends.where(~too_short, padded_ends)
+
+
+def _interleave_with_gaps(*columns: Sequence) -> np.ndarray:
+    """Interleave equal-length columns row-wise, with a None after each row."""
+    row_count = len(columns[0])
+    stride = len(columns) + 1
+    values = np.full(row_count * stride, None, dtype=object)
+    for offset, column in enumerate(columns):
+        values[offset::stride] = np.asarray(column, dtype=object)
+    return values
+
+
+def segment_trace(
+    starts: pd.Series,
+    ends: pd.Series,
+    y_values: Union[str, Sequence[str]],
+    texts: Union[str, Sequence[str]],
+    color: Optional[str] = None,
+    width: int = 10,
+    name: Optional[str] = None,
+) -> Union[go.Scatter, go.Scattergl]:
+    """
+    Draw many horizontal segments as one trace.
+
+    Segments are joined into a single line broken by None gaps, so a
+    thousand infusions cost one trace instead of a thousand; large
+    timelines switch to Scattergl.
+    """
+    segment_count = len(starts)
+    if isinstance(y_values, str):
+        y_values = [y_values] * segment_count
+    if isinstance(texts, str):
+        texts = [texts] * segment_count
+
+    trace_class = go.Scattergl if segment_count > WEBGL_SEGMENT_THRESHOLD else go.Scatter
+    return trace_class(
+        x=_interleave_with_gaps(starts.astype(object), ends.astype(object)),
+        y=_interleave_with_gaps(y_values, y_values),
+        text=_interleave_with_gaps(texts, texts),
+        mode="lines",
+        line=dict(width=width, color=color),
+        connectgaps=False,
+        hoverinfo="text",
+        name=name,
+        showlegend=False,
+    )
+
+
+def build_timeline_figure(
+    event_data: pd.DataFrame,
+    start_column: str,
+    end_column: str,
+    label: str,
+    title: str,
+) -> go.Figure:
+    """Plot an item's interval events (infusions, procedures, prescriptions) as one trace."""
+    event_data = event_data[pd.to_datetime(event_data[start_column]).notna()]
+    starts, ends = timeline_segments(event_data, start_column, end_column)
+    figure = go.Figure(segment_trace(starts, ends, label, hover_texts(event_data).tolist()))
+    figure.update_layout(title=title)
+    return figure
+
+
+@dataclass
+class ItemPanel:
+    """One selected item's chart and the notes shown beneath it."""
+
+    figure: go.Figure
+    note: Optional[str] = None
+    links_html: Optional[str] = None
+
+    @property
+    def title(self) -> str:
+        return self.figure.layout.title.text or ""
+
+
+def _axis_reference(reference: Optional[str], row: int) -> Optional[str]:
+    """Point an 'x', 'y' or 'x domain' style reference at the axes of a subplot row."""
+    if not reference or reference[0] not in "xy":
+        return reference
+    axis, _, domain = reference.partition(" ")
+    axis_number = "" if row == 1 else str(row)
+    return f"{axis[0]}{axis_number}" + (f" {domain}" if domain else "")
+
+
+def combine_panels(
+    panels: Sequence[ItemPanel],
+    start_time,
+    end_time,
+    row_height: int = 260,
+) -> go.Figure:
+    """
+    Stack item panels into one figure with a shared, linked time axis.
+
+    Traces, reference lines and y axis settings are copied from each panel
+    into its own row, so the browser receives one figure and zooming any row
+    zooms them all.
+    """
+    row_count = max(1, len(panels))
+    figure = make_subplots(
+        rows=row_count,
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=min(0.08, 0.4 / row_count),
+        subplot_titles=[panel.title for panel in panels],
+    )
+    for row, panel in enumerate(panels, start=1):
+        for trace in panel.figure.data:
+            figure.add_trace(trace, row=row, col=1)
+        for shape in panel.figure.layout.shapes:
+            figure.add_shape(
+                shape.to_plotly_json()
+                | {"xref": _axis_reference(shape.xref, row), "yref": _axis_reference(shape.yref, row)}
+            )
+        for annotation in panel.figure.layout.annotations:
+            figure.add_annotation(
+                annotation.to_plotly_json()
+                | {
+                    "xref": _axis_reference(annotation.xref, row),
+                    "yref": _axis_reference(annotation.yref, row),
+                }
+            )
+        source_axis = panel.figure.layout.yaxis
+        figure.update_yaxes(
+            title_text=source_axis.title.text,
+            categoryorder=source_axis.categoryorder,
+            categoryarray=source_axis.categoryarray,
+            row=row,
+            col=1,
+        )
+
+    figure.update_xaxes(range=[start_time, end_time])
+    figure.update_layout(
+        height=max(300, row_height * row_count),
+        showlegend=False,
+        hovermode="closest",
+    )
+    return figure
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from db_connections import get_arg_value
+
+DEFAULT_FETCH_WORKERS = 8
+
+
+def get_fetch_worker_count() -> int:
+    """Return the worker limit configured with --fetch-workers."""
+    argument_value = get_arg_value("--fetch-workers")
+    return int(argument_value) if argument_value else DEFAULT_FETCH_WORKERS
+
+
+def _attach_script_run_context(script_run_context: Optional[Any]) -> None:
+    """Let worker threads call Streamlit APIs on behalf of the calling session."""
+    if script_run_context is not None:
+        add_script_run_ctx(threading.current_thread(), script_run_context)
+
+
+def run_parallel(
+    tasks: Dict[str, Tuple[Callable, Sequence[Any]]],
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Run independent fetches on a bounded thread pool and collect their results.
+
+    Args:
+        tasks: Mapping of result name to (function, positional arguments).
+        max_workers: Upper bound on concurrent workers, defaults to --fetch-workers.
+
+    Returns:
+        Mapping of result name to the function's return value. The first
+        exception raised by a task is re-raised once all tasks have finished.
+    """
+    if not tasks:
+        return {}
+
+    worker_count = min(len(tasks), max_workers or get_fetch_worker_count())
+    if worker_count <= 1:
+        return {name: function(*arguments) for name, (function, arguments) in tasks.items()}
+
+    with ThreadPoolExecutor(
+        max_workers=worker_count,
+        thread_name_prefix="fetch",
+        initializer=_attach_script_run_context,
+        initargs=(get_script_run_ctx(),),
+    ) as executor:
+        futures = {
+            name: executor.submit(function, *arguments)
+            for name, (function, arguments) in tasks.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
@@ -1,8 +1,13 @@
+import threading
+from contextlib import contextmanager
+
 import mysql.connector
 from pymongo import MongoClient
 import streamlit as st
 import sys
 
+from mysql_pool import MySQLConnectionPool
+
 
 def get_arg_value(arg_name):
     """Parses sys.argv to find the value for a given named argument."""
@@ -19,12 +24,22 @@ def get_arg_value(arg_name):
         return None
 
 
+DEFAULT_MYSQL_POOL_SIZE = 8
+DEFAULT_MYSQL_POOL_OVERFLOW = 4
+DEFAULT_MYSQL_POOL_IDLE_TIMEOUT = 300.0
+DEFAULT_MYSQL_POOL_TIMEOUT = 30.0
+
+
 @st.cache_resource
-def _create_mysql_connection():
-    """Create and return a new MySQL connection object."""
+def _create_mysql_pool():
+    """Create and return the process-wide MySQL connection pool."""
     host = get_arg_value("--mysql-host")
     user = get_arg_value("--mysql-user")
     password = get_arg_value("--mysql-password")
+    pool_size = get_arg_value("--mysql-pool-size")
+    pool_overflow = get_arg_value("--mysql-pool-overflow")
+    pool_idle_timeout = get_arg_value("--mysql-pool-idle-timeout")
+    pool_timeout = get_arg_value("--mysql-pool-timeout")
 
     if not all([host, user, password]):
         st.error(
@@ -37,8 +52,20 @@ def _create_mysql_connection():
         return None
 
     try:
-        return mysql.connector.connect(
-            host=host, user=user, password=password, database="mimic4"
+        return MySQLConnectionPool(
+            dict(host=host, user=user, password=password, database="mimic4"),
+            pool_size=int(pool_size) if pool_size else DEFAULT_MYSQL_POOL_SIZE,
+            max_overflow=(
+                int(pool_overflow) if pool_overflow else DEFAULT_MYSQL_POOL_OVERFLOW
+            ),
+            idle_timeout=(
+                float(pool_idle_timeout)
+                if pool_idle_timeout
+                else DEFAULT_MYSQL_POOL_IDLE_TIMEOUT
+            ),
+            checkout_timeout=(
+                float(pool_timeout) if pool_timeout else DEFAULT_MYSQL_POOL_TIMEOUT
+            ),
         )
     except mysql.connector.Error as err:
         st.error(f"Error connecting to MySQL: {err}")
@@ -47,25 +74,55 @@ def _create_mysql_connection():
 
 
 def get_mysql_connection():
-    """Return an active MySQL connection, reconnecting if necessary."""
-    def ensure_connection(connection_object):
-        """Verify connection liveliness and reconnect when needed."""
-        if connection_object is None:
-            return None
-        try:
-            connection_object.ping(reconnect=True, attempts=3, delay=2)
-            return connection_object
-        except (AttributeError, mysql.connector.Error):
-            return None
-
-    connection = _create_mysql_connection()
-    connection = ensure_connection(connection)
-    if connection is not None:
-        return connection
-
-    _create_mysql_connection.clear()
-    connection = ensure_connection(_create_mysql_connection())
-    return connection
+    """Check out a pooled MySQL connection; close() returns it to the pool."""
+    connection_pool = _create_mysql_pool()
+    if connection_pool is None:
+        _create_mysql_pool.clear()
+        return None
+
+    try:
+        return connection_pool.acquire()
+    except mysql.connector.Error as err:
+        st.error(f"Error connecting to MySQL: {err}")
+        return None
+
+
+def get_mysql_pool_stats():
+    """Return checkout, wait-time and reconnect metrics of the MySQL pool."""
+    connection_pool = _create_mysql_pool()
+    if connection_pool is None:
+        return {}
+    return connection_pool.stats()
+
+
+_unavailable_reads = threading.local()
+
+
+def mark_source_unavailable():
+    """Record that a read on this thread ran without its database."""
+    _unavailable_reads.count = unavailable_read_count() + 1
+
+
+def unavailable_read_count():
+    """Return how many reads on this thread found their database unavailable."""
+    return getattr(_unavailable_reads, "count", 0)
+
+
+@contextmanager
+def mysql_connection():
+    """Yield a pooled MySQL connection (or None) and return it when done."""
+    connection = get_mysql_connection()
+    if connection is None:
+        mark_source_unavailable()
+    try:
+        yield connection
+    except BaseException:
+        if connection is not None:
+            connection.mark_failed()
+        raise
+    finally:
+        if connection is not None:
+            connection.close()
 
 
 @st.cache_resource
@@ -0,0 +1,160 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Key and value columns kept in memory for each dictionary table.
+DICTIONARY_COLUMNS: Dict[str, Tuple[List[str], List[str]]] = {
+    "d_items": (["itemid"], ["label", "abbreviation", "category"]),
+    "d_labitems": (["itemid"], ["label", "fluid", "category"]),
+    "d_icd_diagnoses": (["icd_code", "icd_version"], ["long_title"]),
+    "d_icd_procedures": (["icd_code", "icd_version"], ["long_title"]),
+}
+
+
+@dataclass(frozen=True)
+class DictionaryTable:
+    """
+    A static d_* table held in memory, indexed by its key columns.
+
+    Text columns are stored as categoricals, so repeated categories and
+    fluids cost one integer per row, and joins are positional lookups
+    against a unique index instead of hash merges.
+    """
+
+    table: str
+    version: int
+    index: pd.Index
+    values: pd.DataFrame
+
+    @classmethod
+    def build(cls, table: str, frame: pd.DataFrame, version: int) -> "DictionaryTable":
+        """Index a dictionary table read from any backend."""
+        key_columns, value_columns = DICTIONARY_COLUMNS[table]
+        frame = frame.reindex(columns=key_columns + value_columns)
+        frame = frame.drop_duplicates(subset=key_columns).reset_index(drop=True)
+        if len(key_columns) == 1:
+            index = pd.Index(frame[key_columns[0]])
+        else:
+            index = pd.MultiIndex.from_frame(frame[key_columns])
+        values = pd.DataFrame(
+            {column: frame[column].astype("category") for column in value_columns}
+        )
+        return cls(table=table, version=version, index=index, values=values)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def key_columns(self) -> List[str]:
+        return DICTIONARY_COLUMNS[self.table][0]
+
+    def memory_bytes(self) -> int:
+        return int(
+            self.index.memory_usage(deep=True)
+            + self.values.memory_usage(index=False, deep=True).sum()
+        )
+
+    def frame(self) -> pd.DataFrame:
+        """Return the whole table as a plain DataFrame with its key columns."""
+        keys = self.index.to_frame(index=False)
+        return pd.concat(
+            [keys, self.values.apply(lambda column: column.astype(object))], axis=1
+        )
+
+    def join(
+        self, frame: pd.DataFrame, columns: Optional[Sequence[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Add dictionary columns to the rows of frame whose keys are present.
+
+        Equivalent to pd.merge(frame, dictionary, on=key_columns), keeping
+        the order of frame, but looked up by position in the prebuilt index.
+
+        Args:
+            frame: Rows carrying the key columns.
+            columns: Dictionary columns to add, all of them by default.
+
+        Returns:
+            The matching rows of frame with the dictionary columns appended.
+        """
+        key_columns = self.key_columns
+        if len(key_columns) == 1:
+            keys = pd.Index(frame[key_columns[0]])
+        else:
+            keys = pd.MultiIndex.from_frame(frame[key_columns])
+        positions = self.index.get_indexer(keys)
+        matched = positions >= 0
+        joined = frame.loc[matched].reset_index(drop=True)
+        for column in columns or self.values.columns:
+            categorical = self.values[column].array
+            codes = categorical.codes[positions[matched]]
+            # Code -1 marks a missing value in the dictionary
+            labels = np.append(categorical.categories.to_numpy(dtype=object), None)
+            joined[column] = labels[codes]
+        return joined
+
+
+class DictionaryStore:
+    """
+    Process-wide, versioned store of the d_* dictionary tables.
+
+    Tables are loaded on first use per source (one per backend) and shared
+    by every session. reload() bumps the version and drops the loaded
+    tables, so the next lookup reads them again.
+    """
+
+    def __init__(self) -> None:
+        self.version = 1
+        self._tables: Dict[Tuple[str, str], DictionaryTable] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get(
+        self, source: str, table: str, loader: Callable[[], pd.DataFrame]
+    ) -> DictionaryTable:
+        """Return a dictionary table, calling loader() to read it the first time."""
+        key = (source, table)
+        with self._lock:
+            loaded = self._tables.get(key)
+            if loaded is not None:
+                return loaded
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+            version = self.version
+
+        # One reader per table; other sessions wait instead of loading it too
+        with load_lock:
+            with self._lock:
+                loaded = self._tables.get(key)
+                if loaded is not None:
+                    return loaded
+            loaded = DictionaryTable.build(table, loader(), version)
+            with self._lock:
+                # An empty read (e.g. no connection) is retried on the next call
+                if version == self.version and len(loaded):
+                    self._tables[key] = loaded
+            return loaded
+
+    def reload(self) -> int:
+        """Drop every loaded table and return the new version."""
+        with self._lock:
+            self._tables.clear()
+            self.version += 1
+            return self.version
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            tables = list(self._tables.values())
+            version = self.version
+        return {
+            "version": version,
+            "tables": {
+                loaded.table: len(loaded) for loaded in sorted(tables, key=lambda t: t.table)
+            },
+            "bytes": sum(loaded.memory_bytes() for loaded in tables),
+        }
+
+
+dictionaries = DictionaryStore()
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from db_connections import get_arg_value
+
+DEFAULT_MAX_PLOT_POINTS = 1500
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+
+def get_max_plot_points() -> int:
+    """Return the per-series point budget set with --max-plot-points (0 disables)."""
+    argument_value = get_arg_value("--max-plot-points")
+    return int(argument_value) if argument_value else DEFAULT_MAX_PLOT_POINTS
+
+
+def get_downsampling_method() -> str:
+    """Return the downsampling method set with --downsample (lttb or minmax)."""
+    argument_value = (get_arg_value("--downsample") or "lttb").lower()
+    if argument_value not in DOWNSAMPLING_METHODS:
+        raise ValueError(
+            f"Unknown --downsample method {argument_value!r}; "
+            f"expected one of {', '.join(DOWNSAMPLING_METHODS)}."
+        )
+    return argument_value
+
+
+def _as_float(values: pd.Series) -> np.ndarray:
+    """Return numeric or datetime values as float64 for geometric comparisons."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("int64").to_numpy(dtype=np.float64)
+    return values.to_numpy(dtype=np.float64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Pick threshold points with Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept; every bucket in between contributes
+    the point forming the largest triangle with the previously kept point
+    and the average of the next bucket, which preserves the visual shape of
+    a line, including its spikes.
+
+    Returns:
+        Sorted positional indices into x and y.
+    """
+    point_count = len(x)
+    if threshold >= point_count or threshold < 3:
+        return np.arange(point_count)
+
+    # threshold - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, point_count - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, point_count - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_stop = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_stop = point_count - 1, point_count
+        average_x = x[next_start:next_stop].mean()
+        average_y = y[next_start:next_stop].mean()
+
+        areas = np.abs(
+            (x[previous] - average_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (average_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        indices[bucket + 1] = previous
+    return indices
+
+
+def min_max_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Keep the minimum and maximum of threshold / 2 equal-width x buckets.
+
+    Buckets are spans of x (time), not runs of rows, so bursts of frequent
+    charting do not crowd out sparse stretches.
+
+    Returns:
+        Sorted positional indices into x and y.
+    """
+    point_count = len(x)
+    if threshold >= point_count or threshold < 2:
+        return np.arange(point_count)
+
+    bucket_count = max(1, threshold // 2)
+    span = x[-1] - x[0]
+    if span <= 0:
+        buckets = np.zeros(point_count, dtype=np.int64)
+    else:
+        buckets = np.minimum(
+            ((x - x[0]) / span * bucket_count).astype(np.int64), bucket_count - 1
+        )
+    grouped = pd.Series(y).groupby(buckets)
+    indices = np.concatenate(
+        [grouped.idxmin().to_numpy(), grouped.idxmax().to_numpy(), [0, point_count - 1]]
+    )
+    return np.unique(indices)
+
+
+def downsample_frame(
+    data: pd.DataFrame,
+    x_column: str,
+    y_column: str,
+    max_points: int,
+    method: str = "lttb",
+) -> pd.DataFrame:
+    """
+    Reduce a line series to at most about max_points rows for plotting.
+
+    Rows must be sorted by x_column with no missing y values. A max_points of
+    0 or a series already within budget returns the frame unchanged.
+    """
+    if max_points <= 0 or len(data) <= max_points:
+        return data
+    x = _as_float(data[x_column])
+    y = _as_float(data[y_column])
+    if method == "minmax":
+        indices = min_max_indices(x, y, max_points)
+    else:
+        indices = lttb_indices(x, y, max_points)
+    return data.iloc[indices]
+
+
+def describe_reduction(shown_points: int, total_points: int, method: str) -> str:
+    """Return a caption such as 'Showing 1,500 of 42,000 points (28x fewer, LTTB)'."""
+    if shown_points >= total_points:
+        return f"Showing all {total_points:,} points."
+    method_label = "LTTB" if method == "lttb" else "min/max per time bucket"
+    return (
+        f"Showing {shown_points:,} of {total_points:,} points "
+        f"({total_points / max(shown_points, 1):.0f}x fewer, {method_label}). "
+        "Narrow the time range to see full resolution."
+    )
@@ -0,0 +1,165 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import streamlit as st
+
+from db_connections import get_arg_value
+
+MANIFEST_FILE_NAME = "manifest.json"
+SPARKLINE_CHARACTERS = "▁▂▃▄▅▆▇█"
+
+
+def chunk_file_name(chunk_number: int, kind: str) -> str:
+    """Return the file holding one array kind (index, thumbnail, level_N) of a chunk."""
+    return f"chunk_{chunk_number:06d}_{kind}.npy"
+
+
+def sparkline(values: Sequence[float]) -> str:
+    """Render values as a one-line Unicode block sparkline; gaps become spaces."""
+    values = np.asarray(values, dtype=np.float32)
+    finite = np.isfinite(values)
+    if not finite.any():
+        return ""
+    low, high = values[finite].min(), values[finite].max()
+    scale = (len(SPARKLINE_CHARACTERS) - 1) / (high - low) if high > low else 0.0
+    return "".join(
+        SPARKLINE_CHARACTERS[int(round((value - low) * scale))] if is_finite else " "
+        for value, is_finite in zip(values, finite)
+    )
+
+
+class TileWaveform:
+    """
+    A min/max pyramid level exposed with the EcgWaveform interface.
+
+    Each bucket contributes its minimum then its maximum, so the level plots
+    as an envelope at twice the bucket rate.
+    """
+
+    def __init__(
+        self,
+        study_id: str,
+        level: np.ndarray,
+        bucket_size: int,
+        sampling_frequency: float,
+        lead_names: Sequence[str],
+    ) -> None:
+        self.study_id = study_id
+        # (leads, buckets, 2) -> (buckets * 2, leads)
+        self._envelope = np.asarray(level, dtype=np.float32).reshape(level.shape[0], -1).T
+        self.sampling_frequency = sampling_frequency * 2 / bucket_size
+        self.lead_names = list(lead_names)
+        self.units = ["mV"] * len(self.lead_names)
+
+    @property
+    def sample_count(self) -> int:
+        return int(self._envelope.shape[0])
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.sample_count / self.sampling_frequency
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._envelope.nbytes)
+
+    def samples(self, lead_index: int, start: int, stop: int) -> np.ndarray:
+        return self._envelope[start:stop, lead_index]
+
+
+class EcgTileStore:
+    """
+    Reader for the chunked summaries written by scripts/build_ecg_tiles.py.
+
+    The per-chunk index files are loaded into one sorted study_id array;
+    chunk arrays are memory mapped on first use, so a lookup touches only
+    the few kilobytes of the requested study.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        settings = json.loads((self.directory / MANIFEST_FILE_NAME).read_text())
+        self.sampling_frequency = float(settings["sampling_frequency"])
+        self.lead_names = list(settings["lead_names"])
+        self.levels = list(settings["levels"])
+
+        study_ids = [np.empty(0, dtype=np.int64)]
+        chunk_numbers = [np.empty(0, dtype=np.int32)]
+        rows = [np.empty(0, dtype=np.int32)]
+        for index_path in sorted(self.directory.glob("chunk_*_index.npy")):
+            chunk_number = int(index_path.name.split("_")[1])
+            chunk_study_ids = np.load(index_path)[:, 1]
+            study_ids.append(chunk_study_ids)
+            chunk_numbers.append(np.full(len(chunk_study_ids), chunk_number, dtype=np.int32))
+            rows.append(np.arange(len(chunk_study_ids), dtype=np.int32))
+
+        study_ids = np.concatenate(study_ids)
+        order = np.argsort(study_ids, kind="stable")
+        self._study_ids = study_ids[order]
+        self._chunk_numbers = np.concatenate(chunk_numbers)[order]
+        self._rows = np.concatenate(rows)[order]
+
+        self._arrays: Dict[Tuple[int, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._study_ids)
+
+    def _locate(self, study_id) -> Optional[Tuple[int, int]]:
+        study_id = int(study_id)
+        position = int(np.searchsorted(self._study_ids, study_id))
+        if position >= len(self._study_ids) or self._study_ids[position] != study_id:
+            return None
+        return int(self._chunk_numbers[position]), int(self._rows[position])
+
+    def _array(self, chunk_number: int, kind: str) -> np.ndarray:
+        with self._lock:
+            key = (chunk_number, kind)
+            if key not in self._arrays:
+                self._arrays[key] = np.load(
+                    self.directory / chunk_file_name(chunk_number, kind), mmap_mode="r"
+                )
+            return self._arrays[key]
+
+    def thumbnail(self, study_id) -> Optional[np.ndarray]:
+        """Return the lead II thumbnail of a study, or None if it was not summarized."""
+        location = self._locate(study_id)
+        if location is None:
+            return None
+        chunk_number, row = location
+        return np.asarray(self._array(chunk_number, "thumbnail")[row], dtype=np.float32)
+
+    def sparkline(self, study_id) -> Optional[str]:
+        """Return the lead II thumbnail of a study as a Unicode sparkline."""
+        thumbnail = self.thumbnail(study_id)
+        return None if thumbnail is None else sparkline(thumbnail)
+
+    def coarse_waveform(self, study_id, bucket_size: Optional[int] = None) -> Optional[TileWaveform]:
+        """Return a pyramid level (the finest by default) as a plottable waveform."""
+        location = self._locate(study_id)
+        if location is None:
+            return None
+        bucket_size = bucket_size or self.levels[0]
+        chunk_number, row = location
+        level = self._array(chunk_number, f"level_{bucket_size}")[row]
+        return TileWaveform(
+            str(study_id), level, bucket_size, self.sampling_frequency, self.lead_names
+        )
+
+
+@st.cache_resource
+def get_tile_store() -> Optional[EcgTileStore]:
+    """Open the tile store given by --ecg-tile-dir, if any."""
+    argument_value = get_arg_value("--ecg-tile-dir")
+    if not argument_value:
+        return None
+    directory = Path(argument_value).expanduser()
+    if not (directory / MANIFEST_FILE_NAME).exists():
+        st.warning(
+            f"No ECG tile store found in {directory}. Run scripts/build_ecg_tiles.py first."
+        )
+        return None
+    return EcgTileStore(directory)
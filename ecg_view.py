@@ -1,9 +1,22 @@
+import re
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
-import matplotlib.pyplot as plt
 import streamlit as st
-import wfdb
+
+from concurrent_fetch import run_parallel
+from ecg_tiles import get_tile_store
+from ecg_waveforms import (
+    DEFAULT_POINTS_PER_LEAD,
+    EcgWaveform,
+    build_overlay_figure,
+    build_waveform_figure,
+    get_waveform_cache,
+    open_waveform,
+)
+
+# Upper bound on studies loaded into one comparison
+MAX_COMPARE_STUDIES = 12
 
 
 def _set_query_param_value(parameter_name: str, parameter_value: Optional[str]) -> None:
@@ -62,41 +75,79 @@ def _resolve_record_path(
     return record_directory / study_identifier
 
 
-def _load_record(record_path: Path) -> wfdb.Record:
-    """Read the WFDB record from disk."""
-    return wfdb.rdrecord(str(record_path))
+def _load_study(
+    base_directory: Path, subject_identifier: str, study_identifier: str
+) -> Tuple[Optional[EcgWaveform], Optional[str]]:
+    """Open a study through the waveform cache, returning (waveform, error message)."""
+    record_path = _resolve_record_path(
+        base_directory, subject_identifier, study_identifier
+    )
+    dat_file = record_path.with_suffix(".dat")
+    header_file = record_path.with_suffix(".hea")
 
+    if not dat_file.exists() or not header_file.exists():
+        return None, "ECG not found."
 
-def _plot_record(record: wfdb.Record, study_identifier: str) -> None:
-    """Create and display a WFDB plot in Streamlit."""
-    figure = None
     try:
-        plot_output = wfdb.plot_wfdb(
-            record=record,
-            figsize=(24, 18),
-            title=f"Study {study_identifier} ECG Waveform",
-            ecg_grids="all",
-            return_fig=True,
+        waveform = get_waveform_cache().get_or_load(
+            study_identifier, lambda: open_waveform(record_path, study_identifier)
         )
-    except TypeError:
-        wfdb.plot_wfdb(
-            record=record,
-            figsize=(24, 18),
-            title=f"Study {study_identifier} ECG Waveform",
-            ecg_grids="all",
+    except FileNotFoundError:
+        return None, "ECG not found."
+    except Exception as error:  # pragma: no cover
+        return None, f"Unable to read ECG record: {error}"
+    return waveform, None
+
+
+def _render_waveform(waveform: EcgWaveform, study_identifier: str) -> None:
+    """Show interactive per-lead traces for a chosen time window."""
+    st.subheader(f"Study {study_identifier} ECG Waveform")
+
+    control_columns = st.columns([3, 2, 1])
+    with control_columns[0]:
+        duration = round(waveform.duration_seconds, 2)
+        window = st.slider(
+            "Time window (s)",
+            min_value=0.0,
+            max_value=duration,
+            value=(0.0, duration),
+            step=0.1,
+            help="Narrow the window to see full sample resolution.",
         )
-        figure = plt.gcf()
-    else:
-        if isinstance(plot_output, tuple):
-            figure = plot_output[0]
-        else:
-            figure = plot_output
+    with control_columns[1]:
+        selected_leads = st.multiselect(
+            "Leads", waveform.lead_names, default=waveform.lead_names
+        )
+    with control_columns[2]:
+        points_per_lead = st.select_slider(
+            "Points per lead",
+            options=[500, 1000, 2000, 4000, 8000],
+            value=DEFAULT_POINTS_PER_LEAD,
+            help="Roughly the plot width in pixels; more points show more detail.",
+        )
+
+    if not selected_leads:
+        st.info("Select at least one lead.")
+        return
 
-    if figure is None:
-        figure = plt.gcf()
+    figure = build_waveform_figure(
+        waveform,
+        window[0],
+        window[1],
+        points_per_lead=points_per_lead,
+        lead_indices=[waveform.lead_names.index(lead) for lead in selected_leads],
+    )
+    st.plotly_chart(figure, use_container_width=True)
 
-    st.pyplot(figure)
-    plt.close(figure)
+    window_samples = int((window[1] - window[0]) * waveform.sampling_frequency)
+    cache_stats = get_waveform_cache().stats()
+    st.caption(
+        f"Showing up to {min(points_per_lead, window_samples)} of {window_samples} "
+        f"samples per lead at {waveform.sampling_frequency:g} Hz. "
+        f"Waveform cache: {cache_stats['entries']} studies, "
+        f"{cache_stats['bytes'] / (1024 * 1024):.1f} MB, "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses."
+    )
 
 
 def render_ecg_page(
@@ -137,23 +188,161 @@ def render_ecg_page(
         st.error(str(locator_error))
         return
 
-    record_path = _resolve_record_path(
-        base_directory, subject_identifier, study_identifier
+    # Show the precomputed coarse envelope while the full record loads
+    preview = st.empty()
+    tile_store = get_tile_store()
+    if tile_store is not None and study_identifier not in get_waveform_cache():
+        coarse_waveform = tile_store.coarse_waveform(study_identifier)
+        if coarse_waveform is not None:
+            with preview.container():
+                st.caption("Coarse preview; loading full resolution...")
+                st.plotly_chart(
+                    build_waveform_figure(
+                        coarse_waveform, 0.0, coarse_waveform.duration_seconds
+                    ),
+                    use_container_width=True,
+                )
+
+    with st.spinner("Loading ECG waveform..."):
+        waveform, load_error = _load_study(
+            base_directory, subject_identifier, study_identifier
+        )
+    preview.empty()
+    if load_error:
+        st.error(load_error)
+        return
+
+    _render_waveform(waveform, study_identifier)
+
+
+def _split_locators(locators_text: str) -> List[str]:
+    """Split comma or whitespace separated locators, dropping duplicates."""
+    return list(
+        dict.fromkeys(
+            locator.strip("/")
+            for locator in re.split(r"[\s,]+", locators_text)
+            if locator.strip("/")
+        )
     )
-    dat_file = record_path.with_suffix(".dat")
-    header_file = record_path.with_suffix(".hea")
 
-    if not dat_file.exists() or not header_file.exists():
-        st.error("ECG not found.")
+
+def _render_comparison(waveforms: Dict[str, EcgWaveform]) -> None:
+    """Show several studies as per-lead overlays or side by side."""
+    common_leads = [
+        lead_name
+        for lead_name in next(iter(waveforms.values())).lead_names
+        if all(lead_name in waveform.lead_names for waveform in waveforms.values())
+    ]
+
+    control_columns = st.columns([2, 3, 2, 1])
+    with control_columns[0]:
+        layout = st.radio(
+            "Layout", ["Overlay per lead", "Small multiples"], horizontal=True
+        )
+    with control_columns[1]:
+        duration = round(
+            max(waveform.duration_seconds for waveform in waveforms.values()), 2
+        )
+        window = st.slider(
+            "Time window (s)",
+            min_value=0.0,
+            max_value=duration,
+            value=(0.0, duration),
+            step=0.1,
+        )
+    with control_columns[2]:
+        selected_leads = st.multiselect(
+            "Leads", common_leads, default=common_leads[:3]
+        )
+    with control_columns[3]:
+        points_per_lead = st.select_slider(
+            "Points per lead",
+            options=[250, 500, 1000, 2000, 4000],
+            value=1000,
+        )
+
+    if not selected_leads:
+        st.info("Select at least one lead.")
         return
 
-    try:
-        with st.spinner("Loading ECG waveform..."):
-            record = _load_record(record_path)
-            _plot_record(record, study_identifier)
-    except FileNotFoundError:
-        st.error("ECG not found.")
+    if layout == "Overlay per lead":
+        figure = build_overlay_figure(
+            waveforms, selected_leads, window[0], window[1], points_per_lead
+        )
+        st.plotly_chart(figure, use_container_width=True)
         return
-    except Exception as error:  # pragma: no cover
-        st.error(f"Unable to read ECG record: {error}")
+
+    grid_columns = st.columns(2)
+    for position, (label, waveform) in enumerate(waveforms.items()):
+        with grid_columns[position % 2]:
+            st.markdown(f"**{label}**")
+            figure = build_waveform_figure(
+                waveform,
+                window[0],
+                window[1],
+                points_per_lead=points_per_lead,
+                lead_indices=[
+                    waveform.lead_names.index(lead_name) for lead_name in selected_leads
+                ],
+            )
+            figure.update_layout(height=max(200, 90 * len(selected_leads)))
+            st.plotly_chart(
+                figure, use_container_width=True, key=f"ecg_compare_{label}"
+            )
+
+
+def render_ecg_compare_page(
+    base_directory: Optional[Path],
+    studies_parameter: str,
+) -> None:
+    """Render several ECG studies side by side, loading them in parallel."""
+    st.title("ECG Comparison")
+
+    if base_directory is None:
+        st.error(
+            "ECG base folder not provided. Use --ecg-base-folder when starting the app."
+        )
+        return
+
+    default_locators = _split_locators(studies_parameter)
+    locators_input = st.text_area(
+        "ECG record locators",
+        value="\n".join(default_locators),
+        placeholder="ecg/p10001725/s41420867\necg/p10001725/s41420868",
+        help="One ecg/pXXXXXXXX/sZZZZZZZZ locator per line.",
+    )
+    locators = _split_locators(locators_input)
+    if locators != default_locators:
+        _set_query_param_value("studies", ",".join(locators) or None)
+
+    if not locators:
+        st.info("Enter the ECG record locators to compare.")
         return
+    if len(locators) > MAX_COMPARE_STUDIES:
+        st.warning(f"Comparing the first {MAX_COMPARE_STUDIES} of {len(locators)} studies.")
+        locators = locators[:MAX_COMPARE_STUDIES]
+
+    study_identifiers = {}
+    for locator in locators:
+        try:
+            study_identifiers[locator] = _parse_record_locator(locator)
+        except ValueError as locator_error:
+            st.error(f"{locator}: {locator_error}")
+
+    with st.spinner(f"Loading {len(study_identifiers)} ECG waveforms..."):
+        loaded_studies = run_parallel(
+            {
+                locator: (_load_study, (base_directory, *identifiers))
+                for locator, identifiers in study_identifiers.items()
+            }
+        )
+
+    waveforms = {}
+    for locator, (waveform, load_error) in loaded_studies.items():
+        if load_error:
+            st.error(f"{locator}: {load_error}")
+        else:
+            waveforms[f"s{study_identifiers[locator][1]}"] = waveform
+
+    if waveforms:
+        _render_comparison(waveforms)
@@ -0,0 +1,284 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import plotly.colors
+import plotly.graph_objects as go
+import streamlit as st
+import wfdb
+from plotly.subplots import make_subplots
+
+from db_connections import get_arg_value
+from wfdb_mmap import MappedWaveform, UnsupportedRecordError
+
+DEFAULT_WAVEFORM_CACHE_MEGABYTES = 256
+DEFAULT_POINTS_PER_LEAD = 2000
+# Mapped records hold an open file each, so the count is bounded as well.
+DEFAULT_WAVEFORM_CACHE_ENTRIES = 256
+
+
+@dataclass
+class EcgWaveform:
+    """Decoded ECG record in physical units, one column per lead."""
+
+    study_id: str
+    signal: np.ndarray
+    sampling_frequency: float
+    lead_names: List[str]
+    units: List[str]
+
+    @property
+    def sample_count(self) -> int:
+        return int(self.signal.shape[0])
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.sample_count / self.sampling_frequency
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.signal.nbytes)
+
+    def samples(self, lead_index: int, start: int, stop: int) -> np.ndarray:
+        """Return one lead's physical values for the sample range [start, stop)."""
+        return self.signal[start:stop, lead_index]
+
+
+def load_waveform(record_path: Path, study_id: str) -> EcgWaveform:
+    """Read a WFDB record into an EcgWaveform."""
+    record = wfdb.rdrecord(str(record_path))
+    return EcgWaveform(
+        study_id=study_id,
+        signal=np.asarray(record.p_signal, dtype=np.float32),
+        sampling_frequency=float(record.fs),
+        lead_names=list(record.sig_name),
+        units=list(record.units),
+    )
+
+
+def open_waveform(record_path: Path, study_id: str) -> Union[MappedWaveform, EcgWaveform]:
+    """Memory map a record, falling back to a full wfdb read for other formats."""
+    try:
+        return MappedWaveform(record_path, study_id)
+    except UnsupportedRecordError:
+        return load_waveform(record_path, study_id)
+
+
+class WaveformCache:
+    """Thread-safe LRU of waveforms keyed by study_id, bounded in bytes and entries."""
+
+    def __init__(self, max_bytes: int, max_entries: int = DEFAULT_WAVEFORM_CACHE_ENTRIES) -> None:
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, EcgWaveform]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_load(self, study_id: str, loader: Callable[[], EcgWaveform]) -> EcgWaveform:
+        """Return the cached waveform, loading and caching it on a miss."""
+        with self._lock:
+            waveform = self._entries.get(study_id)
+            if waveform is not None:
+                self._entries.move_to_end(study_id)
+                self._hits += 1
+                return waveform
+            self._misses += 1
+
+        # Decode outside the lock so other studies can be served meanwhile.
+        waveform = loader()
+        with self._lock:
+            if study_id not in self._entries and waveform.nbytes <= self.max_bytes:
+                self._entries[study_id] = waveform
+                self._bytes += waveform.nbytes
+                while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+        return waveform
+
+    def __contains__(self, study_id: str) -> bool:
+        with self._lock:
+            return study_id in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, memory use and hit/miss counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+@st.cache_resource
+def get_waveform_cache() -> WaveformCache:
+    """Create the process-wide waveform cache sized by --ecg-cache-mb."""
+    argument_value = get_arg_value("--ecg-cache-mb")
+    megabytes = float(argument_value) if argument_value else DEFAULT_WAVEFORM_CACHE_MEGABYTES
+    return WaveformCache(int(megabytes * 1024 * 1024))
+
+
+def decimate_min_max(samples: np.ndarray, target_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a signal to about target_points points, keeping every peak.
+
+    The signal is split into target_points / 2 equal buckets and each bucket
+    contributes its minimum and maximum in time order, so QRS spikes survive
+    decimation unlike with plain striding.
+
+    Returns:
+        Sample indices into samples and the values at those indices.
+    """
+    sample_count = len(samples)
+    if sample_count <= target_points:
+        return np.arange(sample_count), samples
+
+    bucket_count = max(1, target_points // 2)
+    bucket_size = int(np.ceil(sample_count / bucket_count))
+    bucket_count = int(np.ceil(sample_count / bucket_size))
+    padded = np.pad(samples, (0, bucket_count * bucket_size - sample_count), mode="edge")
+    buckets = padded.reshape(bucket_count, bucket_size)
+
+    # NaN marks missing samples; ignore it when picking extremes.
+    missing = np.isnan(buckets)
+    minimum_positions = np.where(missing, np.inf, buckets).argmin(axis=1)
+    maximum_positions = np.where(missing, -np.inf, buckets).argmax(axis=1)
+
+    bucket_offsets = np.arange(bucket_count) * bucket_size
+    indices = np.column_stack(
+        [
+            bucket_offsets + np.minimum(minimum_positions, maximum_positions),
+            bucket_offsets + np.maximum(minimum_positions, maximum_positions),
+        ]
+    ).ravel()
+    indices = np.minimum(indices, sample_count - 1)
+    return indices, samples[indices]
+
+
+def _sample_range(waveform, start_seconds: float, end_seconds: float) -> Tuple[int, int]:
+    """Convert a time window in seconds into a clipped [start, stop) sample range."""
+    sampling_frequency = waveform.sampling_frequency
+    start = max(0, int(start_seconds * sampling_frequency))
+    stop = min(waveform.sample_count, int(np.ceil(end_seconds * sampling_frequency)) + 1)
+    return start, stop
+
+
+def build_waveform_figure(
+    waveform: EcgWaveform,
+    start_seconds: float,
+    end_seconds: float,
+    points_per_lead: int = DEFAULT_POINTS_PER_LEAD,
+    lead_indices: Optional[Sequence[int]] = None,
+) -> go.Figure:
+    """
+    Plot a time window of an ECG as stacked WebGL traces, one per lead.
+
+    Only the requested window is decimated to points_per_lead, so narrowing
+    the window brings back full sample resolution.
+    """
+    if lead_indices is None:
+        lead_indices = range(len(waveform.lead_names))
+    lead_indices = list(lead_indices)
+
+    sampling_frequency = waveform.sampling_frequency
+    start, stop = _sample_range(waveform, start_seconds, end_seconds)
+
+    figure = make_subplots(
+        rows=max(1, len(lead_indices)),
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.01,
+    )
+    for row, lead_index in enumerate(lead_indices, start=1):
+        indices, values = decimate_min_max(
+            waveform.samples(lead_index, start, stop), points_per_lead
+        )
+        lead_name = waveform.lead_names[lead_index]
+        figure.add_trace(
+            go.Scattergl(
+                x=(indices + start) / sampling_frequency,
+                y=values,
+                mode="lines",
+                name=lead_name,
+                line=dict(width=1, color="#d62728"),
+                hovertemplate=f"{lead_name}: %{{y:.3f}} {waveform.units[lead_index]}"
+                "<br>%{x:.3f} s<extra></extra>",
+            ),
+            row=row,
+            col=1,
+        )
+        figure.update_yaxes(title_text=lead_name, row=row, col=1)
+
+    figure.update_xaxes(title_text="Time (s)", row=max(1, len(lead_indices)), col=1)
+    figure.update_layout(
+        height=max(300, 110 * len(lead_indices)),
+        showlegend=False,
+        margin=dict(l=60, r=20, t=30, b=40),
+        hovermode="x",
+    )
+    return figure
+
+
+def build_overlay_figure(
+    waveforms: Dict[str, Any],
+    lead_names: Sequence[str],
+    start_seconds: float,
+    end_seconds: float,
+    points_per_lead: int = DEFAULT_POINTS_PER_LEAD,
+) -> go.Figure:
+    """
+    Overlay the same leads of several ECGs, one row per lead.
+
+    Every record is aligned on its own start, so the x axis is seconds since
+    the beginning of each recording.
+    """
+    figure = make_subplots(
+        rows=max(1, len(lead_names)),
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.01,
+    )
+    colors = plotly.colors.qualitative.Plotly
+    for study_position, (label, waveform) in enumerate(waveforms.items()):
+        color = colors[study_position % len(colors)]
+        start, stop = _sample_range(waveform, start_seconds, end_seconds)
+        show_legend = True
+        for row, lead_name in enumerate(lead_names, start=1):
+            if lead_name not in waveform.lead_names:
+                continue
+            lead_index = waveform.lead_names.index(lead_name)
+            indices, values = decimate_min_max(
+                waveform.samples(lead_index, start, stop), points_per_lead
+            )
+            figure.add_trace(
+                go.Scattergl(
+                    x=(indices + start) / waveform.sampling_frequency,
+                    y=values,
+                    mode="lines",
+                    name=label,
+                    legendgroup=label,
+                    showlegend=show_legend,
+                    line=dict(width=1, color=color),
+                    hovertemplate=f"{label} {lead_name}: %{{y:.3f}} "
+                    f"{waveform.units[lead_index]}<br>%{{x:.3f}} s<extra></extra>",
+                ),
+                row=row,
+                col=1,
+            )
+            show_legend = False
+
+    for row, lead_name in enumerate(lead_names, start=1):
+        figure.update_yaxes(title_text=lead_name, row=row, col=1)
+    figure.update_xaxes(title_text="Time (s)", row=max(1, len(lead_names)), col=1)
+    figure.update_layout(
+        height=max(300, 130 * len(lead_names)),
+        margin=dict(l=60, r=20, t=30, b=40),
+        legend=dict(orientation="h", yanchor="bottom", y=1.0),
+        hovermode="x",
+    )
+    return figure
@@ -0,0 +1,122 @@
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from frame_backend import Filter, FrameBackend
+from utils import NOTE_COLLECTIONS, _attach_note_details, _sort_notes
+
+# Columns parsed as timestamps when a fixture CSV is loaded
+FIXTURE_TIME_COLUMNS = {
+    "admittime", "dischtime", "dod", "intime", "outtime", "transfertime",
+    "charttime", "storetime", "starttime", "endtime", "stoptime", "ecg_time",
+    "chartdate",
+}
+
+
+def _apply_filter(table_df: pd.DataFrame, column: str, operator: str, value) -> pd.Series:
+    if operator == "=":
+        return table_df[column] == value
+    if operator == ">=":
+        return table_df[column] >= value
+    if operator == "<=":
+        return table_df[column] <= value
+    if operator == "in":
+        return table_df[column].isin(value)
+    raise ValueError(f"Unsupported filter operator: {operator!r}")
+
+
+class FixtureBackend(FrameBackend):
+    """
+    Serves the explorer from MIMIC-style CSV files held in memory.
+
+    Each table is read from <table>.csv in the fixture directory, e.g. the
+    demo dataset or hand-made test cases. Notes come from discharge.csv,
+    radiology.csv and their *_detail.csv files and ECG measurements from
+    machine_measurement.csv, so no database is needed.
+    Missing files behave like empty tables.
+    """
+
+    name = "fixture"
+
+    def __init__(self, fixture_directory: Path) -> None:
+        self.fixture_directory = Path(fixture_directory)
+        self._tables: Dict[str, pd.DataFrame] = {}
+        self._table_lock = threading.Lock()
+
+    def describe(self) -> str:
+        return f"Fixtures in {self.fixture_directory}"
+
+    def _table(self, table: str) -> pd.DataFrame:
+        """Load a fixture CSV once and keep it in memory."""
+        with self._table_lock:
+            if table not in self._tables:
+                path = self.fixture_directory / f"{table}.csv"
+                # value is VARCHAR in MIMIC-IV; keep it textual like the SQL readers do.
+                table_df = (
+                    pd.read_csv(path, dtype={"value": "object"})
+                    if path.exists()
+                    else pd.DataFrame()
+                )
+                for column in FIXTURE_TIME_COLUMNS.intersection(table_df.columns):
+                    table_df[column] = pd.to_datetime(table_df[column])
+                self._tables[table] = table_df
+            return self._tables[table]
+
+    def _read(
+        self,
+        table: str,
+        subject_id: int,
+        filters: Sequence[Filter] = (),
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        table_df = self._table(table)
+        if table_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        mask = table_df["subject_id"] == subject_id
+        for column, operator, value in filters:
+            mask &= _apply_filter(table_df, column, operator, value)
+        selected_df = table_df.loc[mask]
+        if columns is not None:
+            selected_df = selected_df.reindex(columns=columns)
+        return selected_df.reset_index(drop=True)
+
+    def _dictionary(self, table: str) -> pd.DataFrame:
+        return self._table(table)
+
+    def get_discharge_notes(self, subject_id, hadm_id):
+        """Returns discharge notes for the admission from discharge.csv."""
+        return self._read(
+            "discharge", subject_id, filters=[("hadm_id", "=", hadm_id)]
+        ).to_dict("records")
+
+    def get_notes(self, subject_id, hadm_id):
+        """Returns every note of the admission from the note CSVs, with details."""
+        notes = []
+        for note_table, detail_table in NOTE_COLLECTIONS.items():
+            table_notes = self._read(
+                note_table, subject_id, filters=[("hadm_id", "=", hadm_id)]
+            ).to_dict("records")
+            if not table_notes:
+                continue
+            detail_records = self._read(
+                detail_table,
+                subject_id,
+                filters=[("note_id", "in", [note["note_id"] for note in table_notes])],
+            ).to_dict("records")
+            notes.extend(_attach_note_details(table_notes, detail_records))
+        return _sort_notes(notes)
+
+    def get_ecg_measurements(self, subject_id, start_time=None, end_time=None):
+        """Returns ECG machine measurements from machine_measurement.csv."""
+        filters = []
+        if start_time is not None:
+            filters.append(("ecg_time", ">=", pd.to_datetime(start_time)))
+        if end_time is not None:
+            filters.append(("ecg_time", "<=", pd.to_datetime(end_time)))
+        ecg_df = self._read("machine_measurement", subject_id, filters=filters)
+        if ecg_df.empty:
+            return pd.DataFrame()
+        return ecg_df.sort_values("ecg_time", ignore_index=True)
@@ -0,0 +1,33 @@
+from typing import Callable
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+# st.fragment (1.37+) or st.experimental_fragment (1.33-1.36); None before that.
+_fragment_decorator = getattr(st, "fragment", None) or getattr(
+    st, "experimental_fragment", None
+)
+
+
+def fragment(function: Callable) -> Callable:
+    """
+    Run a page section as a Streamlit fragment.
+
+    Widget interactions inside a fragment rerun only that function, with the
+    arguments from the last full run. On Streamlit versions without
+    fragments the function runs inline as part of the whole script.
+    """
+    if _fragment_decorator is None:
+        return function
+    return _fragment_decorator(function)
+
+
+def rerun_fragment() -> None:
+    """Rerun only the calling fragment, or the whole app where that is unsupported."""
+    if getattr(st, "fragment", None) is not None:
+        try:
+            st.rerun(scope="fragment")
+        except StreamlitAPIException:
+            # Not inside a fragment run, e.g. during a full-app rerun.
+            pass
+    st.rerun()
@@ -0,0 +1,276 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from concurrent_fetch import run_parallel
+from dictionaries import DictionaryTable, dictionaries
+from query_cache import cached_query
+from utils import (
+    EVENT_TABLE_COLUMNS,
+    EVENT_TIME_COLUMNS,
+    ICU_EVENT_TABLES,
+    append_ecg_item,
+    collect_event_data,
+    format_icd_codes,
+    format_lab_events,
+    format_prescription_items,
+    get_discharge_notes,
+    get_ecg_measurements,
+    get_notes,
+    prescription_item_id,
+    select_prescription_items,
+    split_by_item,
+    split_prescription_events,
+)
+
+# (column, operator, value) with operator one of "=", ">=", "<=", "in"
+Filter = Tuple[str, str, Any]
+
+
+class FrameBackend:
+    """
+    Base class for backends that read whole tables as DataFrames.
+
+    Subclasses provide _read() for per-subject tables and _dictionary() for
+    the small d_* lookup tables; the explorer's joins, counts and formatting
+    are done here in pandas the same way utils.py does them in SQL. Notes and
+    ECG measurements default to MongoDB.
+    """
+
+    name = "frame"
+
+    def _read(
+        self,
+        table: str,
+        subject_id: int,
+        filters: Sequence[Filter] = (),
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Return one subject's rows of a table matching all filters."""
+        raise NotImplementedError
+
+    def _dictionary(self, table: str) -> pd.DataFrame:
+        """Return a whole d_* dictionary table."""
+        raise NotImplementedError
+
+    def get_dictionary(self, table: str) -> DictionaryTable:
+        """Return a d_* table, read with _dictionary() once per extract."""
+        return dictionaries.get(self.describe(), table, lambda: self._dictionary(table))
+
+    @cached_query
+    def get_admissions(self, subject_id):
+        """Return the subject's admissions sorted by time, flagging those with an ICU stay."""
+        admissions_df = self._read(
+            "admissions", subject_id, columns=["hadm_id", "admittime", "dischtime"]
+        )
+        icu_hadm_ids = self._read("icustays", subject_id, columns=["hadm_id"])["hadm_id"]
+        admissions_df["has_icu"] = (
+            admissions_df["hadm_id"].isin(icu_hadm_ids).astype(int)
+        )
+        return admissions_df.sort_values("admittime").reset_index(drop=True)
+
+    @cached_query
+    def get_patient_info(self, subject_id):
+        """Return the subject's patients row, or None when the extract has none."""
+        patient_df = self._read(
+            "patients",
+            subject_id,
+            columns=["gender", "anchor_age", "anchor_year", "dod"],
+        )
+        return patient_df.iloc[0] if not patient_df.empty else None
+
+    @cached_query
+    def get_admission_info(self, subject_id, hadm_id):
+        """Return the admissions row of one admission, or None when it is missing."""
+        admission_df = self._read(
+            "admissions",
+            subject_id,
+            filters=[("hadm_id", "=", hadm_id)],
+            columns=[
+                "admittime", "dischtime", "insurance", "language",
+                "marital_status", "race",
+            ],
+        )
+        return admission_df.iloc[0] if not admission_df.empty else None
+
+    @cached_query
+    def get_admission_services(self, subject_id, hadm_id):
+        """Join the admission's distinct services into a comma separated string."""
+        services_df = self._read(
+            "services",
+            subject_id,
+            filters=[("hadm_id", "=", hadm_id)],
+            columns=["curr_service"],
+        )
+        if services_df.empty:
+            return ""
+        return ",".join(services_df["curr_service"].dropna().drop_duplicates().tolist())
+
+    @cached_query
+    def get_icu_info(self, subject_id, hadm_id):
+        """Return the admission's ICU stays sorted by entry time."""
+        icu_df = self._read(
+            "icustays",
+            subject_id,
+            filters=[("hadm_id", "=", hadm_id)],
+            columns=["stay_id", "intime", "outtime"],
+        )
+        return icu_df.sort_values("intime").reset_index(drop=True)
+
+    def _read_icd_codes(self, table, dictionary_table, subject_id, hadm_id):
+        codes_df = self._read(
+            table,
+            subject_id,
+            filters=[("hadm_id", "=", hadm_id)],
+            columns=["icd_code", "icd_version"],
+        )
+        if codes_df.empty:
+            return pd.DataFrame()
+        return format_icd_codes(self.get_dictionary(dictionary_table).join(codes_df))
+
+    @cached_query
+    def get_icd_diagnoses(self, subject_id, hadm_id):
+        """Return the admission's diagnosis codes with titles from d_icd_diagnoses."""
+        return self._read_icd_codes("diagnoses_icd", "d_icd_diagnoses", subject_id, hadm_id)
+
+    @cached_query
+    def get_icd_procedures(self, subject_id, hadm_id):
+        """Return the admission's procedure codes with titles from d_icd_procedures."""
+        return self._read_icd_codes("procedures_icd", "d_icd_procedures", subject_id, hadm_id)
+
+    def _count_items(self, source_table, subject_id, hadm_id):
+        item_df = self._read(
+            source_table,
+            subject_id,
+            filters=[("hadm_id", "=", hadm_id)],
+            columns=["itemid"],
+        )
+        counts = item_df.groupby("itemid").size().reset_index(name="data_count")
+        counts.insert(0, "source_table", source_table)
+        return counts
+
+    @cached_query
+    def get_item_types(self, subject_id, hadm_id, admission_start=None, admission_end=None):
+        """
+        Count an admission's items per source table from the extract's frames.
+
+        ICU and lab itemids are counted from their event tables and labelled
+        from the in-memory dictionaries; prescriptions are grouped by exact
+        drug/route text and given their synthetic itemids. The ECG item is
+        added when the admission window is given and has measurements.
+        """
+        icu_item_ids = pd.concat(
+            [
+                self._count_items(source_table, subject_id, hadm_id)
+                for source_table in ICU_EVENT_TABLES
+            ],
+            ignore_index=True,
+        )
+        icu_items = self.get_dictionary("d_items").join(icu_item_ids)
+
+        lab_item_ids = self._count_items("labevents", subject_id, hadm_id)
+        lab_items = (
+            self.get_dictionary("d_labitems")
+            .join(lab_item_ids)
+            .rename(columns={"fluid": "abbreviation"})
+        )
+
+        prescriptions_df = (
+            self._read(
+                "prescriptions",
+                subject_id,
+                filters=[("hadm_id", "=", hadm_id)],
+                columns=["drug", "route"],
+            )
+            .groupby(["drug", "route"], dropna=False)
+            .size()
+            .reset_index(name="data_count")
+        )
+        prescriptions_df.insert(0, "source_table", "prescriptions")
+        prescriptions_df["itemid"] = [
+            prescription_item_id(drug, route)
+            for drug, route in zip(prescriptions_df["drug"], prescriptions_df["route"])
+        ]
+
+        all_items = pd.concat(
+            [icu_items, lab_items, format_prescription_items(prescriptions_df)],
+            ignore_index=True,
+        )
+        if admission_start is None or admission_end is None:
+            return all_items
+        return append_ecg_item(
+            all_items,
+            self.get_ecg_measurements(subject_id, admission_start, admission_end),
+        )
+
+    def _fetch_table_events(self, subject_id, hadm_id, source_table, item_ids, start_time, end_time):
+        """Reads several items of one source table with a single filtered scan."""
+        time_column = EVENT_TIME_COLUMNS[source_table]
+        filters = [
+            ("hadm_id", "=", hadm_id),
+            (time_column, ">=", pd.Timestamp(start_time).to_pydatetime()),
+            (time_column, "<=", pd.Timestamp(end_time).to_pydatetime()),
+        ]
+
+        if source_table == "prescriptions":
+            prescriptions_df = self._read(
+                source_table,
+                subject_id,
+                filters=filters,
+                columns=EVENT_TABLE_COLUMNS[source_table],
+            ).sort_values(time_column, ignore_index=True)
+            return split_prescription_events(
+                select_prescription_items(prescriptions_df, item_ids), item_ids
+            )
+
+        result_df = self._read(
+            source_table,
+            subject_id,
+            filters=[*filters, ("itemid", "in", [int(item_id) for item_id in item_ids])],
+            columns=EVENT_TABLE_COLUMNS[source_table],
+        )
+        if source_table == "labevents":
+            format_lab_events(result_df)
+        return split_by_item(result_df, item_ids, result_df.columns)
+
+    def get_event_data_batch(self, subject_id, hadm_id, items, start_time, end_time):
+        """Fetches event data for several (item_id, source_table) pairs at once."""
+        return collect_event_data(
+            subject_id,
+            hadm_id,
+            items,
+            start_time,
+            end_time,
+            self._fetch_table_events,
+            self.get_ecg_measurements,
+        )
+
+    def get_discharge_notes(self, subject_id, hadm_id):
+        """Delegate discharge notes to the MongoDB reader in utils."""
+        return get_discharge_notes(subject_id, hadm_id)
+
+    def get_notes(self, subject_id, hadm_id):
+        """Fetches every note of an admission with its details from MongoDB."""
+        return get_notes(subject_id, hadm_id)
+
+    def get_ecg_measurements(self, subject_id, start_time=None, end_time=None):
+        """Fetch ECG machine measurements for a subject from MongoDB."""
+        return get_ecg_measurements(subject_id, start_time, end_time)
+
+    def get_admission_overview(self, subject_id, hadm_id, admission_start, admission_end):
+        """Fetches everything shown when an admission is opened, concurrently."""
+        return run_parallel(
+            {
+                "patient_info": (self.get_patient_info, (subject_id,)),
+                "admission_info": (self.get_admission_info, (subject_id, hadm_id)),
+                "services": (self.get_admission_services, (subject_id, hadm_id)),
+                "icd_diagnoses": (self.get_icd_diagnoses, (subject_id, hadm_id)),
+                "icd_procedures": (self.get_icd_procedures, (subject_id, hadm_id)),
+                "notes": (self.get_notes, (subject_id, hadm_id)),
+                "icu_stays": (self.get_icu_info, (subject_id, hadm_id)),
+                "item_types": (
+                    self.get_item_types,
+                    (subject_id, hadm_id, admission_start, admission_end),
+                ),
+            }
+        )
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Columns shown in the item grid, in display order.
+GRID_COLUMNS = ["label", "source_table", "category", "data_count"]
+
+
+@dataclass(frozen=True)
+class ItemIndex:
+    """
+    An admission's item list with precomputed filter keys.
+
+    Built once per admission: labels are lowercased and the category and
+    source table columns are factorized to integer codes, so each filter
+    change is a few array comparisons instead of re-lowercasing the frame.
+    """
+
+    items: pd.DataFrame
+    item_keys: pd.MultiIndex
+    label_keys: pd.Series
+    category_codes: np.ndarray
+    category_names: pd.Index
+    source_codes: np.ndarray
+    source_names: pd.Index
+    categories_by_source: Dict[str, List[str]]
+
+    @classmethod
+    def build(cls, item_types: pd.DataFrame) -> "ItemIndex":
+        """Index an item list as returned by get_item_types, sorted by label."""
+        items = item_types.copy()
+        for column in GRID_COLUMNS:
+            if column not in items.columns:
+                items[column] = pd.NA
+        items["data_count"] = (
+            pd.to_numeric(items["data_count"], errors="coerce").fillna(0).astype("int64")
+        )
+        items = items.sort_values("label", kind="stable").reset_index(drop=True)
+
+        category_codes, category_names = pd.factorize(items["category"])
+        source_codes, source_names = pd.factorize(items["source_table"])
+        categories_by_source = {
+            source: sorted(group.dropna().unique().tolist())
+            for source, group in items.groupby("source_table")["category"]
+        }
+        return cls(
+            items=items,
+            item_keys=pd.MultiIndex.from_frame(items[["source_table", "itemid"]]),
+            label_keys=items["label"].astype("string").str.lower().fillna(""),
+            category_codes=category_codes,
+            category_names=category_names,
+            source_codes=source_codes,
+            source_names=source_names,
+            categories_by_source=categories_by_source,
+        )
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def source_tables(self) -> List[str]:
+        return sorted(self.source_names.tolist())
+
+    def categories(self, source_table: Optional[str] = None) -> List[str]:
+        """Return the categories present, optionally only those of one source table."""
+        if source_table is None:
+            return sorted(self.category_names.tolist())
+        return self.categories_by_source.get(source_table, [])
+
+    def _codes_matching(self, names: pd.Index, codes: np.ndarray, value) -> np.ndarray:
+        position = names.get_indexer([value])[0]
+        return codes == position if position >= 0 else np.zeros(len(codes), dtype=bool)
+
+    def filter(
+        self,
+        text: str = "",
+        category: Optional[str] = None,
+        source_table: Optional[str] = None,
+        ranked: Optional[pd.DataFrame] = None,
+    ) -> pd.DataFrame:
+        """
+        Return the items whose label contains text and that match the filters.
+
+        Args:
+            text: Case-insensitive substring of the label; empty matches all.
+            category: Category to keep, or None for all.
+            source_table: Source table to keep, or None for all.
+            ranked: Search hits with source_table, itemid and score columns.
+                When given, hits are kept as well as label matches, and rows
+                are ordered by score with label matches scoring 1.
+
+        Returns:
+            Matching rows of items, sorted by label (or score when ranked)
+            and keeping their positions in items as the index.
+        """
+        mask = np.ones(len(self.items), dtype=bool)
+        if source_table is not None:
+            mask &= self._codes_matching(self.source_names, self.source_codes, source_table)
+        if category is not None:
+            mask &= self._codes_matching(self.category_names, self.category_codes, category)
+        text = text.strip().lower()
+        if not text:
+            return self.items[mask]
+
+        # Only the rows that survived the cheap code filters are scanned
+        candidates = self.label_keys[mask]
+        label_matches = np.zeros(len(self.items), dtype=bool)
+        label_matches[candidates.index] = candidates.str.contains(text, regex=False).to_numpy()
+        if ranked is None:
+            return self.items[mask & label_matches]
+
+        hit_positions = pd.MultiIndex.from_frame(
+            ranked[["source_table", "itemid"]]
+        ).get_indexer(self.item_keys)
+        is_hit = hit_positions >= 0
+        scores = np.where(label_matches, 1.0, 0.0)
+        scores[is_hit] = ranked["score"].to_numpy(dtype=float)[hit_positions[is_hit]]
+        keep = np.flatnonzero(mask & (label_matches | is_hit))
+        # A stable sort keeps equally scored rows in label order
+        keep = keep[np.argsort(-scores[keep], kind="stable")]
+        return self.items.iloc[keep]
+
+    def records(self, positions: Sequence[int]) -> List[dict]:
+        """Return the items at the given positions as selection dictionaries."""
+        return self.items.iloc[list(positions)].to_dict("records")
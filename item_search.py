@@ -0,0 +1,321 @@
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dictionaries import DictionaryTable
+
+# Weight of a trigram found in each searchable field of a dictionary entry.
+FIELD_WEIGHTS = {"label": 1.0, "abbreviation": 1.0, "fluid": 0.5, "category": 0.5}
+# Share of the query's trigrams an entry must contain to be returned.
+MINIMUM_SIMILARITY = 0.5
+# Weight of an exact, prefix or substring match of the query in each field.
+MATCH_WEIGHTS = {"label": 1.0, "abbreviation": 0.9, "fluid": 0.5, "category": 0.4}
+# Most similar entries whose matches are scored, per requested hit.
+CANDIDATES_PER_HIT = 2
+# Clinical shorthand searched spelled out as well, since an initialism such as
+# "sbp" shares no trigram with "Arterial Blood Pressure systolic".
+QUERY_SYNONYMS = {
+    "sbp": "systolic blood pressure",
+    "dbp": "diastolic blood pressure",
+    "map": "mean blood pressure",
+    "hr": "heart rate",
+    "rr": "respiratory rate",
+    "spo2": "o2 saturation",
+    "temp": "temperature",
+    "gcs": "gcs glasgow coma scale",
+    "norepi": "norepinephrine",
+    "levo": "norepinephrine",
+    "epi": "epinephrine",
+    "vaso": "vasopressin",
+    "wbc": "white blood cells",
+    "hgb": "hemoglobin",
+    "hct": "hematocrit",
+    "plt": "platelet count",
+    "bun": "urea nitrogen",
+    "cr": "creatinine",
+    "inr": "inr pt",
+    "uop": "urine output",
+}
+# Dictionary each event table's itemids are described in.
+DICTIONARY_BY_SOURCE_TABLE = {
+    "chartevents": "d_items",
+    "outputevents": "d_items",
+    "datetimeevents": "d_items",
+    "ingredientevents": "d_items",
+    "inputevents": "d_items",
+    "procedureevents": "d_items",
+    "labevents": "d_labitems",
+}
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text) -> str:
+    """Lowercase text and reduce punctuation to single spaces."""
+    if not isinstance(text, str):
+        return ""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def expand_query(query: str) -> str:
+    """Spell out the clinical shorthand words of a normalized query."""
+    return " ".join(QUERY_SYNONYMS.get(word, word) for word in query.split())
+
+
+def trigrams(text: str) -> set:
+    """Return the trigrams of each word of normalized text, padded like pg_trgm."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[position:position + 3] for position in range(len(padded) - 2))
+    return grams
+
+
+@dataclass(frozen=True, eq=False)
+class ItemSearchIndex:
+    """
+    Trigram index over every d_items and d_labitems entry.
+
+    Each trigram maps to the entries containing it and the weight of the
+    best field it occurs in, so a query is scored with one bincount-style
+    accumulation per query trigram. Entries whose label or abbreviation
+    contains the query as a word prefix or substring rank above pure
+    trigram similarity, so "norepi" puts Norepinephrine first; fluid and
+    category matches count for less.
+    """
+
+    entries: pd.DataFrame
+    fields: Dict[str, np.ndarray]
+    postings: Dict[str, Tuple[np.ndarray, np.ndarray]]
+    exact_matches: Dict[str, np.ndarray]
+
+    @classmethod
+    def build(cls, d_items: DictionaryTable, d_labitems: DictionaryTable) -> "ItemSearchIndex":
+        """Index both item dictionaries; fluid is only present for lab items."""
+        frames = []
+        for table in (d_items, d_labitems):
+            frame = table.frame()
+            frame.insert(0, "dictionary", table.table)
+            frames.append(frame)
+        entries = pd.concat(frames, ignore_index=True).reindex(
+            columns=["dictionary", "itemid", *FIELD_WEIGHTS]
+        )
+
+        entry_ids: Dict[str, List[int]] = defaultdict(list)
+        entry_weights: Dict[str, List[float]] = defaultdict(list)
+        exact_ids: Dict[str, set] = defaultdict(set)
+        field_values = {field: entries[field].map(normalize).tolist() for field in FIELD_WEIGHTS}
+        for entry_id in range(len(entries)):
+            best_weights: Dict[str, float] = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                exact_ids[field_values[field][entry_id]].add(entry_id)
+                for gram in trigrams(field_values[field][entry_id]):
+                    best_weights[gram] = max(weight, best_weights.get(gram, 0.0))
+            for gram, weight in best_weights.items():
+                entry_ids[gram].append(entry_id)
+                entry_weights[gram].append(weight)
+
+        postings = {
+            gram: (
+                np.asarray(entry_ids[gram], dtype=np.int32),
+                np.asarray(entry_weights[gram], dtype=np.float32),
+            )
+            for gram in entry_ids
+        }
+        return cls(
+            entries=entries,
+            fields={
+                field: np.asarray(values, dtype=object)
+                for field, values in field_values.items()
+            },
+            postings=postings,
+            exact_matches={
+                text: np.fromiter(sorted(ids), dtype=np.int64)
+                for text, ids in exact_ids.items()
+                if text
+            },
+        )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _match_bonus(self, query: str, entry_id: int) -> float:
+        """Score the best exact, word-prefix or substring match of query in any field."""
+        bonus = 0.0
+        for field, weight in MATCH_WEIGHTS.items():
+            text = self.fields[field][entry_id]
+            if not text:
+                continue
+            if text == query:
+                bonus = max(bonus, 3.0 * weight)
+            elif text.startswith(query) or f" {query}" in text:
+                bonus = max(bonus, 2.0 * weight)
+            elif query in text:
+                bonus = max(bonus, 1.0 * weight)
+        return bonus
+
+    def _candidates(self, query: str, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the entries similar enough to a normalized query and their scores."""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = np.zeros(len(self.entries), dtype=np.float32)
+        for gram in query_grams:
+            posting = self.postings.get(gram)
+            if posting is not None:
+                # Entry ids are unique within a posting list
+                scores[posting[0]] += posting[1]
+        scores /= len(query_grams)
+
+        candidates = np.flatnonzero(scores >= MINIMUM_SIMILARITY)
+        pool_size = CANDIDATES_PER_HIT * limit
+        if len(candidates) > pool_size:
+            candidates = candidates[
+                np.argpartition(-scores[candidates], pool_size)[:pool_size]
+            ]
+        # Exact field matches always compete, even among many similar entries
+        exact = self.exact_matches.get(query)
+        if exact is not None:
+            candidates = np.union1d(candidates, exact)
+
+        ranked_scores = scores[candidates] + np.fromiter(
+            (self._match_bonus(query, entry_id) for entry_id in candidates),
+            dtype=np.float32,
+            count=len(candidates),
+        )
+        return candidates, ranked_scores
+
+    def rank(self, query: str, limit: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the positions in entries of the best hits for query and their scores.
+
+        Shorthand in QUERY_SYNONYMS is searched spelled out as well, and
+        each entry keeps the better of its two scores.
+        """
+        query = normalize(query)
+        candidates, scores = self._candidates(query, limit)
+        expanded = expand_query(query)
+        if expanded != query:
+            expanded_candidates, expanded_scores = self._candidates(expanded, limit)
+            candidates = np.concatenate([candidates, expanded_candidates])
+            scores = np.concatenate([scores, expanded_scores])
+            best_first = np.lexsort((-scores, candidates))
+            candidates, first = np.unique(candidates[best_first], return_index=True)
+            scores = scores[best_first][first]
+
+        order = np.lexsort((self.fields["label"][candidates], -scores))[:limit]
+        return candidates[order], scores[order]
+
+    def search(self, query: str, limit: int = 50) -> pd.DataFrame:
+        """
+        Return the dictionary entries best matching query.
+
+        Args:
+            query: Free text such as "sbp", "lactate" or "norepi".
+            limit: Maximum number of hits returned.
+
+        Returns:
+            Hits ordered by descending score, with the entry's dictionary
+            ("d_items" or "d_labitems"), itemid, label, abbreviation, fluid,
+            category and score. Empty when nothing is similar enough.
+        """
+        positions, scores = self.rank(query, limit)
+        hits = self.entries.iloc[positions].reset_index(drop=True)
+        hits["score"] = scores.round(3)
+        return hits
+
+
+def annotate_hits(hits: pd.DataFrame, item_types: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mark which search hits the current admission has data for.
+
+    Args:
+        hits: Result of ItemSearchIndex.search.
+        item_types: The admission's item list from get_item_types.
+
+    Returns:
+        hits with source_table and data_count taken from the admission's
+        item row, or None and 0 when the admission has no such item, and a
+        boolean has_data column.
+    """
+    annotated = hits.copy()
+    admission_items = pd.DataFrame(columns=["dictionary", "itemid", "source_table", "data_count"])
+    if not item_types.empty:
+        admission_items = item_types.assign(
+            dictionary=item_types["source_table"].map(DICTIONARY_BY_SOURCE_TABLE)
+        ).dropna(subset=["dictionary"])
+        admission_items = admission_items.drop_duplicates(["dictionary", "itemid"])
+    keys = pd.MultiIndex.from_frame(admission_items[["dictionary", "itemid"]])
+    positions = keys.get_indexer(pd.MultiIndex.from_frame(annotated[["dictionary", "itemid"]]))
+    has_data = positions >= 0
+
+    source_tables = np.full(len(annotated), None, dtype=object)
+    data_counts = np.zeros(len(annotated), dtype=np.int64)
+    source_tables[has_data] = admission_items["source_table"].to_numpy(dtype=object)[positions[has_data]]
+    data_counts[has_data] = (
+        pd.to_numeric(admission_items["data_count"], errors="coerce")
+        .fillna(0)
+        .to_numpy(dtype=np.int64)[positions[has_data]]
+    )
+    annotated["source_table"] = source_tables
+    annotated["data_count"] = data_counts
+    annotated["has_data"] = has_data
+    return annotated
+
+
+def describe_hit(hit) -> str:
+    """Return 'label (fluid or abbreviation)' for a search hit row."""
+    detail = next(
+        (
+            value
+            for value in (hit.fluid, hit.abbreviation)
+            if isinstance(value, str) and value and value != hit.label
+        ),
+        hit.dictionary,
+    )
+    return f"{hit.label} ({detail})"
+
+
+_index_lock = threading.Lock()
+# The dictionary tables the index was built from, kept alongside it so a
+# reloaded table is never mistaken for the one it replaced.
+_cached_index: Optional[Tuple[DictionaryTable, DictionaryTable, ItemSearchIndex]] = None
+
+
+def _same_table(cached: DictionaryTable, current: DictionaryTable) -> bool:
+    """
+    Return whether current is the table cached was built from.
+
+    Empty reads are not kept by the dictionary store, so each call returns a
+    new empty table; those of one store version are treated as the same.
+    """
+    if cached is current:
+        return True
+    return not len(cached) and not len(current) and cached.version == current.version
+
+
+def get_item_search_index(backend) -> Optional[ItemSearchIndex]:
+    """
+    Return the search index for the backend's current dictionaries.
+
+    The index is built once per loaded dictionary pair and shared by every
+    session; reloading the dictionaries builds a new one on next use.
+    """
+    global _cached_index
+    d_items = backend.get_dictionary("d_items")
+    d_labitems = backend.get_dictionary("d_labitems")
+    if not len(d_items) and not len(d_labitems):
+        return None
+    with _index_lock:
+        if _cached_index is None or not (
+            _same_table(_cached_index[0], d_items)
+            and _same_table(_cached_index[1], d_labitems)
+        ):
+            _cached_index = (d_items, d_labitems, ItemSearchIndex.build(d_items, d_labitems))
+        return _cached_index[2]
@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import mysql.connector
+
+
+class PoolTimeoutError(mysql.connector.Error):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PooledConnection:
+    """Proxy around a MySQL connection that returns it to the pool on close()."""
+
+    def __init__(self, pool: "MySQLConnectionPool", connection: Any) -> None:
+        self._pool = pool
+        self._connection = connection
+        self._failed = False
+
+    def __getattr__(self, attribute_name: str) -> Any:
+        connection = self.__dict__.get("_connection")
+        if connection is None:
+            raise AttributeError("Pooled connection has already been returned.")
+        return getattr(connection, attribute_name)
+
+    @property
+    def statement_cache(self) -> "OrderedDict[str, Any]":
+        """Prepared statements kept open on the underlying connection."""
+        return self._pool._statement_cache(self._connection)
+
+    def mark_failed(self) -> None:
+        """Record that a statement failed, so the connection is not reused."""
+        self._failed = True
+
+    def close(self) -> None:
+        """Hand the connection back to the pool instead of closing the socket."""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool._release(connection, failed=self._failed)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.mark_failed()
+        self.close()
+
+
+def _close_quietly(connection: Any) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class MySQLConnectionPool:
+    """
+    Pool of MySQL connections checked out one per caller.
+
+    Up to pool_size connections are kept open between checkouts; up to
+    max_overflow extra connections are opened under load and closed again on
+    release. Idle connections are only pinged when they have been unused for
+    longer than health_check_interval, and closed once idle for idle_timeout.
+    """
+
+    def __init__(
+        self,
+        connect_arguments: Dict[str, Any],
+        pool_size: int = 8,
+        max_overflow: int = 4,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        checkout_timeout: Optional[float] = 30.0,
+    ) -> None:
+        self.connect_arguments = dict(connect_arguments)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._condition = threading.Condition()
+        # (connection, time it was returned), most recently used on the right
+        self._idle_connections: Deque[Tuple[Any, float]] = deque()
+        self._open_count = 0
+        self._in_use_count = 0
+        # Prepared statements are server-side state tied to one session.
+        self._statement_caches: Dict[int, "OrderedDict[str, Any]"] = {}
+
+        self._checkouts = 0
+        self._created = 0
+        self._reconnects = 0
+        self._timeouts = 0
+        self._idle_closed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        # Open the first connection eagerly so bad credentials fail fast.
+        first_connection = self._connect()
+        with self._condition:
+            self._open_count += 1
+            self._idle_connections.append((first_connection, time.monotonic()))
+
+    def _connect(self) -> Any:
+        # Autocommit keeps long-lived pooled connections from reading a stale
+        # REPEATABLE READ snapshot.
+        connection = mysql.connector.connect(autocommit=True, **self.connect_arguments)
+        with self._condition:
+            self._created += 1
+        return connection
+
+    def _take_stale_idle_locked(self) -> List[Any]:
+        """Remove connections idle past idle_timeout; caller must hold the lock."""
+        stale_connections = []
+        expiry = time.monotonic() - self.idle_timeout
+        while self._idle_connections and self._idle_connections[0][1] < expiry:
+            stale_connections.append(self._idle_connections.popleft()[0])
+            self._open_count -= 1
+            self._idle_closed += 1
+        return stale_connections
+
+    def acquire(self) -> PooledConnection:
+        """Check out a connection, waiting up to checkout_timeout for a free one."""
+        started_at = time.monotonic()
+        deadline = (
+            started_at + self.checkout_timeout
+            if self.checkout_timeout is not None
+            else None
+        )
+        connection, returned_at = None, None
+
+        with self._condition:
+            stale_connections = self._take_stale_idle_locked()
+            while True:
+                if self._idle_connections:
+                    connection, returned_at = self._idle_connections.pop()
+                    break
+                if self._open_count < self.pool_size + self.max_overflow:
+                    # Reserve the slot now and open the socket outside the lock.
+                    self._open_count += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No MySQL connection available within {self.checkout_timeout}s."
+                    )
+                self._condition.wait(remaining)
+
+            waited = time.monotonic() - started_at
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        for stale_connection in stale_connections:
+            self._discard(stale_connection)
+
+        try:
+            if connection is None:
+                connection = self._connect()
+            elif time.monotonic() - returned_at > self.health_check_interval:
+                connection = self._revalidate(connection)
+        except Exception:
+            with self._condition:
+                self._open_count -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._checkouts += 1
+            self._in_use_count += 1
+        return PooledConnection(self, connection)
+
+    def _revalidate(self, connection: Any) -> Any:
+        """Ping a connection that sat idle for a while, reconnecting if it died."""
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except mysql.connector.Error:
+            with self._condition:
+                self._reconnects += 1
+                # The new session has none of the old prepared statements.
+                self._statement_caches.pop(id(connection), None)
+            connection.reconnect(attempts=3, delay=2)
+            return connection
+
+    def _statement_cache(self, connection: Any) -> "OrderedDict[str, Any]":
+        with self._condition:
+            return self._statement_caches.setdefault(id(connection), OrderedDict())
+
+    def _discard(self, connection: Any) -> None:
+        """Close a connection for good and forget its prepared statements."""
+        with self._condition:
+            self._statement_caches.pop(id(connection), None)
+        _close_quietly(connection)
+
+    def _release(self, connection: Any, failed: bool = False) -> None:
+        # A checkout whose statement failed mid-flight (lost connection,
+        # unread result) may leave the session in any state, so it is closed.
+        reusable = not failed and not getattr(connection, "unread_result", False)
+        try:
+            if reusable and connection.in_transaction:
+                connection.rollback()
+        except mysql.connector.Error:
+            reusable = False
+
+        connections_to_close = []
+        with self._condition:
+            self._in_use_count -= 1
+            connections_to_close.extend(self._take_stale_idle_locked())
+            if reusable and len(self._idle_connections) < self.pool_size:
+                self._idle_connections.append((connection, time.monotonic()))
+            else:
+                # Overflow or broken connection: close it instead of keeping it.
+                self._open_count -= 1
+                connections_to_close.append(connection)
+            self._condition.notify()
+
+        for connection_to_close in connections_to_close:
+            self._discard(connection_to_close)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool occupancy and checkout metrics."""
+        with self._condition:
+            return {
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._open_count,
+                "idle": len(self._idle_connections),
+                "in_use": self._in_use_count,
+                "checkouts": self._checkouts,
+                "created": self._created,
+                "reconnects": self._reconnects,
+                "timeouts": self._timeouts,
+                "idle_closed": self._idle_closed,
+                "wait_total_seconds": self._wait_total,
+                "wait_max_seconds": self._wait_max,
+                "wait_avg_seconds": (
+                    self._wait_total / self._checkouts if self._checkouts else 0.0
+                ),
+            }
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._condition:
+            idle_connections = [connection for connection, _ in self._idle_connections]
+            self._idle_connections.clear()
+            self._open_count -= len(idle_connections)
+        for connection in idle_connections:
+            self._discard(connection)
@@ -0,0 +1,251 @@
+import html
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from db_connections import get_arg_value
+
+SCHEMA_VERSION = "1"
+# Control characters cannot occur in note text, so they delimit matches safely.
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+SNIPPET_TOKENS = 24
+
+_QUERY_TERM = re.compile(r'"[^"]*"?|[^\s"]+')
+_WORD_CHARACTERS = re.compile(r"[^\w*]+")
+
+
+def match_expression(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Quoted text is searched as a phrase, a trailing * searches a prefix and
+    every other word is a term that must occur; FTS5 operators and
+    punctuation in the input are treated as plain text.
+    """
+    terms = []
+    for term in _QUERY_TERM.findall(query):
+        if term.startswith('"'):
+            phrase = " ".join(_WORD_CHARACTERS.sub(" ", term.strip('"')).replace("*", " ").split())
+            if phrase:
+                terms.append(f'"{phrase}"')
+            continue
+        for word in _WORD_CHARACTERS.sub(" ", term).split():
+            prefix = word.endswith("*")
+            word = word.replace("*", "")
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def split_matches(marked_text: str) -> Tuple[str, List[Tuple[int, int]]]:
+    """Remove match markers, returning the plain text and (start, end) offsets of each match."""
+    plain_parts = []
+    offsets = []
+    position = 0
+    plain_length = 0
+    while True:
+        start = marked_text.find(MATCH_START, position)
+        if start < 0:
+            plain_parts.append(marked_text[position:])
+            break
+        end = marked_text.find(MATCH_END, start)
+        if end < 0:
+            end = len(marked_text)
+        plain_parts.append(marked_text[position:start])
+        plain_length += start - position
+        match_text = marked_text[start + 1:end]
+        plain_parts.append(match_text)
+        offsets.append((plain_length, plain_length + len(match_text)))
+        plain_length += len(match_text)
+        position = end + 1
+    return "".join(plain_parts), offsets
+
+
+def highlight_html(marked_text: str) -> str:
+    """Escape marked text for HTML, wrap its matches in <mark> tags and keep line breaks."""
+    return (
+        html.escape(marked_text)
+        .replace(MATCH_START, "<mark>")
+        .replace(MATCH_END, "</mark>")
+        .replace("\n", "<br>")
+    )
+
+
+@dataclass
+class NoteHit:
+    """One note matching a search, with where the query matched in its text."""
+
+    note_id: str
+    subject_id: int
+    hadm_id: Optional[int]
+    note_type: Optional[str]
+    note_seq: Optional[int]
+    charttime: Optional[str]
+    # bm25 rank; lower is a better match
+    score: float
+    snippet: str
+    match_offsets: List[Tuple[int, int]] = field(default_factory=list)
+    marked_text: str = ""
+
+
+class NotesIndex:
+    """
+    Reader for the SQLite FTS5 index written by scripts/build_notes_index.py.
+
+    Searches are ranked by bm25 inside FTS5 and stop after the requested
+    number of hits, so snippets and match offsets are only computed for the
+    notes shown. Each thread gets its own read-only connection.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        info = self.info()
+        if info.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(
+                f"{self.path} has notes index schema {info.get('schema_version')!r}, "
+                f"expected {SCHEMA_VERSION!r}; rebuild it with scripts/build_notes_index.py."
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.connection = connection
+        return connection
+
+    def info(self) -> Dict[str, str]:
+        return dict(self._connection().execute("SELECT key, value FROM index_info"))
+
+    def _scope(self, subject_id, hadm_id) -> Optional[Tuple[str, list]]:
+        """
+        Return the rowid restriction SQL and parameters for a search scope.
+
+        FTS5 seeks straight to a rowid range, so the scope's range is given
+        alongside the exact rowid list; notes are indexed in source order,
+        which keeps one patient's notes close together. Returns None when
+        the scope has no notes.
+        """
+        if hadm_id is None and subject_id is None:
+            return "", []
+        if hadm_id is not None:
+            scope_filter = ("hadm_id = ?", int(hadm_id))
+        else:
+            scope_filter = ("subject_id = ?", int(subject_id))
+        rowids = [
+            rowid
+            for (rowid,) in self._connection().execute(
+                f"SELECT rowid FROM notes WHERE {scope_filter[0]}", [scope_filter[1]]
+            )
+        ]
+        if not rowids:
+            return None
+        return (
+            f"AND rowid BETWEEN ? AND ? AND rowid IN ({', '.join('?' * len(rowids))})",
+            [min(rowids), max(rowids), *rowids],
+        )
+
+    def count(self, query: str, subject_id=None, hadm_id=None) -> int:
+        """Return how many notes in the scope match query."""
+        expression = match_expression(query)
+        if not expression:
+            return 0
+        scope = self._scope(subject_id, hadm_id)
+        if scope is None:
+            return 0
+        scope_sql, scope_parameters = scope
+        (match_count,) = self._connection().execute(
+            f"SELECT COUNT(*) FROM note_fts WHERE note_fts MATCH ? {scope_sql}",
+            [expression, *scope_parameters],
+        ).fetchone()
+        return match_count
+
+    def search(
+        self,
+        query: str,
+        subject_id=None,
+        hadm_id=None,
+        limit: int = 20,
+        with_text: bool = False,
+    ) -> List[NoteHit]:
+        """
+        Return the best matching notes for a term or phrase query.
+
+        Args:
+            query: Words, "quoted phrases" and prefix* terms, all required.
+            subject_id: Restrict to one patient's notes.
+            hadm_id: Restrict to one admission's notes; takes precedence.
+            limit: Maximum number of hits.
+            with_text: Also return each note's full text with matches marked.
+
+        Returns:
+            Hits ordered from best to worst bm25 score, each with a snippet
+            and the character offsets of every match in the note text.
+        """
+        expression = match_expression(query)
+        if not expression:
+            return []
+        scope = self._scope(subject_id, hadm_id)
+        if scope is None:
+            return []
+        scope_sql, scope_parameters = scope
+        connection = self._connection()
+        ranked_rows = connection.execute(
+            f"""
+            SELECT rowid, bm25(note_fts) AS score,
+                   snippet(note_fts, 0, ?, ?, ' … ', {SNIPPET_TOKENS}),
+                   highlight(note_fts, 0, ?, ?)
+            FROM note_fts
+            WHERE note_fts MATCH ? {scope_sql}
+            ORDER BY {"score" if scope_sql else "rank"}
+            LIMIT ?
+            """,
+            [MATCH_START, MATCH_END, MATCH_START, MATCH_END, expression,
+             *scope_parameters, int(limit)],
+        ).fetchall()
+        if not ranked_rows:
+            return []
+
+        rowids = [row[0] for row in ranked_rows]
+        metadata = {
+            row[0]: row[1:]
+            for row in connection.execute(
+                "SELECT rowid, note_id, subject_id, hadm_id, note_type, note_seq, charttime "
+                f"FROM notes WHERE rowid IN ({', '.join('?' * len(rowids))})",
+                rowids,
+            )
+        }
+        hits = []
+        for rowid, score, snippet, marked_text in ranked_rows:
+            _, match_offsets = split_matches(marked_text)
+            hits.append(
+                NoteHit(
+                    *metadata[rowid],
+                    score=score,
+                    snippet=snippet,
+                    match_offsets=match_offsets,
+                    marked_text=marked_text if with_text else "",
+                )
+            )
+        return hits
+
+
+@st.cache_resource
+def get_notes_index() -> Optional[NotesIndex]:
+    """Open the notes index given by --notes-index, if any."""
+    argument_value = get_arg_value("--notes-index")
+    if not argument_value:
+        return None
+    path = Path(argument_value).expanduser()
+    if not path.exists():
+        st.warning(
+            f"No notes index found at {path}. Run scripts/build_notes_index.py first."
+        )
+        return None
+    return NotesIndex(path)
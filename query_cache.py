@@ -0,0 +1,221 @@
+import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from db_connections import get_arg_value, unavailable_read_count
+
+DEFAULT_TTL_SECONDS = 600.0
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_MEGABYTES = 256
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convert call arguments into a hashable representation for cache keys."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(element) for element in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(element)) for key, element in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_freeze(element) for element in value))
+    hash(value)
+    return value
+
+
+def _copy_value(value: Any) -> Any:
+    """Return a copy that callers can mutate without corrupting the cache."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, list):
+        return [_copy_value(element) for element in value]
+    if isinstance(value, dict):
+        return {key: _copy_value(element) for key, element in value.items()}
+    return value
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate the memory held by a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(element) for element in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            _estimate_size(key) + _estimate_size(element)
+            for key, element in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Thread-safe LRU cache with TTL expiry and a memory budget."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_MEGABYTES * 1024 * 1024,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_command_line(cls) -> "QueryCache":
+        """Build a cache configured by --cache-ttl, --cache-max-entries and --cache-max-mb."""
+        ttl_seconds = get_arg_value("--cache-ttl")
+        max_entries = get_arg_value("--cache-max-entries")
+        max_megabytes = get_arg_value("--cache-max-mb")
+        return cls(
+            max_entries=int(max_entries) if max_entries else DEFAULT_MAX_ENTRIES,
+            max_bytes=int(float(max_megabytes or DEFAULT_MAX_MEGABYTES) * 1024 * 1024),
+            ttl_seconds=float(ttl_seconds) if ttl_seconds else DEFAULT_TTL_SECONDS,
+        )
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) for a key, refreshing its LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, _copy_value(value)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting least recently used entries when over budget."""
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (
+                time.monotonic() + self.ttl_seconds,
+                size,
+                _copy_value(value),
+            )
+            self._current_bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self._current_bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(
+        self, subject_id: Optional[int] = None, hadm_id: Optional[int] = None
+    ) -> int:
+        """Drop entries for a subject and/or admission; drop everything when both are None."""
+        with self._lock:
+            if subject_id is None and hadm_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._current_bytes = 0
+                return removed
+
+            matching_keys = [
+                key
+                for key in self._entries
+                if (subject_id is None or key[1] == subject_id)
+                and (hadm_id is None or key[2] == hadm_id)
+            ]
+            for key in matching_keys:
+                self._remove(key)
+            return len(matching_keys)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self.invalidate()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._current_bytes -= size
+
+
+query_cache = QueryCache.from_command_line()
+
+
+def make_cache_key(
+    function_name: str,
+    subject_id: Any,
+    hadm_id: Any,
+    arguments: Dict[str, Any],
+) -> Hashable:
+    """Build the (function, subject_id, hadm_id, args) key used for cached reads."""
+    return (function_name, subject_id, hadm_id, _freeze(arguments))
+
+
+def cached_query(function: Callable) -> Callable:
+    """
+    Memoize a per-admission reader in the shared query cache.
+
+    Results read while a database was unavailable (no pooled connection or
+    MongoDB client) are returned but not cached, so an outage is retried on
+    the next call instead of being served as "no data" until the TTL expires.
+    """
+    signature = inspect.signature(function)
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        bound_arguments = signature.bind(*args, **kwargs)
+        bound_arguments.apply_defaults()
+        arguments = dict(bound_arguments.arguments)
+        subject_id = arguments.pop("subject_id", None)
+        hadm_id = arguments.pop("hadm_id", None)
+        try:
+            cache_key = make_cache_key(
+                function.__name__, subject_id, hadm_id, arguments
+            )
+        except TypeError:
+            return function(*args, **kwargs)
+
+        found, cached_value = query_cache.get(cache_key)
+        if found:
+            return cached_value
+
+        unavailable_reads = unavailable_read_count()
+        result = function(*args, **kwargs)
+        if unavailable_read_count() == unavailable_reads:
+            query_cache.set(cache_key, result)
+        return result
+
+    return wrapper
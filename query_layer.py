@@ -0,0 +1,84 @@
+from typing import Any, Collection, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Prepared statements kept open per pooled connection.
+MAX_PREPARED_STATEMENTS = 64
+
+
+def identifier(name: str, allowed: Collection[str]) -> str:
+    """Return a quoted table/column identifier after checking it against a whitelist."""
+    if name not in allowed:
+        raise ValueError(f"Unsupported SQL identifier: {name!r}")
+    return f"`{name}`"
+
+
+def placeholders(count: int) -> str:
+    """Return a comma separated list of count bound-parameter markers."""
+    if count < 1:
+        raise ValueError("At least one parameter is required.")
+    return ", ".join(["%s"] * count)
+
+
+def _to_native(value: Any) -> Any:
+    """Convert pandas/numpy scalars into types the MySQL protocol can bind."""
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _prepared_cursor(connection: Any, query: str):
+    """Return a prepared cursor for query, reusing one already prepared on this connection."""
+    statement_cache = getattr(connection, "statement_cache", None)
+    if statement_cache is None:
+        return connection.cursor(prepared=True), query, False
+
+    cached_statement = statement_cache.get(query)
+    if cached_statement is not None:
+        statement_cache.move_to_end(query)
+        # The cursor only skips re-preparing when handed the exact string
+        # object it prepared, so reuse the cached key rather than the argument.
+        return cached_statement[1], cached_statement[0], True
+
+    cursor = connection.cursor(prepared=True)
+    statement_cache[query] = (query, cursor)
+    while len(statement_cache) > MAX_PREPARED_STATEMENTS:
+        _, (_, evicted_cursor) = statement_cache.popitem(last=False)
+        evicted_cursor.close()
+    return cursor, query, True
+
+
+def read_query(connection: Any, query: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+    """
+    Run a parameterized SELECT as a server-side prepared statement.
+
+    Args:
+        connection: MySQL connection, normally checked out from the pool.
+        query: SQL text using %s markers for every value.
+        params: Values bound to the markers in order.
+
+    Returns:
+        The result set as a DataFrame, with DECIMAL values coerced to float
+        like pandas.read_sql does.
+    """
+    cursor, statement, is_cached = _prepared_cursor(connection, query)
+    try:
+        cursor.execute(statement, tuple(_to_native(value) for value in params))
+        rows = cursor.fetchall()
+        columns = list(cursor.column_names)
+    except Exception:
+        mark_failed = getattr(connection, "mark_failed", None)
+        if mark_failed is not None:
+            mark_failed()
+        if is_cached:
+            connection.statement_cache.pop(query, None)
+            cursor.close()
+        raise
+    finally:
+        if not is_cached:
+            cursor.close()
+
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
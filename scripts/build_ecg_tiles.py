@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import wfdb
+from tqdm import tqdm
+
+# The tile layout is defined once, next to its reader in the app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ecg_tiles import MANIFEST_FILE_NAME, chunk_file_name
+
+THUMBNAIL_LEAD = "II"
+
+
+def _find_records(base_directory: Path) -> List[Tuple[int, int, Path]]:
+    """Return (subject_id, study_id, record path) for every record under files/."""
+    records = []
+    for header_path in sorted(base_directory.glob("files/p*/p*/s*/*.hea")):
+        subject_identifier = header_path.parent.parent.name[1:]
+        study_identifier = header_path.stem
+        if subject_identifier.isdigit() and study_identifier.isdigit():
+            records.append(
+                (int(subject_identifier), int(study_identifier), header_path.with_suffix(""))
+            )
+    return records
+
+
+def _completed_chunks(output_directory: Path) -> Tuple[Set[int], int]:
+    """Return study ids already summarized and the next free chunk number."""
+    completed_studies: Set[int] = set()
+    next_chunk_number = 0
+    for index_path in output_directory.glob("chunk_*_index.npy"):
+        chunk_number = int(index_path.name.split("_")[1])
+        next_chunk_number = max(next_chunk_number, chunk_number + 1)
+        completed_studies.update(np.load(index_path)[:, 1].tolist())
+    return completed_studies, next_chunk_number
+
+
+def _summarize_record(record_path: Path, settings: Dict) -> Tuple[List[np.ndarray], np.ndarray]:
+    """Decode one record into per-level min/max arrays and a lead II thumbnail."""
+    record = wfdb.rdrecord(str(record_path))
+    sample_count = settings["samples_per_record"]
+    lead_count = len(settings["lead_names"])
+
+    # Pad or truncate to the store's fixed shape; missing samples stay NaN.
+    signal = np.full((sample_count, lead_count), np.nan, dtype=np.float32)
+    record_signal = np.asarray(record.p_signal, dtype=np.float32)
+    usable_samples = min(sample_count, record_signal.shape[0])
+    for lead_position, lead_name in enumerate(settings["lead_names"]):
+        if lead_name in record.sig_name:
+            signal[:usable_samples, lead_position] = record_signal[
+                :usable_samples, record.sig_name.index(lead_name)
+            ]
+
+    levels = []
+    with warnings.catch_warnings():
+        # All-NaN buckets are expected for short or partly missing records.
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        for bucket_size in settings["levels"]:
+            buckets = signal.reshape(sample_count // bucket_size, bucket_size, lead_count)
+            minimums = np.nanmin(buckets, axis=1).T
+            maximums = np.nanmax(buckets, axis=1).T
+            levels.append(np.stack([minimums, maximums], axis=-1).astype(np.float16))
+
+        # Keep the sample furthest from the median in each bucket so QRS
+        # complexes stay visible in a very short thumbnail.
+        thumbnail_points = settings["thumbnail_points"]
+        thumbnail_lead = (
+            settings["lead_names"].index(THUMBNAIL_LEAD)
+            if THUMBNAIL_LEAD in settings["lead_names"]
+            else 0
+        )
+        lead_values = signal[:, thumbnail_lead]
+        thumbnail_buckets = lead_values[
+            : thumbnail_points * (sample_count // thumbnail_points)
+        ].reshape(thumbnail_points, -1)
+        deviation = np.abs(thumbnail_buckets - np.nanmedian(lead_values))
+        picks = np.where(np.isnan(deviation), -1, deviation).argmax(axis=1)
+        thumbnail = thumbnail_buckets[np.arange(thumbnail_points), picks]
+    return levels, thumbnail.astype(np.float16)
+
+
+def _save_atomically(path: Path, array: np.ndarray) -> None:
+    temporary_path = path.with_name(path.name + ".tmp")
+    with open(temporary_path, "wb") as array_file:
+        np.save(array_file, array)
+    os.replace(temporary_path, path)
+
+
+def _build_chunk(
+    chunk_number: int,
+    records: Sequence[Tuple[int, int, Path]],
+    output_directory: Path,
+    settings: Dict,
+) -> Tuple[int, int]:
+    """Summarize a chunk of records; the index file is written last to mark completion."""
+    index_rows, level_rows, thumbnails = [], [[] for _ in settings["levels"]], []
+    failures = 0
+    for subject_id, study_id, record_path in records:
+        try:
+            levels, thumbnail = _summarize_record(record_path, settings)
+        except Exception:
+            failures += 1
+            continue
+        index_rows.append((subject_id, study_id))
+        for level_position, level in enumerate(levels):
+            level_rows[level_position].append(level)
+        thumbnails.append(thumbnail)
+
+    if not index_rows:
+        return 0, failures
+
+    for bucket_size, rows in zip(settings["levels"], level_rows):
+        _save_atomically(
+            output_directory / chunk_file_name(chunk_number, f"level_{bucket_size}"),
+            np.stack(rows),
+        )
+    _save_atomically(
+        output_directory / chunk_file_name(chunk_number, "thumbnail"), np.stack(thumbnails)
+    )
+    _save_atomically(
+        output_directory / chunk_file_name(chunk_number, "index"),
+        np.array(index_rows, dtype=np.int64),
+    )
+    return len(index_rows), failures
+
+
+def build_ecg_tiles(
+    base_directory: Path,
+    output_directory: Path,
+    levels: Sequence[int] = (25, 250),
+    thumbnail_points: int = 32,
+    samples_per_record: int = 5000,
+    chunk_size: int = 4096,
+    workers: Optional[int] = None,
+) -> None:
+    """
+    Summarize every MIMIC-IV-ECG record into chunked, memory-mappable arrays.
+
+    Args:
+        base_directory: Folder containing the files/pNNNN/... tree.
+        output_directory: Folder receiving manifest.json and the chunk files.
+        levels: Bucket sizes, in samples, of the min/max pyramid levels.
+        thumbnail_points: Points in each lead II thumbnail.
+        samples_per_record: Samples kept per record (MIMIC-IV-ECG: 10 s at 500 Hz).
+        chunk_size: Records per chunk file.
+        workers: Worker processes, defaults to the number of CPUs.
+    """
+    records = _find_records(base_directory)
+    if not records:
+        raise SystemExit(f"No WFDB records found under {base_directory / 'files'}.")
+
+    output_directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_directory / MANIFEST_FILE_NAME
+    if manifest_path.exists():
+        settings = json.loads(manifest_path.read_text())
+    else:
+        header = wfdb.rdheader(str(records[0][2]))
+        settings = {
+            "sampling_frequency": float(header.fs),
+            "samples_per_record": samples_per_record,
+            "lead_names": list(header.sig_name),
+            "levels": sorted(levels),
+            "thumbnail_points": thumbnail_points,
+        }
+        if any(samples_per_record % bucket_size for bucket_size in settings["levels"]):
+            raise SystemExit("--samples-per-record must be a multiple of every level.")
+        manifest_path.write_text(json.dumps(settings, indent=2))
+
+    completed_studies, next_chunk_number = _completed_chunks(output_directory)
+    pending_records = [record for record in records if record[1] not in completed_studies]
+    print(
+        f"{len(records)} records found, {len(completed_studies)} already summarized, "
+        f"{len(pending_records)} to go."
+    )
+
+    chunks = [
+        pending_records[position : position + chunk_size]
+        for position in range(0, len(pending_records), chunk_size)
+    ]
+    summarized, failed = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _build_chunk, next_chunk_number + offset, chunk, output_directory, settings
+            )
+            for offset, chunk in enumerate(chunks)
+        ]
+        for future in tqdm(as_completed(futures), total=len(futures), desc="chunks"):
+            chunk_summarized, chunk_failed = future.result()
+            summarized += chunk_summarized
+            failed += chunk_failed
+    print(f"Summarized {summarized} records ({failed} could not be read).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Precompute ECG min/max pyramids and thumbnails for --ecg-tile-dir."
+    )
+    parser.add_argument("--ecg-base-folder", required=True, type=Path)
+    parser.add_argument("--output-dir", required=True, type=Path)
+    parser.add_argument(
+        "--levels",
+        default="25,250",
+        help="Comma separated bucket sizes, in samples, of the pyramid levels.",
+    )
+    parser.add_argument("--thumbnail-points", type=int, default=32)
+    parser.add_argument("--samples-per-record", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--workers", type=int)
+    arguments = parser.parse_args()
+
+    build_ecg_tiles(
+        arguments.ecg_base_folder.expanduser(),
+        arguments.output_dir.expanduser(),
+        levels=[int(level) for level in arguments.levels.split(",")],
+        thumbnail_points=arguments.thumbnail_points,
+        samples_per_record=arguments.samples_per_record,
+        chunk_size=arguments.chunk_size,
+        workers=arguments.workers,
+    )
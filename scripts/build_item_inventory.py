@@ -0,0 +1,227 @@
+import argparse
+import time
+from typing import List, Sequence
+
+import mysql.connector
+from tqdm import tqdm
+
+from build_prescription_items import (
+    prescription_itemid_expression,
+    prescription_pair_expression,
+)
+
+# Source tables summarized into the inventory and the column holding event time.
+INVENTORY_SOURCES = {
+    "chartevents": "charttime",
+    "outputevents": "charttime",
+    "datetimeevents": "charttime",
+    "ingredientevents": "starttime",
+    "inputevents": "starttime",
+    "procedureevents": "starttime",
+    "labevents": "charttime",
+    "prescriptions": "starttime",
+}
+
+CREATE_INVENTORY_TABLE = """
+CREATE TABLE IF NOT EXISTS item_inventory (
+    subject_id INT NOT NULL,
+    hadm_id INT NOT NULL,
+    source_table VARCHAR(32) NOT NULL,
+    itemid BIGINT NOT NULL,
+    data_count INT NOT NULL,
+    first_time DATETIME NULL,
+    last_time DATETIME NULL,
+    PRIMARY KEY (hadm_id, source_table, itemid),
+    KEY item_inventory_subject (subject_id, hadm_id)
+)
+"""
+
+# One row per admission that has been materialized, so admissions without any
+# events are distinguishable from admissions that were never summarized.
+CREATE_INVENTORY_ADMISSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS item_inventory_admissions (
+    hadm_id INT NOT NULL PRIMARY KEY,
+    subject_id INT NOT NULL,
+    built_at DATETIME NOT NULL
+)
+"""
+
+
+def _summary_select(source_table: str, where_clause: str) -> str:
+    """Build the GROUP BY that summarizes one event table."""
+    time_column = INVENTORY_SOURCES[source_table]
+    if source_table == "prescriptions":
+        # Prescriptions have no itemid; group by drug/route and emit the same
+        # synthetic itemid used by prescription_items and utils.py. Grouping
+        # on the exact text keeps case variants apart, as their ids differ.
+        item_expression = f"MIN({prescription_itemid_expression()})"
+        group_columns = prescription_pair_expression()
+    else:
+        item_expression = "itemid"
+        group_columns = "itemid"
+    return f"""
+    SELECT subject_id, hadm_id, '{source_table}', {item_expression},
+           COUNT(*), MIN({time_column}), MAX({time_column})
+    FROM {source_table}
+    WHERE hadm_id IS NOT NULL {where_clause}
+    GROUP BY subject_id, hadm_id, {group_columns}
+    """
+
+
+def _pending_admissions(cursor, rebuild: bool) -> List[Sequence[int]]:
+    """Return (subject_id, hadm_id) pairs that still need summarizing."""
+    if rebuild:
+        cursor.execute("SELECT subject_id, hadm_id FROM admissions ORDER BY hadm_id")
+    else:
+        cursor.execute(
+            """
+            SELECT a.subject_id, a.hadm_id
+            FROM admissions a
+            LEFT JOIN item_inventory_admissions b ON a.hadm_id = b.hadm_id
+            WHERE b.hadm_id IS NULL
+            ORDER BY a.hadm_id
+            """
+        )
+    return cursor.fetchall()
+
+
+def _refresh_batch(connection, admissions: Sequence[Sequence[int]]) -> None:
+    """Replace the inventory rows for a batch of admissions in one transaction."""
+    hadm_ids = [int(hadm_id) for _, hadm_id in admissions]
+    hadm_list = ", ".join(str(hadm_id) for hadm_id in hadm_ids)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DELETE FROM item_inventory WHERE hadm_id IN ({hadm_list})")
+        for source_table in INVENTORY_SOURCES:
+            cursor.execute(
+                "INSERT INTO item_inventory "
+                + _summary_select(source_table, f"AND hadm_id IN ({hadm_list})")
+            )
+        cursor.executemany(
+            "REPLACE INTO item_inventory_admissions (hadm_id, subject_id, built_at) "
+            "VALUES (%s, %s, NOW())",
+            [(int(hadm_id), int(subject_id)) for subject_id, hadm_id in admissions],
+        )
+        connection.commit()
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _full_build(connection) -> None:
+    """Rebuild the whole inventory with one table scan per event table."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("TRUNCATE TABLE item_inventory")
+        cursor.execute("TRUNCATE TABLE item_inventory_admissions")
+        for source_table in tqdm(INVENTORY_SOURCES, desc="Summarizing tables"):
+            cursor.execute("INSERT INTO item_inventory " + _summary_select(source_table, ""))
+            connection.commit()
+        cursor.execute(
+            "INSERT INTO item_inventory_admissions (hadm_id, subject_id, built_at) "
+            "SELECT hadm_id, subject_id, NOW() FROM admissions"
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def build_item_inventory(
+    host: str,
+    user: str,
+    password: str,
+    database: str = "mimic4",
+    full: bool = False,
+    rebuild: bool = False,
+    hadm_ids: Sequence[int] = (),
+    batch_size: int = 500,
+) -> None:
+    """
+    Materialize per-admission item counts and time ranges into item_inventory.
+
+    Args:
+        host: MySQL host name.
+        user: MySQL user name.
+        password: MySQL password.
+        database: Database holding the MIMIC-IV tables.
+        full: Rebuild everything with one GROUP BY per event table.
+        rebuild: Re-summarize every admission in batches instead of only new ones.
+        hadm_ids: Refresh only these admissions.
+        batch_size: Number of admissions summarized per transaction.
+    """
+    started_at = time.time()
+    connection = mysql.connector.connect(
+        host=host, user=user, password=password, database=database
+    )
+    try:
+        cursor = connection.cursor()
+        cursor.execute(CREATE_INVENTORY_TABLE)
+        cursor.execute(CREATE_INVENTORY_ADMISSIONS_TABLE)
+
+        if full:
+            _full_build(connection)
+            print(f"Full inventory build finished in {time.time() - started_at:.0f}s.")
+            return
+
+        if hadm_ids:
+            hadm_list = ", ".join(str(int(hadm_id)) for hadm_id in hadm_ids)
+            cursor.execute(
+                f"SELECT subject_id, hadm_id FROM admissions WHERE hadm_id IN ({hadm_list})"
+            )
+            admissions = cursor.fetchall()
+        else:
+            admissions = _pending_admissions(cursor, rebuild)
+        cursor.close()
+
+        print(f"{len(admissions)} admissions to summarize.")
+        with tqdm(total=len(admissions), desc="Summarizing admissions") as progress_bar:
+            for start in range(0, len(admissions), batch_size):
+                batch = admissions[start : start + batch_size]
+                _refresh_batch(connection, batch)
+                progress_bar.update(len(batch))
+
+        print(f"Inventory refresh finished in {time.time() - started_at:.0f}s.")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build or refresh the per-admission item inventory table."
+    )
+    parser.add_argument("--mysql-host", required=True)
+    parser.add_argument("--mysql-user", required=True)
+    parser.add_argument("--mysql-password", required=True)
+    parser.add_argument("--mysql-database", default="mimic4")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Truncate and rebuild with one full scan per event table.",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Re-summarize all admissions in batches (default: only new admissions).",
+    )
+    parser.add_argument(
+        "--hadm-id",
+        type=int,
+        nargs="*",
+        default=[],
+        help="Refresh only the given admissions.",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    arguments = parser.parse_args()
+
+    build_item_inventory(
+        arguments.mysql_host,
+        arguments.mysql_user,
+        arguments.mysql_password,
+        database=arguments.mysql_database,
+        full=arguments.full,
+        rebuild=arguments.rebuild,
+        hadm_ids=arguments.hadm_id,
+        batch_size=arguments.batch_size,
+    )
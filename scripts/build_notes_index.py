@@ -0,0 +1,213 @@
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+from pymongo import MongoClient
+from tqdm import tqdm
+
+SCHEMA_VERSION = "1"
+NOTE_COLUMNS = ["note_id", "subject_id", "hadm_id", "note_type", "note_seq", "charttime", "text"]
+
+# The note text is stored once, in notes; note_fts is an external-content
+# FTS5 index over it, so snippet() and highlight() read the original text.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS index_info (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS notes (
+    rowid INTEGER PRIMARY KEY,
+    note_id TEXT NOT NULL UNIQUE,
+    subject_id INTEGER NOT NULL,
+    hadm_id INTEGER,
+    note_type TEXT,
+    note_seq INTEGER,
+    charttime TEXT,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_subject ON notes (subject_id, hadm_id);
+CREATE INDEX IF NOT EXISTS notes_admission ON notes (hadm_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS note_fts USING fts5(
+    text,
+    content='notes',
+    content_rowid='rowid',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _optional_int(value) -> Optional[int]:
+    return None if pd.isna(value) else int(value)
+
+
+def _note_row(document: Dict) -> tuple:
+    """Return a notes table row for one note document or CSV record."""
+    charttime = document.get("charttime")
+    return (
+        str(document["note_id"]),
+        int(document["subject_id"]),
+        _optional_int(document.get("hadm_id")),
+        document.get("note_type"),
+        _optional_int(document.get("note_seq")),
+        None if pd.isna(charttime) else pd.Timestamp(charttime).isoformat(sep=" "),
+        document.get("text") or "",
+    )
+
+
+def _mongo_batches(
+    mongo_uri: str, database: str, collection: str, batch_size: int
+) -> Iterator[List[Dict]]:
+    """Yield the notes of a MongoDB collection in batches."""
+    client = MongoClient(mongo_uri)
+    try:
+        cursor = client[database][collection].find(
+            {}, {column: 1 for column in NOTE_COLUMNS} | {"_id": 0}, batch_size=batch_size
+        )
+        batch = []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        client.close()
+
+
+def _csv_batches(csv_path: Path, batch_size: int) -> Iterator[List[Dict]]:
+    """Yield the notes of a MIMIC-IV-Note CSV file in batches."""
+    for chunk in pd.read_csv(
+        csv_path, usecols=lambda column: column in NOTE_COLUMNS, chunksize=batch_size
+    ):
+        yield chunk.to_dict("records")
+
+
+def _count_mongo_documents(mongo_uri: str, database: str, collection: str) -> int:
+    client = MongoClient(mongo_uri)
+    try:
+        return client[database][collection].estimated_document_count()
+    finally:
+        client.close()
+
+
+def build_notes_index(
+    output_path: Path,
+    collections: Sequence[str],
+    mongo_uri: Optional[str] = None,
+    mongo_database: str = "mimiciv_note",
+    csv_dir: Optional[Path] = None,
+    batch_size: int = 2000,
+    rebuild: bool = False,
+) -> None:
+    """
+    Add the notes of each collection to an SQLite FTS5 index.
+
+    Notes already in the index (by note_id) are skipped, so re-running the
+    build after loading new notes only indexes the new ones. Pass
+    rebuild=True to start from an empty index.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if rebuild and output_path.exists():
+        output_path.unlink()
+    connection = sqlite3.connect(output_path)
+    connection.executescript(SCHEMA)
+    # An interrupted build is simply rerun, so favor load speed over durability
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute("PRAGMA journal_mode = MEMORY")
+
+    indexed_note_ids = {
+        note_id for (note_id,) in connection.execute("SELECT note_id FROM notes")
+    }
+    started = time.perf_counter()
+    added = 0
+    for collection in collections:
+        if csv_dir is not None:
+            batches = _csv_batches(csv_dir / f"{collection}.csv", batch_size)
+            total = None
+        else:
+            batches = _mongo_batches(mongo_uri, mongo_database, collection, batch_size)
+            total = _count_mongo_documents(mongo_uri, mongo_database, collection)
+
+        with tqdm(total=total, desc=collection, unit="notes") as progress:
+            for batch in batches:
+                rows = []
+                for document in batch:
+                    note_id = str(document["note_id"])
+                    # Also skips a note repeated within the same batch
+                    if note_id not in indexed_note_ids:
+                        indexed_note_ids.add(note_id)
+                        rows.append(_note_row(document))
+                progress.update(len(batch))
+                if not rows:
+                    continue
+                with connection:
+                    (last_rowid,) = connection.execute(
+                        "SELECT COALESCE(MAX(rowid), 0) FROM notes"
+                    ).fetchone()
+                    connection.executemany(
+                        "INSERT INTO notes "
+                        "(note_id, subject_id, hadm_id, note_type, note_seq, charttime, text) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    connection.execute(
+                        "INSERT INTO note_fts (rowid, text) "
+                        "SELECT rowid, text FROM notes WHERE rowid > ?",
+                        (last_rowid,),
+                    )
+                added += len(rows)
+
+    print("Merging index segments...")
+    with connection:
+        connection.execute("INSERT INTO note_fts (note_fts) VALUES ('optimize')")
+        connection.executemany(
+            "INSERT OR REPLACE INTO index_info (key, value) VALUES (?, ?)",
+            [
+                ("schema_version", SCHEMA_VERSION),
+                ("note_count", str(len(indexed_note_ids))),
+                ("built_at", pd.Timestamp.now().isoformat(timespec="seconds")),
+            ],
+        )
+    connection.close()
+    elapsed = time.perf_counter() - started
+    print(
+        f"Indexed {added} new notes ({len(indexed_note_ids)} in total) "
+        f"in {elapsed:.1f}s into {output_path}."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the SQLite full-text index of clinical notes used by --notes-index."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--mongo-uri", help="Read notes from MongoDB.")
+    source.add_argument(
+        "--csv-dir",
+        type=Path,
+        help="Read notes from <collection>.csv files, e.g. MIMIC-IV-Note or fixtures.",
+    )
+    parser.add_argument("--mongo-database", default="mimiciv_note")
+    parser.add_argument(
+        "--collections",
+        nargs="+",
+        default=["discharge", "radiology"],
+        help="Note collections (or CSV file names) to index.",
+    )
+    parser.add_argument("--output", required=True, type=Path)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Discard the existing index first."
+    )
+    arguments = parser.parse_args()
+
+    build_notes_index(
+        arguments.output.expanduser(),
+        arguments.collections,
+        mongo_uri=arguments.mongo_uri,
+        mongo_database=arguments.mongo_database,
+        csv_dir=arguments.csv_dir.expanduser() if arguments.csv_dir else None,
+        batch_size=arguments.batch_size,
+        rebuild=arguments.rebuild,
+    )
@@ -0,0 +1,120 @@
+import argparse
+import time
+
+import mysql.connector
+
+# Stable synthetic itemid for a drug/route pair: a fixed offset above every real
+# MIMIC itemid plus the first 48 bits of SHA-256("prescription_<drug>_<route>").
+# Must stay in sync with utils.prescription_item_id.
+PRESCRIPTION_ITEMID_SQL = (
+    "1000000000000000 + CAST(CONV(LEFT(SHA2(CONCAT('prescription_', "
+    "COALESCE({drug}, ''), '_', COALESCE({route}, 'NA')), 256), 12), 16, 10) "
+    "AS UNSIGNED)"
+)
+# Drug/route pairs are told apart by their exact text, like the hashed itemid,
+# not by the columns' case- and pad-insensitive collation.
+PRESCRIPTION_PAIR_SQL = "CAST({drug} AS BINARY), CAST({route} AS BINARY)"
+
+CREATE_PRESCRIPTION_ITEMS_TABLE = """
+CREATE TABLE IF NOT EXISTS prescription_items (
+    itemid BIGINT NOT NULL PRIMARY KEY,
+    drug TEXT NULL,
+    route VARCHAR(100) NULL,
+    KEY prescription_items_drug_route (drug(100), route)
+)
+"""
+
+
+def prescription_itemid_expression(drug_column: str = "drug", route_column: str = "route") -> str:
+    """Return the SQL expression computing the synthetic itemid for given columns."""
+    return PRESCRIPTION_ITEMID_SQL.format(drug=drug_column, route=route_column)
+
+
+def prescription_pair_expression(drug_column: str = "drug", route_column: str = "route") -> str:
+    """Return the exact-text GROUP BY key of a drug/route pair for given columns."""
+    return PRESCRIPTION_PAIR_SQL.format(drug=drug_column, route=route_column)
+
+
+def build_prescription_items(
+    host: str,
+    user: str,
+    password: str,
+    database: str = "mimic4",
+) -> None:
+    """
+    Build or extend the prescription_items drug/route dictionary.
+
+    Existing entries keep their itemid, so running the script again only adds
+    drug/route pairs that appeared since the last run.
+
+    Args:
+        host: MySQL host name.
+        user: MySQL user name.
+        password: MySQL password.
+        database: Database holding the MIMIC-IV tables.
+    """
+    started_at = time.time()
+    connection = mysql.connector.connect(
+        host=host, user=user, password=password, database=database
+    )
+    try:
+        cursor = connection.cursor()
+        cursor.execute(CREATE_PRESCRIPTION_ITEMS_TABLE)
+        cursor.execute(
+            f"""
+            INSERT IGNORE INTO prescription_items (itemid, drug, route)
+            SELECT MIN({prescription_itemid_expression()}), MIN(drug), MIN(route)
+            FROM prescriptions
+            GROUP BY {prescription_pair_expression()}
+            """
+        )
+        inserted_rows = cursor.rowcount
+        connection.commit()
+
+        # INSERT IGNORE would silently drop a pair whose id collides with an
+        # existing entry, so confirm every pair resolves to its own row.
+        cursor.execute(
+            f"""
+            SELECT COUNT(*)
+            FROM (
+                SELECT MIN(drug) AS drug, MIN(route) AS route
+                FROM prescriptions
+                GROUP BY {prescription_pair_expression()}
+            ) p
+            LEFT JOIN prescription_items d
+              ON d.itemid = {prescription_itemid_expression("p.drug", "p.route")}
+             AND CAST(d.drug AS BINARY) <=> CAST(p.drug AS BINARY)
+             AND CAST(d.route AS BINARY) <=> CAST(p.route AS BINARY)
+            WHERE d.itemid IS NULL
+            """
+        )
+        (unresolved_pairs,) = cursor.fetchone()
+        cursor.close()
+
+        print(f"Added {inserted_rows} drug/route pairs to prescription_items.")
+        if unresolved_pairs:
+            print(
+                f"Warning: {unresolved_pairs} drug/route pairs collide with an "
+                "existing itemid and cannot be resolved."
+            )
+        print(f"Finished in {time.time() - started_at:.0f}s.")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the prescription drug/route dictionary with stable itemids."
+    )
+    parser.add_argument("--mysql-host", required=True)
+    parser.add_argument("--mysql-user", required=True)
+    parser.add_argument("--mysql-password", required=True)
+    parser.add_argument("--mysql-database", default="mimic4")
+    arguments = parser.parse_args()
+
+    build_prescription_items(
+        arguments.mysql_host,
+        arguments.mysql_user,
+        arguments.mysql_password,
+        database=arguments.mysql_database,
+    )
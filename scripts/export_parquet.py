@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import sys
+from decimal import Decimal
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import mysql.connector
+import pyarrow as pa
+import pyarrow.parquet as pq
+from mysql.connector import FieldType
+from tqdm import tqdm
+
+# The extract layout is defined once, next to its reader in the app directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from parquet_backend import MANIFEST_FILE_NAME, bucket_file_name
+
+# Per-subject tables and the columns each bucket file is sorted by. Sorting by
+# subject_id, hadm_id and time keeps every admission in a few adjacent row
+# groups, so reader filters on those columns skip the rest of the file.
+SUBJECT_TABLES = {
+    "patients": ["subject_id"],
+    "admissions": ["subject_id", "admittime"],
+    "icustays": ["subject_id", "hadm_id", "intime"],
+    "services": ["subject_id", "hadm_id", "transfertime"],
+    "diagnoses_icd": ["subject_id", "hadm_id", "seq_num"],
+    "procedures_icd": ["subject_id", "hadm_id", "seq_num"],
+    "chartevents": ["subject_id", "hadm_id", "charttime"],
+    "outputevents": ["subject_id", "hadm_id", "charttime"],
+    "datetimeevents": ["subject_id", "hadm_id", "charttime"],
+    "labevents": ["subject_id", "hadm_id", "charttime"],
+    "inputevents": ["subject_id", "hadm_id", "starttime"],
+    "ingredientevents": ["subject_id", "hadm_id", "starttime"],
+    "procedureevents": ["subject_id", "hadm_id", "starttime"],
+    "prescriptions": ["subject_id", "hadm_id", "starttime"],
+}
+
+# Small lookup tables written as a single file each.
+DICTIONARY_TABLES = ["d_items", "d_labitems", "d_icd_diagnoses", "d_icd_procedures"]
+
+INTEGER_FIELD_TYPES = {
+    FieldType.TINY,
+    FieldType.SHORT,
+    FieldType.INT24,
+    FieldType.LONG,
+    FieldType.LONGLONG,
+    FieldType.YEAR,
+}
+FLOAT_FIELD_TYPES = {
+    FieldType.FLOAT,
+    FieldType.DOUBLE,
+    FieldType.DECIMAL,
+    FieldType.NEWDECIMAL,
+}
+DATETIME_FIELD_TYPES = {FieldType.DATETIME, FieldType.TIMESTAMP}
+
+
+def _arrow_schema(cursor_description) -> pa.Schema:
+    """Derive a fixed Arrow schema from the MySQL column types of a result."""
+    fields = []
+    for column_name, type_code, *_ in cursor_description:
+        if type_code in INTEGER_FIELD_TYPES:
+            arrow_type = pa.int64()
+        elif type_code in FLOAT_FIELD_TYPES:
+            arrow_type = pa.float64()
+        elif type_code in DATETIME_FIELD_TYPES:
+            arrow_type = pa.timestamp("us")
+        elif type_code == FieldType.DATE:
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column_name, arrow_type))
+    return pa.schema(fields)
+
+
+def _to_record_batch(rows: Sequence[Sequence], schema: pa.Schema) -> pa.RecordBatch:
+    """Convert fetched rows into a record batch with the given schema."""
+    arrays = []
+    for column_index, field in enumerate(schema):
+        values = [row[column_index] for row in rows]
+        if pa.types.is_floating(field.type):
+            values = [float(value) if isinstance(value, Decimal) else value for value in values]
+        elif pa.types.is_string(field.type):
+            values = [
+                value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else value
+                for value in values
+            ]
+            values = [None if value is None else str(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_query(
+    connection,
+    query: str,
+    parameters: Sequence,
+    output_path: Path,
+    row_group_size: int,
+) -> int:
+    """Stream a query result into a Parquet file, one row group per fetch."""
+    cursor = connection.cursor()
+    cursor.execute(query, parameters)
+    schema = _arrow_schema(cursor.description)
+    temporary_path = output_path.with_suffix(".parquet.tmp")
+    written_rows = 0
+    writer: Optional[pq.ParquetWriter] = None
+    try:
+        while True:
+            rows = cursor.fetchmany(row_group_size)
+            if not rows:
+                break
+            if writer is None:
+                writer = pq.ParquetWriter(temporary_path, schema, compression="zstd")
+            writer.write_batch(_to_record_batch(rows, schema), row_group_size=row_group_size)
+            written_rows += len(rows)
+    finally:
+        cursor.close()
+        if writer is not None:
+            writer.close()
+
+    if writer is not None:
+        # Readers never see a half-written file.
+        os.replace(temporary_path, output_path)
+    return written_rows
+
+
+def _subject_buckets(connection, bucket_size: int) -> List[int]:
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT DISTINCT subject_id DIV %s FROM patients ORDER BY 1", (bucket_size,)
+    )
+    buckets = [int(row[0]) for row in cursor.fetchall()]
+    cursor.close()
+    return buckets
+
+
+def export_parquet(
+    host: str,
+    user: str,
+    password: str,
+    output_directory: Path,
+    database: str = "mimic4",
+    tables: Optional[Sequence[str]] = None,
+    bucket_size: int = 10000,
+    row_group_size: int = 20000,
+    overwrite: bool = False,
+) -> None:
+    """
+    Export the tables the explorer reads into a subject-bucketed Parquet extract.
+
+    Args:
+        host: MySQL host name.
+        user: MySQL user name.
+        password: MySQL password.
+        output_directory: Directory receiving one sub-directory per table.
+        database: Database holding the MIMIC-IV tables.
+        tables: Subset of tables to export, defaults to all of them.
+        bucket_size: Width of the subject_id range stored in each file.
+        row_group_size: Rows per Parquet row group.
+        overwrite: Rewrite bucket files that already exist.
+    """
+    selected_tables = list(tables) if tables else list(SUBJECT_TABLES) + DICTIONARY_TABLES
+    unknown_tables = set(selected_tables) - set(SUBJECT_TABLES) - set(DICTIONARY_TABLES)
+    if unknown_tables:
+        raise SystemExit(f"Unknown tables: {', '.join(sorted(unknown_tables))}")
+
+    output_directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_directory / MANIFEST_FILE_NAME
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+        if manifest["bucket_size"] != bucket_size:
+            raise SystemExit(
+                f"Existing extract uses --bucket-size {manifest['bucket_size']}."
+            )
+    else:
+        manifest = {"bucket_size": bucket_size, "tables": []}
+
+    connection = mysql.connector.connect(
+        host=host, user=user, password=password, database=database
+    )
+    try:
+        for table in selected_tables:
+            if table not in DICTIONARY_TABLES:
+                continue
+            row_count = _write_query(
+                connection,
+                f"SELECT * FROM {table}",
+                (),
+                output_directory / f"{table}.parquet",
+                row_group_size,
+            )
+            print(f"{table}: {row_count} rows")
+
+        buckets = _subject_buckets(connection, bucket_size)
+        for table in selected_tables:
+            if table not in SUBJECT_TABLES:
+                continue
+            table_directory = output_directory / table
+            table_directory.mkdir(exist_ok=True)
+            query = f"""
+            SELECT * FROM {table}
+            WHERE subject_id >= %s AND subject_id < %s
+            ORDER BY {", ".join(SUBJECT_TABLES[table])}
+            """
+            row_count = 0
+            for bucket in tqdm(buckets, desc=table):
+                output_path = table_directory / bucket_file_name(bucket)
+                if output_path.exists() and not overwrite:
+                    continue
+                row_count += _write_query(
+                    connection,
+                    query,
+                    (bucket * bucket_size, (bucket + 1) * bucket_size),
+                    output_path,
+                    row_group_size,
+                )
+            print(f"{table}: {row_count} rows")
+
+            # Record the table as soon as it is complete so a partial export
+            # can be resumed and still served.
+            manifest["tables"] = sorted(set(manifest["tables"]) | {table})
+            manifest_path.write_text(json.dumps(manifest, indent=2))
+    finally:
+        connection.close()
+
+    manifest["tables"] = sorted(
+        set(manifest["tables"]) | (set(selected_tables) & set(DICTIONARY_TABLES))
+    )
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export MIMIC-IV tables from MySQL into a Parquet extract for --parquet-dir."
+    )
+    parser.add_argument("--mysql-host", required=True)
+    parser.add_argument("--mysql-user", required=True)
+    parser.add_argument("--mysql-password", required=True)
+    parser.add_argument("--mysql-database", default="mimic4")
+    parser.add_argument("--output-dir", required=True, type=Path)
+    parser.add_argument(
+        "--tables",
+        nargs="+",
+        help="Only export these tables (default: every table the explorer reads).",
+    )
+    parser.add_argument("--bucket-size", type=int, default=10000)
+    parser.add_argument("--row-group-size", type=int, default=20000)
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Re-export bucket files that already exist instead of resuming.",
+    )
+    arguments = parser.parse_args()
+
+    export_parquet(
+        arguments.mysql_host,
+        arguments.mysql_user,
+        arguments.mysql_password,
+        arguments.output_dir.expanduser(),
+        database=arguments.mysql_database,
+        tables=arguments.tables,
+        bucket_size=arguments.bucket_size,
+        row_group_size=arguments.row_group_size,
+        overwrite=arguments.overwrite,
+    )
@@ -0,0 +1,313 @@
+import argparse
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import mysql.connector
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Composite index that serves one of the explorer's access patterns."""
+
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+
+    def ddl(self) -> str:
+        column_list = ", ".join(self.columns)
+        return f"CREATE INDEX {self.name} ON {self.table} ({column_list})"
+
+
+@dataclass(frozen=True)
+class ProbeQuery:
+    """A query shape issued by utils.py, with the index that should serve it."""
+
+    description: str
+    sql: str
+    parameters: Tuple[str, ...]
+    index: IndexSpec
+
+
+def _event_index(table: str, time_column: str) -> IndexSpec:
+    return IndexSpec(
+        table, f"idx_{table}_adm_item_time", ("subject_id", "hadm_id", "itemid", time_column)
+    )
+
+
+# Every hot query filters by subject_id AND hadm_id [AND itemid] [AND time range].
+EVENT_TIME_COLUMNS = {
+    "chartevents": "charttime",
+    "labevents": "charttime",
+    "outputevents": "charttime",
+    "datetimeevents": "charttime",
+    "inputevents": "starttime",
+    "ingredientevents": "starttime",
+    "procedureevents": "starttime",
+}
+
+
+def build_probe_queries() -> List[ProbeQuery]:
+    """Return the predicates issued by get_admissions, get_item_types and get_event_data."""
+    probes = [
+        ProbeQuery(
+            "get_admissions: admissions by subject",
+            "SELECT hadm_id, admittime, dischtime FROM admissions "
+            "WHERE subject_id = %(subject_id)s ORDER BY admittime",
+            ("subject_id",),
+            IndexSpec("admissions", "idx_admissions_subject", ("subject_id", "admittime")),
+        ),
+        ProbeQuery(
+            "get_admissions: ICU stays by subject",
+            "SELECT DISTINCT hadm_id FROM icustays WHERE subject_id = %(subject_id)s",
+            ("subject_id",),
+            IndexSpec("icustays", "idx_icustays_subject_adm", ("subject_id", "hadm_id", "intime")),
+        ),
+        ProbeQuery(
+            "get_item_types: prescriptions grouped by drug/route",
+            "SELECT MIN(drug), MIN(route), COUNT(*) FROM prescriptions "
+            "WHERE subject_id = %(subject_id)s AND hadm_id = %(hadm_id)s "
+            "GROUP BY CAST(drug AS BINARY), CAST(route AS BINARY)",
+            ("subject_id", "hadm_id"),
+            IndexSpec(
+                "prescriptions",
+                "idx_prescriptions_adm_time",
+                ("subject_id", "hadm_id", "starttime"),
+            ),
+        ),
+        ProbeQuery(
+            "get_event_data: prescriptions in time window",
+            "SELECT drug, route, starttime, stoptime FROM prescriptions "
+            "WHERE subject_id = %(subject_id)s AND hadm_id = %(hadm_id)s "
+            "AND starttime BETWEEN %(start_time)s AND %(end_time)s ORDER BY starttime",
+            ("subject_id", "hadm_id", "start_time", "end_time"),
+            IndexSpec(
+                "prescriptions",
+                "idx_prescriptions_adm_time",
+                ("subject_id", "hadm_id", "starttime"),
+            ),
+        ),
+    ]
+
+    for table, time_column in EVENT_TIME_COLUMNS.items():
+        index = _event_index(table, time_column)
+        probes.append(
+            ProbeQuery(
+                f"get_item_types: {table} item counts",
+                f"SELECT itemid, COUNT(*) FROM {table} "
+                "WHERE subject_id = %(subject_id)s AND hadm_id = %(hadm_id)s GROUP BY itemid",
+                ("subject_id", "hadm_id"),
+                index,
+            )
+        )
+        probes.append(
+            ProbeQuery(
+                f"get_event_data: {table} items in time window",
+                f"SELECT * FROM {table} "
+                "WHERE subject_id = %(subject_id)s AND hadm_id = %(hadm_id)s "
+                "AND itemid IN (%(itemid)s) "
+                f"AND {time_column} BETWEEN %(start_time)s AND %(end_time)s",
+                ("subject_id", "hadm_id", "itemid", "start_time", "end_time"),
+                index,
+            )
+        )
+
+    for table in ("services", "diagnoses_icd", "procedures_icd"):
+        probes.append(
+            ProbeQuery(
+                f"admission details: {table} by admission",
+                f"SELECT * FROM {table} "
+                "WHERE subject_id = %(subject_id)s AND hadm_id = %(hadm_id)s",
+                ("subject_id", "hadm_id"),
+                IndexSpec(table, f"idx_{table}_subject_adm", ("subject_id", "hadm_id")),
+            )
+        )
+    return probes
+
+
+def _existing_tables(cursor) -> set:
+    cursor.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE()"
+    )
+    return {row[0].lower() for row in cursor.fetchall()}
+
+
+def _existing_indexes(cursor, table: str) -> Dict[str, List[str]]:
+    """Return index name -> ordered column list for a table."""
+    cursor.execute(
+        """
+        SELECT index_name, column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+        """,
+        (table,),
+    )
+    indexes: Dict[str, List[str]] = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name.lower())
+    return indexes
+
+
+def _covering_index(indexes: Dict[str, List[str]], spec: IndexSpec) -> Optional[str]:
+    """Return the name of an existing index whose leading columns match the spec."""
+    wanted_columns = list(spec.columns)
+    for index_name, columns in indexes.items():
+        if columns[: len(wanted_columns)] == wanted_columns:
+            return index_name
+    return None
+
+
+def _explain(cursor, probe: ProbeQuery, sample_values: Dict[str, object]) -> List[Dict[str, object]]:
+    """Run EXPLAIN for a probe query and return one dict per plan row."""
+    cursor.execute(
+        "EXPLAIN " + probe.sql,
+        {name: sample_values[name] for name in probe.parameters},
+    )
+    column_names = [description[0].lower() for description in cursor.description]
+    return [dict(zip(column_names, row)) for row in cursor.fetchall()]
+
+
+def _sample_values(cursor, subject_id: Optional[int], hadm_id: Optional[int], itemid: int) -> Dict[str, object]:
+    """Pick an admission to plug into the probe predicates."""
+    if subject_id is None or hadm_id is None:
+        cursor.execute(
+            "SELECT subject_id, hadm_id, admittime, dischtime FROM admissions LIMIT 1"
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise SystemExit("The admissions table is empty; pass --subject-id and --hadm-id.")
+        subject_id, hadm_id, start_time, end_time = row
+    else:
+        cursor.execute(
+            "SELECT admittime, dischtime FROM admissions WHERE subject_id = %s AND hadm_id = %s",
+            (subject_id, hadm_id),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise SystemExit(f"Admission {hadm_id} of subject {subject_id} not found.")
+        start_time, end_time = row
+    return {
+        "subject_id": subject_id,
+        "hadm_id": hadm_id,
+        "itemid": itemid,
+        "start_time": start_time,
+        "end_time": end_time,
+    }
+
+
+def run_index_advisor(
+    host: str,
+    user: str,
+    password: str,
+    database: str = "mimic4",
+    subject_id: Optional[int] = None,
+    hadm_id: Optional[int] = None,
+    itemid: int = 220045,
+    apply: bool = False,
+) -> List[IndexSpec]:
+    """
+    Check the explorer's query shapes against the live schema and plans.
+
+    Args:
+        host: MySQL/MariaDB host name.
+        user: Database user name.
+        password: Database password.
+        database: Database holding the MIMIC-IV tables.
+        subject_id: Subject used for EXPLAIN; defaults to the first admission.
+        hadm_id: Admission used for EXPLAIN; defaults to the first admission.
+        itemid: Item used for the per-item probes (default: Heart Rate).
+        apply: Create the missing indexes instead of only reporting them.
+
+    Returns:
+        The recommended indexes that were missing.
+    """
+    connection = mysql.connector.connect(
+        host=host, user=user, password=password, database=database
+    )
+    missing_indexes: List[IndexSpec] = []
+    try:
+        cursor = connection.cursor()
+        tables = _existing_tables(cursor)
+        sample_values = _sample_values(cursor, subject_id, hadm_id, itemid)
+        print(
+            f"Probing with subject_id={sample_values['subject_id']} "
+            f"hadm_id={sample_values['hadm_id']} itemid={itemid}\n"
+        )
+
+        index_cache: Dict[str, Dict[str, List[str]]] = {}
+        for probe in build_probe_queries():
+            table = probe.index.table
+            if table not in tables:
+                print(f"[skip] {probe.description}: table {table} not found")
+                continue
+
+            if table not in index_cache:
+                index_cache[table] = _existing_indexes(cursor, table)
+            covering_index = _covering_index(index_cache[table], probe.index)
+
+            plan_rows = _explain(cursor, probe, sample_values)
+            full_scans = [
+                row for row in plan_rows if str(row.get("type", "")).upper() == "ALL"
+            ]
+            status = "FULL SCAN" if full_scans else "ok"
+            print(f"[{status}] {probe.description}")
+            for row in plan_rows:
+                print(
+                    f"    table={row.get('table')} type={row.get('type')} "
+                    f"key={row.get('key')} rows={row.get('rows')} "
+                    f"extra={row.get('extra')}"
+                )
+
+            if covering_index:
+                print(f"    served by index {covering_index}")
+            elif probe.index not in missing_indexes:
+                print(f"    missing index: {probe.index.ddl()}")
+                missing_indexes.append(probe.index)
+
+        print()
+        if not missing_indexes:
+            print("All recommended indexes are present.")
+        elif apply:
+            for index in missing_indexes:
+                print(f"Creating {index.name} on {index.table} ...")
+                cursor.execute(index.ddl())
+            connection.commit()
+            print(f"Created {len(missing_indexes)} indexes.")
+        else:
+            print("Missing indexes (re-run with --apply to create them):")
+            for index in missing_indexes:
+                print(f"  {index.ddl()};")
+        cursor.close()
+    finally:
+        connection.close()
+    return missing_indexes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check and optionally create the indexes used by the MIMIC-IV explorer."
+    )
+    parser.add_argument("--mysql-host", required=True)
+    parser.add_argument("--mysql-user", required=True)
+    parser.add_argument("--mysql-password", required=True)
+    parser.add_argument("--mysql-database", default="mimic4")
+    parser.add_argument("--subject-id", type=int)
+    parser.add_argument("--hadm-id", type=int)
+    parser.add_argument("--itemid", type=int, default=220045)
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Create the missing indexes (can take a long time on chartevents).",
+    )
+    arguments = parser.parse_args()
+
+    run_index_advisor(
+        arguments.mysql_host,
+        arguments.mysql_user,
+        arguments.mysql_password,
+        database=arguments.mysql_database,
+        subject_id=arguments.subject_id,
+        hadm_id=arguments.hadm_id,
+        itemid=arguments.itemid,
+        apply=arguments.apply,
+    )
@@ -0,0 +1,500 @@
+import argparse
+import csv
+import dataclasses
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from pymongo import ASCENDING, MongoClient, ReplaceOne
+from tqdm import tqdm
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """How one MIMIC CSV file is typed, transformed and keyed in MongoDB."""
+
+    name: str
+    db_name: str
+    collection: str
+    default_csv: str
+    # Columns whose values identify a document; a unique index is built on them.
+    key: Tuple[str, ...]
+    integer_columns: Tuple[str, ...] = ()
+    float_columns: Tuple[str, ...] = ()
+    date_columns: Tuple[str, ...] = ()
+    # Secondary indexes built after the load, as column tuples.
+    indexes: Tuple[Tuple[str, ...], ...] = ()
+    # Time columns checked in order for --since; empty disables --since.
+    since_columns: Tuple[str, ...] = ()
+    # Optional DataFrame -> DataFrame step applied to each typed chunk.
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+
+
+# Metrics appended to the report text shown in the ECG hover label
+ECG_TEXT_METRICS = ["rr_interval", "p_axis", "qrs_axis", "t_axis"]
+
+
+def build_measurement_text(chunk: pd.DataFrame) -> pd.Series:
+    """Join the report_* columns and key metrics into one text value per row."""
+    report_columns = [
+        column for column in chunk.columns if column.lower().startswith("report_")
+    ]
+
+    report_text = pd.Series(pd.NA, index=chunk.index, dtype="string")
+    for report_column in report_columns:
+        values = chunk[report_column].astype("string").str.strip()
+        values = values.where(values != "")
+        report_text = report_text.where(
+            values.isna(),
+            values.where(report_text.isna(), report_text + ", " + values),
+        )
+
+    metrics_text = None
+    for metric in ECG_TEXT_METRICS:
+        metric_values = (
+            chunk[metric].astype(str).where(chunk[metric].notna(), "None")
+            if metric in chunk.columns
+            else pd.Series("None", index=chunk.index)
+        )
+        metric_text = f"{metric}:" + metric_values
+        metrics_text = (
+            metric_text if metrics_text is None else metrics_text + ", " + metric_text
+        )
+
+    return (report_text + ", " + metrics_text).fillna(metrics_text).astype(object)
+
+
+def _machine_measurement_documents(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Reduce machine_measurements rows to the fields the ECG timeline reads."""
+    return pd.DataFrame(
+        {
+            "subject_id": chunk["subject_id"],
+            "study_id": chunk["study_id"],
+            "ecg_time": chunk["ecg_time"],
+            "text": build_measurement_text(chunk),
+        }
+    )
+
+
+NOTE_SPEC_FIELDS = dict(
+    db_name="mimiciv_note",
+    key=("note_id",),
+    integer_columns=("subject_id", "hadm_id", "note_seq"),
+    date_columns=("charttime", "storetime"),
+    indexes=(("subject_id", "hadm_id"),),
+    since_columns=("storetime", "charttime"),
+)
+NOTE_DETAIL_SPEC_FIELDS = dict(
+    db_name="mimiciv_note",
+    key=("note_id", "field_name", "field_ordinal"),
+    integer_columns=("subject_id", "field_ordinal"),
+    indexes=(("subject_id",),),
+)
+
+TABLE_SPECS: Dict[str, TableSpec] = {
+    spec.name: spec
+    for spec in [
+        TableSpec(
+            name="discharge",
+            collection="discharge",
+            default_csv="./discharge.csv",
+            **NOTE_SPEC_FIELDS,
+        ),
+        TableSpec(
+            name="radiology",
+            collection="radiology",
+            default_csv="./radiology.csv",
+            **NOTE_SPEC_FIELDS,
+        ),
+        TableSpec(
+            name="discharge_detail",
+            collection="discharge_detail",
+            default_csv="./discharge_detail.csv",
+            **NOTE_DETAIL_SPEC_FIELDS,
+        ),
+        TableSpec(
+            name="radiology_detail",
+            collection="radiology_detail",
+            default_csv="./radiology_detail.csv",
+            **NOTE_DETAIL_SPEC_FIELDS,
+        ),
+        TableSpec(
+            name="machine_measurement",
+            db_name="mimiciv_ecg",
+            collection="machine_measurement",
+            default_csv="./machine_measurements.csv",
+            key=("study_id",),
+            integer_columns=("subject_id", "study_id"),
+            float_columns=(
+                "rr_interval", "p_onset", "p_end", "qrs_onset", "qrs_end",
+                "t_end", "p_axis", "qrs_axis", "t_axis",
+            ),
+            date_columns=("ecg_time",),
+            indexes=(("subject_id", "ecg_time"),),
+            since_columns=("ecg_time",),
+            transform=_machine_measurement_documents,
+        ),
+    ]
+}
+
+
+class _RecordReader:
+    """
+    CSV record reader over a binary file that knows the byte offset of each record.
+
+    csv.reader pulls physical lines one at a time and never reads ahead, so
+    after each record the offset of the last consumed line is exactly where
+    the next record starts, even when quoted fields span several lines.
+    """
+
+    def __init__(self, csv_file: io.BufferedReader, offset: int) -> None:
+        self._file = csv_file
+        self.offset = offset
+        self._file.seek(offset)
+        self._reader = csv.reader(self._lines())
+
+    def _lines(self) -> Iterator[str]:
+        for line in iter(self._file.readline, b""):
+            self.offset += len(line)
+            yield line.decode("utf-8")
+
+    def __iter__(self) -> Iterator[List[str]]:
+        return iter(self._reader)
+
+
+def _read_header(csv_file_path: Path) -> Tuple[List[str], int]:
+    """Return the column names and the byte offset of the first data record."""
+    with open(csv_file_path, "rb") as csv_file:
+        reader = _RecordReader(csv_file, 0)
+        return next(iter(reader)), reader.offset
+
+
+def _read_batches(
+    csv_file_path: Path, offset: int, batch_size: int
+) -> Iterator[Tuple[List[List[str]], int]]:
+    """Yield (records, offset after the last record) batches starting at offset."""
+    with open(csv_file_path, "rb") as csv_file:
+        reader = _RecordReader(csv_file, offset)
+        batch: List[List[str]] = []
+        for record in reader:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch, reader.offset
+                batch = []
+        if batch:
+            yield batch, reader.offset
+
+
+def _load_checkpoint(checkpoint_path: Path, csv_file_path: Path) -> Optional[Dict[str, Any]]:
+    """Return the saved checkpoint if it was written for this exact CSV file."""
+    if not checkpoint_path.exists():
+        return None
+    checkpoint = json.loads(checkpoint_path.read_text())
+    file_stat = csv_file_path.stat()
+    if checkpoint.get("size") != file_stat.st_size or checkpoint.get("mtime") != file_stat.st_mtime:
+        print("CSV file changed since the last checkpoint; starting from the beginning.")
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(checkpoint_path: Path, csv_file_path: Path, offset: int, rows: int) -> None:
+    file_stat = csv_file_path.stat()
+    temporary_path = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+    temporary_path.write_text(
+        json.dumps(
+            {
+                "csv_path": str(csv_file_path),
+                "size": file_stat.st_size,
+                "mtime": file_stat.st_mtime,
+                "offset": offset,
+                "rows": rows,
+            }
+        )
+    )
+    os.replace(temporary_path, checkpoint_path)
+
+
+def build_documents(
+    spec: TableSpec,
+    columns: List[str],
+    records: List[List[str]],
+    since: Optional[pd.Timestamp] = None,
+) -> List[Dict[str, Any]]:
+    """Type, filter and transform raw CSV records into MongoDB documents."""
+    chunk = pd.DataFrame(records, columns=columns).replace("", None)
+    for column in spec.integer_columns:
+        if column in chunk.columns:
+            chunk[column] = pd.to_numeric(chunk[column]).astype("Int64")
+    for column in spec.float_columns:
+        if column in chunk.columns:
+            chunk[column] = pd.to_numeric(chunk[column]).astype("float64")
+    for column in spec.date_columns:
+        if column in chunk.columns:
+            chunk[column] = pd.to_datetime(chunk[column], errors="coerce")
+
+    if since is not None and spec.since_columns:
+        row_time = chunk[spec.since_columns[0]]
+        for column in spec.since_columns[1:]:
+            row_time = row_time.fillna(chunk[column])
+        chunk = chunk[row_time >= since]
+
+    if spec.transform is not None:
+        chunk = spec.transform(chunk)
+
+    # object dtype turns <NA>/NaT into None; values are then made plain Python.
+    column_values = {}
+    for column in chunk.columns:
+        values = chunk[column].astype(object).where(chunk[column].notna(), None).tolist()
+        if column in spec.date_columns:
+            values = [value and value.to_pydatetime() for value in values]
+        elif column in spec.integer_columns:
+            values = [None if value is None else int(value) for value in values]
+        column_values[column] = values
+    return [
+        dict(zip(column_values, row_values)) for row_values in zip(*column_values.values())
+    ]
+
+
+# Per-process MongoDB client, opened by the pool initializer after the fork.
+_worker_client: Optional[MongoClient] = None
+
+
+def _init_worker(mongo_uri: str) -> None:
+    global _worker_client
+    _worker_client = MongoClient(mongo_uri)
+
+
+def _ingest_batch(
+    spec: TableSpec,
+    columns: List[str],
+    records: List[List[str]],
+    since: Optional[pd.Timestamp],
+    upsert: bool,
+) -> int:
+    """Build one batch's documents and write them; runs in a pool process."""
+    documents = build_documents(spec, columns, records, since)
+    if not documents:
+        return 0
+    collection = _worker_client[spec.db_name][spec.collection]
+    if upsert:
+        # Replacing by key makes replayed batches harmless after a resume.
+        collection.bulk_write(
+            [
+                ReplaceOne(
+                    {column: document.get(column) for column in spec.key},
+                    document,
+                    upsert=True,
+                )
+                for document in documents
+            ],
+            ordered=False,
+        )
+    else:
+        collection.insert_many(documents, ordered=False)
+    return len(documents)
+
+
+def ingest_table(
+    spec: TableSpec,
+    csv_file_path: Optional[str] = None,
+    mongo_uri: str = "mongodb://localhost:27017/",
+    batch_size: int = 5000,
+    workers: Optional[int] = None,
+    since: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+    restart: bool = False,
+    drop: bool = False,
+    throttle_seconds: float = 0.0,
+) -> None:
+    """
+    Load one CSV file into MongoDB according to its TableSpec.
+
+    Raw records are read in the main process and handed to a process pool,
+    where each worker types and transforms its batch and writes it with an
+    unordered bulk write. An empty collection is filled with plain inserts;
+    otherwise documents are upserted on the spec's key. Progress is
+    checkpointed by byte offset once a batch and all batches before it are
+    written, so an interrupted load resumes where it stopped. A failed batch
+    stops the load and its error propagates, so the script exits non-zero.
+
+    Args:
+        spec: Table to load.
+        csv_file_path: Source CSV, defaults to the spec's file name.
+        mongo_uri: MongoDB connection string.
+        batch_size: Rows per bulk write.
+        workers: Worker processes, defaults to the number of CPUs.
+        since: Only load rows whose since_columns time is on or after this date.
+        checkpoint_path: Checkpoint file, defaults to <csv>.checkpoint.json.
+        restart: Ignore an existing checkpoint and read the file from the start.
+        drop: Drop the collection first; implies restart.
+        throttle_seconds: Pause after each batch, to spare a busy server.
+    """
+    csv_file_path = Path(csv_file_path or spec.default_csv)
+    checkpoint_path = (
+        Path(checkpoint_path)
+        if checkpoint_path
+        else csv_file_path.with_name(csv_file_path.name + ".checkpoint.json")
+    )
+    since_timestamp = pd.Timestamp(since) if since else None
+    if since_timestamp is not None and not spec.since_columns:
+        print(f"Warning: '{spec.name}' has no time column; --since is ignored.")
+
+    client = MongoClient(mongo_uri)
+    try:
+        collection = client[spec.db_name][spec.collection]
+        if drop:
+            collection.drop()
+            print(f"Existing collection '{spec.collection}' dropped.")
+
+        columns, data_offset = _read_header(csv_file_path)
+        checkpoint = (
+            None if restart or drop else _load_checkpoint(checkpoint_path, csv_file_path)
+        )
+        offset = checkpoint["offset"] if checkpoint else data_offset
+        loaded_rows = checkpoint["rows"] if checkpoint else 0
+        file_size = csv_file_path.stat().st_size
+        if checkpoint:
+            print(f"Resuming at byte {offset} of {file_size} ({loaded_rows} rows loaded).")
+
+        upsert = checkpoint is not None or collection.estimated_document_count() > 0
+        # The unique key index makes each upsert a point lookup and rejects duplicates.
+        collection.create_index([(column, ASCENDING) for column in spec.key], unique=True)
+
+        print(f"Starting to load {csv_file_path} into {spec.db_name}.{spec.collection}...")
+        started_at = time.monotonic()
+        session_rows = 0
+
+        pending: "deque[Tuple[Any, int]]" = deque()
+        worker_count = workers or os.cpu_count() or 1
+
+        def _complete_finished(wait_for_oldest: bool) -> None:
+            nonlocal loaded_rows, session_rows
+            while pending and (wait_for_oldest or pending[0][0].done()):
+                future, end_offset = pending.popleft()
+                try:
+                    batch_rows = future.result()
+                except Exception:
+                    # The checkpoint stays at the last contiguous batch; later
+                    # batches already written are replayed as upserts on resume.
+                    for queued_future, _ in pending:
+                        queued_future.cancel()
+                    raise
+                loaded_rows += batch_rows
+                session_rows += batch_rows
+                progress_bar.update(end_offset - progress_bar.n)
+                _save_checkpoint(checkpoint_path, csv_file_path, end_offset, loaded_rows)
+                wait_for_oldest = False
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(mongo_uri,)
+        ) as executor, tqdm(
+            total=file_size, initial=offset, unit="B", unit_scale=True, desc="Uploading to MongoDB"
+        ) as progress_bar:
+            for records, end_offset in _read_batches(csv_file_path, offset, batch_size):
+                pending.append(
+                    (
+                        executor.submit(
+                            _ingest_batch, spec, columns, records, since_timestamp, upsert
+                        ),
+                        end_offset,
+                    )
+                )
+                # Keep at most two batches per worker in flight to bound memory.
+                _complete_finished(wait_for_oldest=len(pending) >= worker_count * 2)
+                if throttle_seconds:
+                    time.sleep(throttle_seconds)
+            while pending:
+                _complete_finished(wait_for_oldest=True)
+
+        load_seconds = time.monotonic() - started_at
+        print(
+            f"\nWrote {session_rows} documents in {load_seconds:.1f}s "
+            f"({session_rows / max(load_seconds, 1e-9):,.0f} rows/s)."
+        )
+
+        for index_columns in spec.indexes:
+            print(f"Creating index on ({', '.join(index_columns)})...")
+            collection.create_index([(column, ASCENDING) for column in index_columns])
+        print(f"Total documents in collection: {collection.count_documents({})}")
+    except FileNotFoundError:
+        raise SystemExit(f"Error: The file '{csv_file_path}' was not found.")
+    except Exception:
+        print(
+            f"\nLoad of {csv_file_path} failed; run it again to resume from "
+            f"the checkpoint in {checkpoint_path}."
+        )
+        raise
+    finally:
+        client.close()
+
+
+def add_ingest_arguments(parser: argparse.ArgumentParser, spec: Optional[TableSpec] = None) -> None:
+    """Add the options shared by every loader script."""
+    parser.add_argument(
+        "--csv-path",
+        default=spec.default_csv if spec else None,
+        help="Source CSV file (default: the table's file name in the current directory).",
+    )
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--collection", help="Target collection (default: the table name).")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count).")
+    parser.add_argument(
+        "--since",
+        help="Only load rows stored on or after this date, e.g. 2024-01-01.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Checkpoint file (default: <csv-path>.checkpoint.json).",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the checkpoint and read the CSV from the beginning.",
+    )
+    parser.add_argument(
+        "--drop",
+        action="store_true",
+        help="Drop the collection before loading.",
+    )
+    parser.add_argument(
+        "--throttle",
+        type=float,
+        default=0.0,
+        help="Seconds to pause after each batch (default: no pause).",
+    )
+
+
+def ingest_from_arguments(spec: TableSpec, arguments: argparse.Namespace) -> None:
+    """Run ingest_table with options parsed by add_ingest_arguments."""
+    if arguments.collection:
+        spec = dataclasses.replace(spec, collection=arguments.collection)
+    ingest_table(
+        spec,
+        arguments.csv_path,
+        mongo_uri=arguments.mongo_uri,
+        batch_size=arguments.batch_size,
+        workers=arguments.workers,
+        since=arguments.since,
+        checkpoint_path=arguments.checkpoint,
+        restart=arguments.restart,
+        drop=arguments.drop,
+        throttle_seconds=arguments.throttle,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load a MIMIC-IV-Note or MIMIC-IV-ECG CSV file into MongoDB."
+    )
+    parser.add_argument("table", choices=sorted(TABLE_SPECS))
+    add_ingest_arguments(parser)
+    arguments = parser.parse_args()
+    ingest_from_arguments(TABLE_SPECS[arguments.table], arguments)
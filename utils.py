@@ -1,136 +1,180 @@
+import hashlib
+from functools import partial
+
 import pandas as pd
 from db_connections import (
-    get_mysql_connection,
+    mysql_connection,
+    mark_source_unavailable,
     get_mongo_connection,
     get_mongo_ecg_connection,
 )
-
-
+from concurrent_fetch import run_parallel
+from dictionaries import DICTIONARY_COLUMNS, DictionaryTable, dictionaries
+from query_cache import cached_query, make_cache_key, query_cache
+from query_layer import identifier, placeholders, read_query
+
+# Synthetic prescription itemids live above every real MIMIC itemid.
+PRESCRIPTION_ITEMID_OFFSET = 10**15
+
+# ICU event tables grouped into the item list
+ICU_EVENT_TABLES = [
+    "chartevents",
+    "outputevents",
+    "datetimeevents",
+    "ingredientevents",
+    "inputevents",
+    "procedureevents",
+]
+
+
+@cached_query
 def get_admissions(subject_id):
     """Return admissions with times and ICU stay information sorted by time."""
-    conn = get_mysql_connection()
-    if conn is None:
-        return pd.DataFrame()
+    with mysql_connection() as conn:
+        if conn is None:
+            return pd.DataFrame()
 
-    query = f"""
-    SELECT a.hadm_id,
-           a.admittime,
-           a.dischtime,
-           CASE WHEN i.hadm_id IS NOT NULL THEN 1 ELSE 0 END AS has_icu
-    FROM admissions a
-    LEFT JOIN (
-        SELECT DISTINCT hadm_id
-        FROM icustays
-        WHERE subject_id = {subject_id}
-    ) i ON a.hadm_id = i.hadm_id
-    WHERE a.subject_id = {subject_id}
-    ORDER BY a.admittime ASC
-    """
+        query = """
+        SELECT a.hadm_id,
+               a.admittime,
+               a.dischtime,
+               CASE WHEN i.hadm_id IS NOT NULL THEN 1 ELSE 0 END AS has_icu
+        FROM admissions a
+        LEFT JOIN (
+            SELECT DISTINCT hadm_id
+            FROM icustays
+            WHERE subject_id = %s
+        ) i ON a.hadm_id = i.hadm_id
+        WHERE a.subject_id = %s
+        ORDER BY a.admittime ASC
+        """
 
-    admissions_df = pd.read_sql(query, conn)
-    return admissions_df
+        admissions_df = read_query(conn, query, (subject_id, subject_id))
+        return admissions_df
 
 
+@cached_query
 def get_patient_info(subject_id):
     """Retrieves basic patient information including anchor year."""
-    conn = get_mysql_connection()
-    if conn is not None:
-        query = (
-            f"SELECT gender, anchor_age, anchor_year, dod "
-            f"FROM patients WHERE subject_id = {subject_id}"
-        )
-        return pd.read_sql(query, conn).iloc[0]
-    return None
+    with mysql_connection() as conn:
+        if conn is not None:
+            query = (
+                "SELECT gender, anchor_age, anchor_year, dod "
+                "FROM patients WHERE subject_id = %s"
+            )
+            return read_query(conn, query, (subject_id,)).iloc[0]
+        return None
 
 
+@cached_query
 def get_admission_info(subject_id, hadm_id):
     """Gathers details about a specific hospital admission."""
-    conn = get_mysql_connection()
-    if conn is not None:
-        query = f"""
-        SELECT admittime, dischtime, insurance, language,
-               marital_status, race
-        FROM admissions
-        WHERE subject_id = {subject_id} AND hadm_id = {hadm_id}
-        """
-        return pd.read_sql(query, conn).iloc[0]
-    return None
-
-
+    with mysql_connection() as conn:
+        if conn is not None:
+            query = """
+            SELECT admittime, dischtime, insurance, language,
+                   marital_status, race
+            FROM admissions
+            WHERE subject_id = %s AND hadm_id = %s
+            """
+            return read_query(conn, query, (subject_id, hadm_id)).iloc[0]
+        return None
+
+
+@cached_query
 def get_admission_services(subject_id, hadm_id):
     """Returns a comma separated list of services for the admission."""
-    conn = get_mysql_connection()
-    if conn is not None:
-        query = f"""
-        SELECT DISTINCT curr_service
-        FROM services
-        WHERE subject_id = {subject_id} AND hadm_id = {hadm_id}
-        """
-        df = pd.read_sql(query, conn)
-        if df.empty:
-            return ""
-        return ",".join(df["curr_service"].dropna().tolist())
-    return ""
-
-
+    with mysql_connection() as conn:
+        if conn is not None:
+            query = """
+            SELECT DISTINCT curr_service
+            FROM services
+            WHERE subject_id = %s AND hadm_id = %s
+            """
+            df = read_query(conn, query, (subject_id, hadm_id))
+            if df.empty:
+                return ""
+            return ",".join(df["curr_service"].dropna().tolist())
+        return ""
+
+
+@cached_query
 def get_icu_info(subject_id, hadm_id):
     """Fetches ICU entry and exit times for an admission."""
-    conn = get_mysql_connection()
-    if conn is not None:
+    with mysql_connection() as conn:
+        if conn is not None:
+            query = """
+            SELECT stay_id, intime, outtime
+            FROM icustays
+            WHERE subject_id = %s AND hadm_id = %s
+            ORDER BY intime ASC
+            """
+            return read_query(conn, query, (subject_id, hadm_id))
+        return pd.DataFrame()
+
+
+def format_icd_codes(df):
+    """Combine ICD version and code into a single display column."""
+    # Create a combined column for display with format [V9] 123.45 or [V10] A12.3
+    if not df.empty:
+        df["icd"] = "[V" + df["icd_version"].astype(str) + "] " + df["icd_code"]
+        # Reorder columns to put combined column first
+        df = df[["icd", "long_title"]]
+    return df
+
+
+def _read_dictionary(table):
+    """Read the columns of a d_* table that the dictionary store keeps."""
+    key_columns, value_columns = DICTIONARY_COLUMNS[table]
+    with mysql_connection() as conn:
+        if conn is None:
+            return pd.DataFrame()
+        query = (
+            f"SELECT {', '.join(key_columns + value_columns)} "
+            f"FROM {identifier(table, DICTIONARY_COLUMNS)}"
+        )
+        return read_query(conn, query)
+
+
+def get_dictionary(table) -> DictionaryTable:
+    """Return a d_* table from the process-wide dictionary store."""
+    return dictionaries.get("mysql", table, partial(_read_dictionary, table))
+
+
+def _read_icd_codes(table, dictionary_table, subject_id, hadm_id):
+    """Read an admission's ICD codes and look their titles up in memory."""
+    with mysql_connection() as conn:
+        if conn is None:
+            return pd.DataFrame()
         query = f"""
-        SELECT stay_id, intime, outtime
-        FROM icustays
-        WHERE subject_id = {subject_id} AND hadm_id = {hadm_id}
-        ORDER BY intime ASC
+        SELECT icd_code, icd_version
+        FROM {identifier(table, ["diagnoses_icd", "procedures_icd"])}
+        WHERE subject_id = %s AND hadm_id = %s
         """
-        return pd.read_sql(query, conn)
-    return pd.DataFrame()
+        codes_df = read_query(conn, query, (subject_id, hadm_id))
+    if codes_df.empty:
+        return pd.DataFrame()
+    return format_icd_codes(get_dictionary(dictionary_table).join(codes_df))
 
 
+@cached_query
 def get_icd_diagnoses(subject_id, hadm_id):
     """Retrieves ICD diagnosis descriptions for a given admission."""
-    conn = get_mysql_connection()
-    if conn is not None:
-        query = f"""
-        SELECT di.icd_code, di.icd_version, d.long_title
-        FROM diagnoses_icd di
-        JOIN d_icd_diagnoses d ON di.icd_code = d.icd_code AND di.icd_version = d.icd_version
-        WHERE di.subject_id = {subject_id} AND di.hadm_id = {hadm_id}
-        """
-        df = pd.read_sql(query, conn)
-        # Create a combined column for display with format [V9] 123.45 or [V10] A12.3
-        if not df.empty:
-            df["icd"] = "[V" + df["icd_version"].astype(str) + "] " + df["icd_code"]
-            # Reorder columns to put combined column first
-            df = df[["icd", "long_title"]]
-        return df
-    return pd.DataFrame()
+    return _read_icd_codes("diagnoses_icd", "d_icd_diagnoses", subject_id, hadm_id)
 
 
+@cached_query
 def get_icd_procedures(subject_id, hadm_id):
     """Fetches ICD procedure descriptions for a given admission."""
-    conn = get_mysql_connection()
-    if conn is not None:
-        query = f"""
-        SELECT pi.icd_code, pi.icd_version, p.long_title
-        FROM procedures_icd pi
-        JOIN d_icd_procedures p ON pi.icd_code = p.icd_code AND pi.icd_version = p.icd_version
-        WHERE pi.subject_id = {subject_id} AND pi.hadm_id = {hadm_id}
-        """
-        df = pd.read_sql(query, conn)
-        # Create a combined column for display with format [V9] 123.45 or [V10] A12.3
-        if not df.empty:
-            df["icd"] = "[V" + df["icd_version"].astype(str) + "] " + df["icd_code"]
-            # Reorder columns to put combined column first
-            df = df[["icd", "long_title"]]
-        return df
-    return pd.DataFrame()
+    return _read_icd_codes("procedures_icd", "d_icd_procedures", subject_id, hadm_id)
 
 
-def _get_ecg_measurements(subject_id, start_time=None, end_time=None):
+@cached_query
+def get_ecg_measurements(subject_id, start_time=None, end_time=None):
     """Fetch ECG machine measurements for a subject within a time window."""
     mongo_database = get_mongo_ecg_connection()
     if mongo_database is None:
+        mark_source_unavailable()
         return pd.DataFrame()
 
     time_filters = {}
@@ -155,6 +199,7 @@ def _get_ecg_measurements(subject_id, start_time=None, end_time=None):
         )
         documents = list(cursor)
     except Exception:
+        mark_source_unavailable()
         return pd.DataFrame()
 
     if not documents:
@@ -165,253 +210,590 @@ def _get_ecg_measurements(subject_id, start_time=None, end_time=None):
     return ecg_dataframe
 
 
-def get_item_types(subject_id, hadm_id, admission_start=None, admission_end=None):
-    """Lists all possible item types from ICU tables, lab events, prescriptions, and ECG data for an admission."""
-    conn = get_mysql_connection()
-    if conn is not None:
-        # 1. Get ICU items from event tables
-        icu_query = f"""
-        SELECT 'chartevents' as source_table, itemid, COUNT(*) as data_count FROM chartevents WHERE subject_id = {subject_id} AND hadm_id = {hadm_id} GROUP BY itemid
-        UNION ALL
-        SELECT 'outputevents' as source_table, itemid, COUNT(*) as data_count FROM outputevents WHERE subject_id = {subject_id} AND hadm_id = {hadm_id} GROUP BY itemid
-        UNION ALL
-        SELECT 'datetimeevents' as source_table, itemid, COUNT(*) as data_count FROM datetimeevents WHERE subject_id = {subject_id} AND hadm_id = {hadm_id} GROUP BY itemid
-        UNION ALL
-        SELECT 'ingredientevents' as source_table, itemid, COUNT(*) as data_count FROM ingredientevents WHERE subject_id = {subject_id} AND hadm_id = {hadm_id} GROUP BY itemid
-        UNION ALL
-        SELECT 'inputevents' as source_table, itemid, COUNT(*) as data_count FROM inputevents WHERE subject_id = {subject_id} AND hadm_id = {hadm_id} GROUP BY itemid
-        UNION ALL
-        SELECT 'procedureevents' as source_table, itemid, COUNT(*) as data_count FROM procedureevents WHERE subject_id = {subject_id} AND hadm_id = {hadm_id} GROUP BY itemid
-        """
-        icu_item_ids = pd.read_sql(icu_query, conn)
+def prescription_item_id(drug, route):
+    """Return the stable synthetic itemid for a prescription drug/route pair.
 
-        # Join with d_items to get labels
-        if not icu_item_ids.empty:
-            d_items_query = "SELECT itemid, label, abbreviation, category FROM d_items"
-            d_items = pd.read_sql(d_items_query, conn)
-            icu_items = pd.merge(icu_item_ids, d_items, on="itemid")
-        else:
-            icu_items = pd.DataFrame()
-
-        # 2. Get lab items from labevents
-        lab_query = f"""
-        SELECT 'labevents' as source_table, itemid, COUNT(*) as data_count
-        FROM labevents 
-        WHERE subject_id = {subject_id} AND hadm_id = {hadm_id} 
-        GROUP BY itemid
+    Must stay in sync with PRESCRIPTION_ITEMID_SQL in
+    scripts/build_prescription_items.py.
+    """
+    drug_text = "" if pd.isna(drug) else str(drug)
+    route_text = "NA" if pd.isna(route) else str(route)
+    digest = hashlib.sha256(
+        f"prescription_{drug_text}_{route_text}".encode("utf-8")
+    ).hexdigest()
+    return PRESCRIPTION_ITEMID_OFFSET + int(digest[:12], 16)
+
+
+def _tables_exist(table_names):
+    """Check whether all of the given tables exist in the current database."""
+    with mysql_connection() as conn:
+        if conn is None:
+            return False
+        query = f"""
+        SELECT table_name
+        FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name IN ({placeholders(len(table_names))})
         """
-        lab_item_ids = pd.read_sql(lab_query, conn)
+        existing_tables = read_query(conn, query, table_names)
+        return len(existing_tables) == len(table_names)
 
-        # Join with d_labitems to get labels
-        if not lab_item_ids.empty:
-            d_labitems_query = "SELECT itemid, label, fluid, category FROM d_labitems"
-            d_labitems = pd.read_sql(d_labitems_query, conn)
 
-            # Rename fluid to abbreviation to align with d_items schema
-            d_labitems = d_labitems.rename(columns={"fluid": "abbreviation"})
+@cached_query
+def _prescription_items_available():
+    """Check whether the prescription_items dictionary table has been built."""
+    return _tables_exist(["prescription_items"])
 
-            lab_items = pd.merge(lab_item_ids, d_labitems, on="itemid")
-        else:
-            lab_items = pd.DataFrame()
 
-        # 3. Get prescription items
-        # For prescriptions, we'll use drug as item identifier and route as category
-        prescriptions_query = f"""
-        SELECT 'prescriptions' as source_table, 
-               drug, route, 
-               COUNT(*) as data_count
-        FROM prescriptions 
-        WHERE subject_id = {subject_id} AND hadm_id = {hadm_id}
-        GROUP BY drug, route
-        """
-        prescriptions_df = pd.read_sql(prescriptions_query, conn)
-
-        if not prescriptions_df.empty:
-            # Create a synthetic itemid for prescriptions by hashing the drug+route combo
-            # This allows us to uniquely identify each drug+route combination
-            # Convert to string hashes and then to positive integers to avoid conflicts with real itemids
-            prescriptions_df["itemid"] = prescriptions_df.apply(
-                lambda row: abs(
-                    hash(f"prescription_{row['drug']}_{row['route'] or 'NA'}") % (10**9)
-                ),
-                axis=1,
-            )
+@cached_query
+def _item_inventory_available():
+    """Check whether the precomputed item_inventory tables have been built."""
+    return _tables_exist(["item_inventory", "item_inventory_admissions"])
 
-            # Format the prescription items to match the schema of other items
-            prescriptions_df["label"] = prescriptions_df["drug"]
-            prescriptions_df["category"] = prescriptions_df["route"].fillna(
-                "Unspecified"
-            )
-            prescriptions_df["abbreviation"] = ""
-            # Rename count to data_count for consistency
-            prescriptions_df.rename(columns={"count": "data_count"}, inplace=True)
-
-            # Select only relevant columns
-            prescription_items = prescriptions_df[
-                [
-                    "source_table",
-                    "itemid",
-                    "label",
-                    "abbreviation",
-                    "category",
-                    "data_count",
-                ]
-            ]
-        else:
-            prescription_items = pd.DataFrame()
 
-        # Combine all items
-        all_items = pd.concat(
-            [icu_items, lab_items, prescription_items], ignore_index=True
-        )
+def _get_inventory_item_ids(conn, subject_id, hadm_id):
+    """Read item counts from item_inventory, or None if the admission is not summarized."""
+    coverage_query = """
+    SELECT hadm_id FROM item_inventory_admissions WHERE hadm_id = %s
+    """
+    if read_query(conn, coverage_query, (hadm_id,)).empty:
+        return None
 
-        if admission_start is not None and admission_end is not None:
-            ecg_measurements = _get_ecg_measurements(
-                subject_id, admission_start, admission_end
-            )
-            if not ecg_measurements.empty:
-                ecg_item_identifier = "mimic_ecg_machine_measurement"
-                ecg_item = pd.DataFrame(
-                    [
-                        {
-                            "source_table": "ecgevents",
-                            "itemid": ecg_item_identifier,
-                            "label": "ECG",
-                            "abbreviation": "",
-                            "category": "MIMIC_ECG",
-                            "data_count": int(ecg_measurements.shape[0]),
-                        }
-                    ]
-                )
-                all_items = pd.concat([all_items, ecg_item], ignore_index=True)
+    inventory_query = """
+    SELECT source_table, itemid, data_count, first_time, last_time
+    FROM item_inventory
+    WHERE subject_id = %s AND hadm_id = %s
+    """
+    return read_query(conn, inventory_query, (subject_id, hadm_id))
 
-        return all_items
-    return pd.DataFrame()
 
+def format_prescription_items(prescriptions_df):
+    """Shape drug/route counts like the d_items based item rows."""
+    if prescriptions_df.empty:
+        return pd.DataFrame()
 
-def get_event_data(subject_id, hadm_id, item_id, source_table, start_time, end_time):
-    """Fetches event data for a specific item within a given time range."""
-    if source_table == "ecgevents":
-        return _get_ecg_measurements(subject_id, start_time, end_time)
+    # Format the prescription items to match the schema of other items
+    prescriptions_df["label"] = prescriptions_df["drug"]
+    prescriptions_df["category"] = prescriptions_df["route"].fillna("Unspecified")
+    prescriptions_df["abbreviation"] = ""
+
+    # Select only relevant columns
+    return prescriptions_df[
+        [
+            "source_table",
+            "itemid",
+            "label",
+            "abbreviation",
+            "category",
+            "data_count",
+        ]
+    ]
 
-    conn = get_mysql_connection()
-    if conn is None:
-        return pd.DataFrame()
 
-    # Assign the time column based on the source table name
-    if source_table in ["inputevents", "procedureevents", "ingredientevents"]:
-        time_col = "starttime"
-    elif source_table == "labevents":
-        time_col = "charttime"
-    elif source_table == "prescriptions":
-        time_col = "starttime"  # Prescriptions use starttime
-    else:  # Covers chartevents, outputevents, datetimeevents
-        time_col = "charttime"
-
-    # For standard tables with itemid (ICU items and lab items)
-    if source_table not in ["prescriptions"]:
-        query = f"""
-        SELECT *
-        FROM {source_table}
-        WHERE subject_id = {subject_id}
-          AND hadm_id = {hadm_id}
-          AND itemid = {item_id}
-          AND {time_col} BETWEEN '{start_time}' AND '{end_time}'
-        """
+def append_ecg_item(all_items, ecg_measurements):
+    """Add the ECG machine measurement item when the admission has ECGs."""
+    if ecg_measurements is None or ecg_measurements.empty:
+        return all_items
 
-        # For labevents, convert valuenum to value if available for consistent visualization
-        result_df = pd.read_sql(query, conn)
-
-        if source_table == "labevents" and not result_df.empty:
-            # If valuenum is available, use it as the primary value for visualization
-            # But preserve original value in value_text field for reference
-            if "valuenum" in result_df.columns:
-                result_df["value_text"] = result_df[
-                    "value"
-                ]  # Store original text value
-                # Replace value with valuenum where available
-                mask = result_df["valuenum"].notna()
-                result_df.loc[mask, "value"] = result_df.loc[mask, "valuenum"].astype(
-                    str
-                )
+    ecg_item_identifier = "mimic_ecg_machine_measurement"
+    ecg_item = pd.DataFrame(
+        [
+            {
+                "source_table": "ecgevents",
+                "itemid": ecg_item_identifier,
+                "label": "ECG",
+                "abbreviation": "",
+                "category": "MIMIC_ECG",
+                "data_count": int(ecg_measurements.shape[0]),
+            }
+        ]
+    )
+    return pd.concat([all_items, ecg_item], ignore_index=True)
 
-                # Add a column for units if it exists
-                if "valueuom" in result_df.columns:
-                    result_df["unit"] = result_df["valueuom"]
-
-        return result_df
-
-    # Handle prescriptions - we need to find the specific drug and route from the hashed itemid
-    elif source_table == "prescriptions":
-        # First, we need to get the drug and route info from our items table
-        # Since we hashed the itemid from drug+route, we'll find the original item data
-        # from the get_item_types function to get the original drug and route
-        items_query = f"""
-        SELECT drug, route, drug as label
-        FROM prescriptions 
-        WHERE subject_id = {subject_id} 
-        AND hadm_id = {hadm_id}
-        GROUP BY drug, route
-        """
 
-        all_prescription_items = pd.read_sql(items_query, conn)
+@cached_query
+def get_item_types(subject_id, hadm_id, admission_start=None, admission_end=None):
+    """Lists all possible item types from ICU tables, lab events, prescriptions, and ECG data for an admission."""
+    # Resolve the optional precomputed tables and the dictionaries before
+    # checking out a connection
+    use_inventory = _item_inventory_available()
+    use_prescription_dictionary = _prescription_items_available()
+    d_items = get_dictionary("d_items")
+    d_labitems = get_dictionary("d_labitems")
+    with mysql_connection() as conn:
+        if conn is not None:
+            inventory_item_ids = None
+            if use_inventory:
+                inventory_item_ids = _get_inventory_item_ids(conn, subject_id, hadm_id)
+
+            # 1. Get ICU items from event tables
+            if inventory_item_ids is not None:
+                icu_item_ids = inventory_item_ids[
+                    ~inventory_item_ids["source_table"].isin(
+                        ["labevents", "prescriptions"]
+                    )
+                ]
+            else:
+                icu_query = "\nUNION ALL\n".join(
+                    f"SELECT '{source_table}' as source_table, itemid, COUNT(*) as data_count "
+                    f"FROM {identifier(source_table, ICU_EVENT_TABLES)} "
+                    "WHERE subject_id = %s AND hadm_id = %s GROUP BY itemid"
+                    for source_table in ICU_EVENT_TABLES
+                )
+                icu_item_ids = read_query(
+                    conn, icu_query, (subject_id, hadm_id) * len(ICU_EVENT_TABLES)
+                )
 
-        # Calculate the same hash we used in get_item_types
-        all_prescription_items["calculated_itemid"] = all_prescription_items.apply(
-            lambda row: abs(
-                hash(f"prescription_{row['drug']}_{row['route'] or 'NA'}") % (10**9)
-            ),
-            axis=1,
-        )
+            # Look labels up in the in-memory d_items
+            if not icu_item_ids.empty:
+                icu_items = d_items.join(icu_item_ids)
+            else:
+                icu_items = pd.DataFrame()
 
-        # Find the matching drug and route based on the item_id
-        matching_items = all_prescription_items[
-            all_prescription_items["calculated_itemid"] == item_id
-        ]
+            # 2. Get lab items from labevents
+            if inventory_item_ids is not None:
+                lab_item_ids = inventory_item_ids[
+                    inventory_item_ids["source_table"] == "labevents"
+                ]
+            else:
+                lab_query = """
+                SELECT 'labevents' as source_table, itemid, COUNT(*) as data_count
+                FROM labevents 
+                WHERE subject_id = %s AND hadm_id = %s 
+                GROUP BY itemid
+                """
+                lab_item_ids = read_query(conn, lab_query, (subject_id, hadm_id))
+
+            # Look labels up in the in-memory d_labitems
+            if not lab_item_ids.empty:
+                # Rename fluid to abbreviation to align with d_items schema
+                lab_items = d_labitems.join(lab_item_ids).rename(
+                    columns={"fluid": "abbreviation"}
+                )
+            else:
+                lab_items = pd.DataFrame()
+
+            # 3. Get prescription items
+            # For prescriptions, we'll use drug as item identifier and route as category
+            prescriptions_df = None
+            if inventory_item_ids is not None and use_prescription_dictionary:
+                prescription_counts = inventory_item_ids[
+                    inventory_item_ids["source_table"] == "prescriptions"
+                ]
+                if not prescription_counts.empty:
+                    dictionary_query = f"""
+                    SELECT itemid, drug, route
+                    FROM prescription_items
+                    WHERE itemid IN ({placeholders(len(prescription_counts))})
+                    """
+                    prescriptions_df = pd.merge(
+                        prescription_counts,
+                        read_query(
+                            conn, dictionary_query, prescription_counts["itemid"].tolist()
+                        ),
+                        on="itemid",
+                    )
+
+            if prescriptions_df is None:
+                prescriptions_query = """
+                SELECT 'prescriptions' as source_table, 
+                       MIN(drug) AS drug, MIN(route) AS route, 
+                       COUNT(*) as data_count
+                FROM prescriptions 
+                WHERE subject_id = %s AND hadm_id = %s
+                GROUP BY CAST(drug AS BINARY), CAST(route AS BINARY)
+                """
+                prescriptions_df = read_query(
+                    conn, prescriptions_query, (subject_id, hadm_id)
+                )
+                if not prescriptions_df.empty:
+                    prescriptions_df["itemid"] = [
+                        prescription_item_id(drug, route)
+                        for drug, route in zip(
+                            prescriptions_df["drug"], prescriptions_df["route"]
+                        )
+                    ]
 
-        if matching_items.empty:
-            return pd.DataFrame()
+            # Combine all items
+            all_items = pd.concat(
+                [icu_items, lab_items, format_prescription_items(prescriptions_df)],
+                ignore_index=True,
+            )
+            if admission_start is None or admission_end is None:
+                return all_items
+            return append_ecg_item(
+                all_items,
+                get_ecg_measurements(subject_id, admission_start, admission_end),
+            )
+        return pd.DataFrame()
 
-        # Get the actual drug and route for this itemid
-        drug = matching_items.iloc[0]["drug"]
-        route = matching_items.iloc[0]["route"]
 
-        # Now get all prescriptions matching this drug+route combination
+# Columns fetched for each source table, limited to what the plots and hover
+# text use.
+EVENT_TABLE_COLUMNS = {
+    "chartevents": [
+        "subject_id", "hadm_id", "stay_id", "itemid", "charttime",
+        "value", "valuenum", "valueuom", "warning",
+    ],
+    "outputevents": [
+        "subject_id", "hadm_id", "stay_id", "itemid", "charttime",
+        "value", "valueuom",
+    ],
+    "datetimeevents": [
+        "subject_id", "hadm_id", "stay_id", "itemid", "charttime",
+        "value", "valueuom",
+    ],
+    "labevents": [
+        "subject_id", "hadm_id", "itemid", "charttime", "value", "valuenum",
+        "valueuom", "ref_range_lower", "ref_range_upper", "flag", "priority",
+    ],
+    "inputevents": [
+        "subject_id", "hadm_id", "stay_id", "itemid", "starttime", "endtime",
+        "amount", "amountuom", "rate", "rateuom", "ordercategoryname",
+        "statusdescription",
+    ],
+    "ingredientevents": [
+        "subject_id", "hadm_id", "stay_id", "itemid", "starttime", "endtime",
+        "amount", "amountuom", "rate", "rateuom", "statusdescription",
+    ],
+    "procedureevents": [
+        "subject_id", "hadm_id", "stay_id", "itemid", "starttime", "endtime",
+        "value", "valueuom", "location", "ordercategoryname",
+        "statusdescription",
+    ],
+    "prescriptions": [
+        "subject_id", "hadm_id", "drug", "starttime", "stoptime",
+        "route", "dose_val_rx", "dose_unit_rx", "prod_strength",
+    ],
+}
+
+# Time column used to window each source table
+EVENT_TIME_COLUMNS = {
+    "chartevents": "charttime",
+    "outputevents": "charttime",
+    "datetimeevents": "charttime",
+    "labevents": "charttime",
+    "inputevents": "starttime",
+    "ingredientevents": "starttime",
+    "procedureevents": "starttime",
+    "prescriptions": "starttime",
+}
+
+
+def split_by_item(result_df, item_ids, columns):
+    """Split a multi-item result into one DataFrame per requested itemid."""
+    frames = {
+        item_id: frame.reset_index(drop=True)
+        for item_id, frame in result_df.groupby("itemid", sort=False)
+    }
+    return {
+        item_id: frames.get(item_id, pd.DataFrame(columns=columns))
+        for item_id in item_ids
+    }
+
+
+def format_lab_events(result_df):
+    """Use valuenum as the plotted lab value, keeping the original text."""
+    # For labevents, convert valuenum to value if available for consistent visualization
+    if not result_df.empty:
+        # If valuenum is available, use it as the primary value for visualization
+        # But preserve original value in value_text field for reference
+        result_df["value_text"] = result_df["value"]  # Store original text value
+        # Replace value with valuenum where available
+        mask = result_df["valuenum"].notna()
+        result_df.loc[mask, "value"] = result_df.loc[mask, "valuenum"].astype(str)
+        # Add a column for units
+        result_df["unit"] = result_df["valueuom"]
+
+
+def _fetch_itemid_events(conn, subject_id, hadm_id, source_table, item_ids, start_time, end_time):
+    """Fetches ICU or lab events for several itemids with a single query."""
+    columns = EVENT_TABLE_COLUMNS[source_table]
+    time_col = identifier(EVENT_TIME_COLUMNS[source_table], columns)
+    query = f"""
+    SELECT {", ".join(identifier(column, columns) for column in columns)}
+    FROM {identifier(source_table, EVENT_TABLE_COLUMNS)}
+    WHERE subject_id = %s
+      AND hadm_id = %s
+      AND itemid IN ({placeholders(len(item_ids))})
+      AND {time_col} BETWEEN %s AND %s
+    """
+    result_df = read_query(
+        conn, query, (subject_id, hadm_id, *item_ids, start_time, end_time)
+    )
+    if source_table == "labevents":
+        format_lab_events(result_df)
+    return split_by_item(result_df, item_ids, result_df.columns)
+
+
+def select_prescription_items(prescriptions_df, item_ids):
+    """Compute each row's drug/route itemid and keep the requested ones."""
+    drug_routes = list(zip(prescriptions_df["drug"], prescriptions_df["route"]))
+    item_ids_by_pair = {
+        pair: prescription_item_id(*pair) for pair in set(drug_routes)
+    }
+    prescriptions_df.insert(
+        0, "itemid", [item_ids_by_pair[pair] for pair in drug_routes]
+    )
+    return prescriptions_df[prescriptions_df["itemid"].isin(item_ids)]
+
+
+def split_prescription_events(prescriptions_df, item_ids):
+    """Add the dose value column and split prescriptions per itemid."""
+    # Add consistent columns for visualization
+    if not prescriptions_df.empty:
+        # Add a value column for dose information
+        prescriptions_df["value"] = (
+            prescriptions_df["dose_val_rx"].astype(str)
+            + " "
+            + prescriptions_df["dose_unit_rx"].astype(str)
+        ).where(prescriptions_df["dose_val_rx"].notna(), "Unknown dose")
+
+    return split_by_item(prescriptions_df, item_ids, prescriptions_df.columns)
+
+
+def _fetch_prescription_events(conn, subject_id, hadm_id, item_ids, start_time, end_time, use_dictionary):
+    """Fetches prescriptions for several synthetic drug/route itemids with a single query."""
+    if use_dictionary:
+        # The dictionary maps each itemid straight back to its drug and route,
+        # so resolving and fetching is a single keyed join. Text is compared
+        # exactly, as in the hashed itemid, not under the column collation.
+        selected_columns = ", ".join(
+            f"p.{column}" for column in EVENT_TABLE_COLUMNS["prescriptions"]
+        )
+        prescriptions_query = f"""
+        SELECT d.itemid, {selected_columns}
+        FROM prescription_items d
+        JOIN prescriptions p
+          ON CAST(p.drug AS BINARY) <=> CAST(d.drug AS BINARY)
+         AND CAST(p.route AS BINARY) <=> CAST(d.route AS BINARY)
+        WHERE d.itemid IN ({placeholders(len(item_ids))})
+          AND p.subject_id = %s
+          AND p.hadm_id = %s
+          AND p.starttime BETWEEN %s AND %s
+        ORDER BY p.starttime
+        """
+        prescriptions_df = read_query(
+            conn,
+            prescriptions_query,
+            (*item_ids, subject_id, hadm_id, start_time, end_time),
+        )
+    else:
+        # Without the dictionary, fetch the admission's prescriptions in the
+        # window once and recompute the itemid of each drug/route pair
         prescriptions_query = f"""
-        SELECT 
-            subject_id, hadm_id, drug, starttime, stoptime, 
-            route, dose_val_rx, dose_unit_rx, prod_strength
+        SELECT {", ".join(EVENT_TABLE_COLUMNS["prescriptions"])}
         FROM prescriptions
-        WHERE subject_id = {subject_id}
-          AND hadm_id = {hadm_id}
-          AND drug = '{drug.replace("'", "''")}'
-          {"AND route = '" + route.replace("'", "''") + "'" if pd.notna(route) else "AND route IS NULL"}
-          AND starttime BETWEEN '{start_time}' AND '{end_time}'
+        WHERE subject_id = %s
+          AND hadm_id = %s
+          AND starttime BETWEEN %s AND %s
         ORDER BY starttime
         """
+        prescriptions_df = read_query(
+            conn, prescriptions_query, (subject_id, hadm_id, start_time, end_time)
+        )
+        prescriptions_df = select_prescription_items(prescriptions_df, item_ids)
+
+    return split_prescription_events(prescriptions_df, item_ids)
+
+
+def _fetch_table_events(subject_id, hadm_id, source_table, item_ids, start_time, end_time, use_prescription_dictionary):
+    """Fetches one source table's items on a dedicated pooled connection."""
+    with mysql_connection() as conn:
+        if conn is None:
+            return None
+        if source_table == "prescriptions":
+            return _fetch_prescription_events(
+                conn,
+                subject_id,
+                hadm_id,
+                item_ids,
+                start_time,
+                end_time,
+                use_prescription_dictionary,
+            )
+        return _fetch_itemid_events(
+            conn, subject_id, hadm_id, source_table, item_ids, start_time, end_time
+        )
+
 
-        prescriptions_df = pd.read_sql(prescriptions_query, conn)
+def _event_cache_key(subject_id, hadm_id, item_id, source_table, start_time, end_time):
+    """Build the shared query cache key for one item's events."""
+    return make_cache_key(
+        "get_event_data",
+        subject_id,
+        hadm_id,
+        {
+            "item_id": item_id,
+            "source_table": source_table,
+            "start_time": start_time,
+            "end_time": end_time,
+        },
+    )
+
+
+def collect_event_data(
+    subject_id,
+    hadm_id,
+    items,
+    start_time,
+    end_time,
+    fetch_table_events,
+    fetch_ecg_measurements=get_ecg_measurements,
+):
+    """Serve cached items and fetch the rest one source table per worker.
+
+    fetch_table_events(subject_id, hadm_id, source_table, item_ids,
+    start_time, end_time) returns a dict of DataFrames keyed by itemid, or
+    None when the data source is unavailable. ECG items are read with
+    fetch_ecg_measurements(subject_id, start_time, end_time).
+    """
+    results = {}
+    pending_by_table = {}
+    for item_id, source_table in items:
+        if source_table == "ecgevents":
+            results[(item_id, source_table)] = fetch_ecg_measurements(
+                subject_id, start_time, end_time
+            )
+            continue
 
-        # Add consistent columns for visualization
-        if not prescriptions_df.empty:
-            # Add a value column for dose information
-            prescriptions_df["value"] = prescriptions_df.apply(
-                lambda row: (
-                    f"{row['dose_val_rx']} {row['dose_unit_rx']}"
-                    if pd.notna(row["dose_val_rx"])
-                    else "Unknown dose"
+        found, cached_frame = query_cache.get(
+            _event_cache_key(
+                subject_id, hadm_id, item_id, source_table, start_time, end_time
+            )
+        )
+        if found:
+            results[(item_id, source_table)] = cached_frame
+        else:
+            pending_by_table.setdefault(source_table, []).append(item_id)
+
+    pending_by_table = {
+        source_table: item_ids
+        for source_table, item_ids in pending_by_table.items()
+        if source_table in EVENT_TABLE_COLUMNS
+    }
+    if not pending_by_table:
+        return results
+
+    table_frames = run_parallel(
+        {
+            source_table: (
+                fetch_table_events,
+                (subject_id, hadm_id, source_table, item_ids, start_time, end_time),
+            )
+            for source_table, item_ids in pending_by_table.items()
+        }
+    )
+
+    for source_table, frames in table_frames.items():
+        if frames is None:
+            for item_id in pending_by_table[source_table]:
+                results[(item_id, source_table)] = pd.DataFrame()
+            continue
+
+        for item_id, frame in frames.items():
+            query_cache.set(
+                _event_cache_key(
+                    subject_id, hadm_id, item_id, source_table, start_time, end_time
                 ),
-                axis=1,
+                frame,
             )
+            results[(item_id, source_table)] = frame
+
+    return results
+
 
-            # Add itemid column
-            prescriptions_df["itemid"] = item_id
+def get_event_data_batch(subject_id, hadm_id, items, start_time, end_time):
+    """Fetches event data for several (item_id, source_table) pairs at once.
 
-        return prescriptions_df
+    Items already in the query cache are served from it; the rest are fetched
+    with one itemid IN (...) query per source table. Returns a dict keyed by
+    (item_id, source_table).
+    """
+    use_prescription_dictionary = any(
+        source_table == "prescriptions" for _, source_table in items
+    ) and _prescription_items_available()
+    # Each source table is queried on its own pooled connection in parallel
+    return collect_event_data(
+        subject_id,
+        hadm_id,
+        items,
+        start_time,
+        end_time,
+        partial(
+            _fetch_table_events,
+            use_prescription_dictionary=use_prescription_dictionary,
+        ),
+    )
 
-    return pd.DataFrame()
 
+def get_event_data(subject_id, hadm_id, item_id, source_table, start_time, end_time):
+    """Fetches event data for a specific item within a given time range."""
+    results = get_event_data_batch(
+        subject_id, hadm_id, [(item_id, source_table)], start_time, end_time
+    )
+    return results.get((item_id, source_table), pd.DataFrame())
+
+
+# Note collections in mimiciv_note and the detail collection of each
+NOTE_COLLECTIONS = {
+    "discharge": "discharge_detail",
+    "radiology": "radiology_detail",
+}
+
+
+def _attach_note_details(notes, detail_records):
+    """Add each note's detail rows as a {field_name: field_value} dict, in ordinal order."""
+    details_by_note = {}
+    for detail in sorted(detail_records, key=lambda detail: detail.get("field_ordinal") or 0):
+        note_details = details_by_note.setdefault(detail["note_id"], {})
+        field_name = detail.get("field_name")
+        if field_name in note_details:
+            note_details[field_name] = f"{note_details[field_name]}; {detail.get('field_value')}"
+        else:
+            note_details[field_name] = detail.get("field_value")
+    for note in notes:
+        note["details"] = details_by_note.get(note.get("note_id"), {})
+    return notes
+
+
+def _sort_notes(notes):
+    """Order notes by chart time (missing last), then type and sequence."""
+    return sorted(
+        notes,
+        key=lambda note: (
+            pd.isna(note.get("charttime")),
+            pd.Timestamp(note["charttime"]) if pd.notna(note.get("charttime")) else pd.Timestamp.min,
+            str(note.get("note_type") or ""),
+            note.get("note_seq") or 0,
+        ),
+    )
+
+
+@cached_query
+def get_notes(subject_id, hadm_id):
+    """Fetches every note of an admission (discharge and radiology) with its details."""
+    db = get_mongo_connection()
+    if db is None:
+        mark_source_unavailable()
+        return []
+    notes = []
+    for note_collection, detail_collection in NOTE_COLLECTIONS.items():
+        collection_notes = list(
+            db[note_collection].find({"subject_id": subject_id, "hadm_id": hadm_id}, {"_id": 0})
+        )
+        if not collection_notes:
+            continue
+        detail_records = list(
+            db[detail_collection].find(
+                {"note_id": {"$in": [note["note_id"] for note in collection_notes]}},
+                {"_id": 0},
+            )
+        )
+        notes.extend(_attach_note_details(collection_notes, detail_records))
+    return _sort_notes(notes)
 
+
+@cached_query
 def get_discharge_notes(subject_id, hadm_id):
     """Fetches discharge notes for a given admission from MongoDB."""
     db = get_mongo_connection()
@@ -420,4 +802,29 @@ def get_discharge_notes(subject_id, hadm_id):
             {"subject_id": subject_id, "hadm_id": hadm_id}, {"_id": 0}
         )
         return list(notes_cursor)
+    mark_source_unavailable()
     return []
+
+
+def get_admission_overview(subject_id, hadm_id, admission_start, admission_end):
+    """Fetches everything shown when an admission is opened, concurrently.
+
+    Each reader runs on its own worker with its own pooled MySQL connection
+    (or the shared MongoDB client), so the page waits for the slowest query
+    instead of the sum of all of them.
+    """
+    return run_parallel(
+        {
+            "patient_info": (get_patient_info, (subject_id,)),
+            "admission_info": (get_admission_info, (subject_id, hadm_id)),
+            "services": (get_admission_services, (subject_id, hadm_id)),
+            "icd_diagnoses": (get_icd_diagnoses, (subject_id, hadm_id)),
+            "icd_procedures": (get_icd_procedures, (subject_id, hadm_id)),
+            "notes": (get_notes, (subject_id, hadm_id)),
+            "icu_stays": (get_icu_info, (subject_id, hadm_id)),
+            "item_types": (
+                get_item_types,
+                (subject_id, hadm_id, admission_start, admission_end),
+            ),
+        }
+    )
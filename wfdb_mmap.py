@@ -0,0 +1,196 @@
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+# WFDB storage formats that are plain fixed-width sample arrays, mapped to
+# (NumPy dtype, value added to get the signed digital sample, invalid sample).
+MAPPABLE_FORMATS = {
+    "16": ("<i2", 0, -(2**15)),
+    "61": (">i2", 0, -(2**15)),
+    "80": ("u1", -(2**7), -(2**7)),
+    "160": ("<u2", -(2**15), -(2**15)),
+    "32": ("<i4", 0, -(2**31)),
+}
+
+DEFAULT_SAMPLING_FREQUENCY = 250.0
+DEFAULT_ADC_GAIN = 200.0
+
+_FORMAT_PATTERN = re.compile(r"^(\d+)(?:x(\d+))?(?::(\d+))?(?:\+(\d+))?$")
+_GAIN_PATTERN = re.compile(r"^([-+\d.eE]+)(?:\((-?\d+)\))?(?:/(\S+))?$")
+
+
+class UnsupportedRecordError(ValueError):
+    """Raised for WFDB records this reader cannot map, e.g. format 212 or multi-segment."""
+
+
+@dataclass
+class SignalSpec:
+    """One signal line of a WFDB header."""
+
+    file_name: str
+    storage_format: str
+    byte_offset: int
+    adc_gain: float
+    baseline: int
+    units: str
+    description: str
+
+
+@dataclass
+class RecordHeader:
+    """Parsed WFDB .hea file."""
+
+    record_name: str
+    sampling_frequency: float
+    sample_count: Optional[int]
+    signals: List[SignalSpec]
+
+
+def read_header(header_path: Path) -> RecordHeader:
+    """Parse a single-segment WFDB header file."""
+    lines = [
+        line.strip()
+        for line in Path(header_path).read_text().splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    ]
+    if not lines:
+        raise UnsupportedRecordError(f"Empty header: {header_path}")
+
+    record_fields = lines[0].split()
+    if "/" in record_fields[0]:
+        raise UnsupportedRecordError("Multi-segment records are not supported.")
+    signal_count = int(record_fields[1])
+    sampling_frequency = (
+        float(record_fields[2].split("/")[0])
+        if len(record_fields) > 2
+        else DEFAULT_SAMPLING_FREQUENCY
+    )
+    sample_count = int(record_fields[3]) if len(record_fields) > 3 else None
+
+    signals = []
+    for index, line in enumerate(lines[1 : 1 + signal_count]):
+        fields = line.split()
+        format_match = _FORMAT_PATTERN.match(fields[1])
+        if format_match is None:
+            raise UnsupportedRecordError(f"Unrecognized format field {fields[1]!r}.")
+        storage_format, samples_per_frame, skew, byte_offset = format_match.groups()
+        if (samples_per_frame and int(samples_per_frame) > 1) or (skew and int(skew)):
+            raise UnsupportedRecordError("Multi-frequency or skewed signals are not supported.")
+
+        adc_gain, baseline, units = DEFAULT_ADC_GAIN, None, "mV"
+        if len(fields) > 2:
+            gain_match = _GAIN_PATTERN.match(fields[2])
+            if gain_match is None:
+                raise UnsupportedRecordError(f"Unrecognized gain field {fields[2]!r}.")
+            adc_gain = float(gain_match.group(1)) or DEFAULT_ADC_GAIN
+            if gain_match.group(2) is not None:
+                baseline = int(gain_match.group(2))
+            units = gain_match.group(3) or units
+        adc_zero = int(fields[4]) if len(fields) > 4 else 0
+
+        signals.append(
+            SignalSpec(
+                file_name=fields[0],
+                storage_format=storage_format,
+                byte_offset=int(byte_offset or 0),
+                adc_gain=adc_gain,
+                baseline=adc_zero if baseline is None else baseline,
+                units=units,
+                description=" ".join(fields[8:]) if len(fields) > 8 else f"sig{index}",
+            )
+        )
+
+    if len(signals) != signal_count:
+        raise UnsupportedRecordError("Header lists fewer signals than declared.")
+    return RecordHeader(record_fields[0], sampling_frequency, sample_count, signals)
+
+
+class MappedWaveform:
+    """
+    ECG record whose samples stay on disk until requested.
+
+    The .dat file is memory mapped as a (samples, leads) array of the stored
+    digital format; gain and baseline are applied only to the lead and sample
+    range being read. Exposes the same interface as EcgWaveform.
+    """
+
+    def __init__(self, record_path: Path, study_id: str) -> None:
+        record_path = Path(record_path)
+        header = read_header(record_path.with_suffix(".hea"))
+        signals = header.signals
+        if not signals:
+            raise UnsupportedRecordError("Record has no signals.")
+
+        first_signal = signals[0]
+        if any(
+            signal.file_name != first_signal.file_name
+            or signal.storage_format != first_signal.storage_format
+            or signal.byte_offset != first_signal.byte_offset
+            for signal in signals
+        ):
+            raise UnsupportedRecordError("Signals must share one file and format.")
+        if first_signal.storage_format not in MAPPABLE_FORMATS:
+            raise UnsupportedRecordError(
+                f"Format {first_signal.storage_format} cannot be memory mapped."
+            )
+
+        dtype, self._digital_offset, invalid_value = MAPPABLE_FORMATS[
+            first_signal.storage_format
+        ]
+        # The invalid sample as stored, so it is matched before any conversion
+        self._stored_invalid_value = invalid_value - self._digital_offset
+        # float32 holds every 8 and 16-bit sample exactly but not 32-bit ones
+        self._float_dtype = np.float64 if np.dtype(dtype).itemsize > 2 else np.float32
+        data_path = record_path.parent / first_signal.file_name
+        frame_bytes = np.dtype(dtype).itemsize * len(signals)
+        available_samples = (
+            data_path.stat().st_size - first_signal.byte_offset
+        ) // frame_bytes
+        sample_count = (
+            min(header.sample_count, available_samples)
+            if header.sample_count
+            else available_samples
+        )
+
+        self.study_id = study_id
+        self.sampling_frequency = header.sampling_frequency
+        self.lead_names = [signal.description for signal in signals]
+        self.units = [signal.units for signal in signals]
+        self._gains = np.array([signal.adc_gain for signal in signals], dtype=self._float_dtype)
+        self._baselines = np.array(
+            [signal.baseline for signal in signals], dtype=self._float_dtype
+        )
+        self._digital = np.memmap(
+            data_path,
+            dtype=dtype,
+            mode="r",
+            offset=first_signal.byte_offset,
+            shape=(sample_count, len(signals)),
+        )
+
+    @property
+    def sample_count(self) -> int:
+        return int(self._digital.shape[0])
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.sample_count / self.sampling_frequency
+
+    @property
+    def nbytes(self) -> int:
+        # Mapped pages live in the shared page cache, not on the heap.
+        return int(self._gains.nbytes + self._baselines.nbytes)
+
+    def samples(self, lead_index: int, start: int, stop: int) -> np.ndarray:
+        """Return one lead's physical values for the sample range [start, stop)."""
+        stored = self._digital[start:stop, lead_index]
+        invalid = stored == self._stored_invalid_value
+        digital = stored.astype(self._float_dtype)
+        if self._digital_offset:
+            digital += self._digital_offset
+        physical = (digital - self._baselines[lead_index]) / self._gains[lead_index]
+        physical[invalid] = np.nan
+        return physical